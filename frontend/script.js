@@ -40,7 +40,7 @@ async function handleWeatherSubmit(e) {
     
     // Use the appropriate server URL based on how the app is loaded
     const baseUrl = isFileProtocol ? 'http://localhost:8000' : '';
-    const apiUrl = `${baseUrl}/api/generate_forecast`;
+    const apiUrl = `${baseUrl}/api/generate_forecast/stream`;
     
     console.log('Using API URL:', apiUrl);
     
@@ -48,7 +48,7 @@ async function handleWeatherSubmit(e) {
       method: 'POST',
       headers: {
         'Content-Type': 'application/json',
-        'Accept': 'application/json',
+        'Accept': 'text/event-stream',
       },
       body: JSON.stringify({
         date: date,
@@ -76,20 +76,36 @@ async function handleWeatherSubmit(e) {
       throw new Error(errorMessage);
     }
 
-    const data = await response.json();
-    console.log('Received data:', data);
-
-    const messageDiv = document.createElement('div');
-    messageDiv.className = 'chat-message bot';
-    messageDiv.appendChild(createWeatherCard(data));
-    chatContainer.appendChild(messageDiv);
+    // Render the card as soon as the data arrives, then fill in the forecast as tokens stream in
+    let weatherData = null;
+    let card = null;
     
-    // Ensure proper scrolling after card is generated
-    requestAnimationFrame(() => {
-      chatContainer.scrollTo({
-        top: chatContainer.scrollHeight,
-        behavior: 'smooth'
-      });
+    await readForecastStream(response, (event, payload) => {
+      if (event === 'meta') {
+        weatherData = { ...payload, forecast: '' };
+        card = createWeatherCard(weatherData, true);
+        
+        const messageDiv = document.createElement('div');
+        messageDiv.className = 'chat-message bot';
+        messageDiv.appendChild(card.element);
+        chatContainer.appendChild(messageDiv);
+        
+        // Ensure proper scrolling after card is generated
+        requestAnimationFrame(() => {
+          chatContainer.scrollTo({
+            top: chatContainer.scrollHeight,
+            behavior: 'smooth'
+          });
+        });
+      } else if (event === 'token' && card) {
+        weatherData.forecast += payload.text;
+        card.update(weatherData);
+      } else if (event === 'done' && card) {
+        console.log('Forecast complete:', payload);
+        card.update(weatherData, true);
+      } else if (event === 'error') {
+        throw new Error(payload.detail || 'Failed to get forecast');
+      }
     });
     
   } catch (error) {
@@ -112,6 +128,38 @@ async function handleWeatherSubmit(e) {
   document.getElementById('date').value = '';
 }
 
+// Parse a Server-Sent Events response body and pass each event to onEvent
+async function readForecastStream(response, onEvent) {
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    
+    let boundary;
+    while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+      const rawEvent = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+      
+      let event = 'message';
+      let data = '';
+      rawEvent.split('\n').forEach(line => {
+        if (line.startsWith('event:')) {
+          event = line.slice(6).trim();
+        } else if (line.startsWith('data:')) {
+          data += line.slice(5).trim();
+        }
+      });
+      if (data) {
+        onEvent(event, JSON.parse(data));
+      }
+    }
+  }
+}
+
 // Add new function to handle error display
 function showError(message) {
   const errorDiv = document.getElementById('error');
@@ -140,7 +188,7 @@ function addMessageToChat(sender, message) {
   chatContainer.scrollTop = chatContainer.scrollHeight;
 }
 
-function createWeatherCard(weatherData) {
+function createWeatherCard(weatherData, streaming = false) {
   const card = document.createElement('div');
   card.className = 'weather-card';
 
@@ -175,18 +223,7 @@ function createWeatherCard(weatherData) {
 
   const response = document.createElement('div');
   response.className = 'weather-response';
-  
-  // Process the forecast text to ensure the warnings are properly styled
-  let forecastText = weatherData.forecast;
-  
-  // Check if there are actual warnings from the API response
-  if (weatherData.disaster_warnings && Object.keys(weatherData.disaster_warnings).length > 0) {
-    // Find and style the warnings section without relying on markdown characters
-    const warningRegex = /(Weather Warnings:[\s\S]*?)(?=\n\n|$)/g;
-    forecastText = forecastText.replace(warningRegex, '<div class="highlighted-warnings">$1</div>');
-  }
-  
-  response.innerHTML = marked.parse(forecastText);
+  renderForecastText(response, weatherData);
 
   // Add a hint text
   const hintText = document.createElement('div');
@@ -196,6 +233,12 @@ function createWeatherCard(weatherData) {
   hintText.style.marginTop = '10px';
   hintText.textContent = 'Click to see detailed analysis';
 
+  // Show the forecast while it is being written
+  if (streaming) {
+    response.classList.add('visible');
+    hintText.style.display = 'none';
+  }
+
   card.appendChild(grid);
   card.appendChild(hintText);
   card.appendChild(response);
@@ -205,5 +248,34 @@ function createWeatherCard(weatherData) {
     hintText.style.display = response.classList.contains('visible') ? 'none' : 'block';
   });
 
-  return card;
+  // Re-render at most once per frame while tokens arrive
+  let renderPending = false;
+  const update = (data, final = false) => {
+    if (final) {
+      renderForecastText(response, data);
+      return;
+    }
+    if (renderPending) return;
+    renderPending = true;
+    requestAnimationFrame(() => {
+      renderPending = false;
+      renderForecastText(response, data);
+    });
+  };
+
+  return { element: card, update };
+}
+
+function renderForecastText(response, weatherData) {
+  // Process the forecast text to ensure the warnings are properly styled
+  let forecastText = weatherData.forecast;
+  
+  // Check if there are actual warnings from the API response
+  if (weatherData.disaster_warnings && Object.keys(weatherData.disaster_warnings).length > 0) {
+    // Find and style the warnings section without relying on markdown characters
+    const warningRegex = /(Weather Warnings:[\s\S]*?)(?=\n\n|$)/g;
+    forecastText = forecastText.replace(warningRegex, '<div class="highlighted-warnings">$1</div>');
+  }
+  
+  response.innerHTML = marked.parse(forecastText);
 }
@@ -44,13 +44,13 @@ async function handleWeatherSubmit(e) {
     
     // Use the appropriate server URL
     const baseUrl = isFileProtocol ? 'http://localhost:8000' : '';
-    const apiUrl = `${baseUrl}/api/generate_forecast`;
+    const apiUrl = `${baseUrl}/api/generate_forecast/stream`;
     
     const response = await fetch(apiUrl, {
       method: 'POST',
       headers: {
         'Content-Type': 'application/json',
-        'Accept': 'application/json',
+        'Accept': 'text/event-stream',
       },
       body: JSON.stringify({
         date: date,
@@ -76,10 +76,23 @@ async function handleWeatherSubmit(e) {
       throw new Error(errorMessage);
     }
 
-    const data = await response.json();
+    // Add the weather card as soon as the data arrives, then stream the forecast text into it
+    let weatherData = null;
+    let weatherResponse = null;
     
-    // Add weather response to chat
-    addWeatherResponse(data);
+    await readForecastStream(response, (event, payload) => {
+      if (event === 'meta') {
+        weatherData = { ...payload, forecast: '' };
+        weatherResponse = addWeatherResponse(weatherData, true);
+      } else if (event === 'token' && weatherResponse) {
+        weatherData.forecast += payload.text;
+        weatherResponse.update(weatherData);
+      } else if (event === 'done' && weatherResponse) {
+        weatherResponse.update(weatherData, true);
+      } else if (event === 'error') {
+        throw new Error(payload.detail || 'Failed to get forecast');
+      }
+    });
 
     // Clear input after sending
     document.getElementById('date').value = '';
@@ -101,6 +114,38 @@ async function handleWeatherSubmit(e) {
   }
 }
 
+// Parse a Server-Sent Events response body and pass each event to onEvent
+async function readForecastStream(response, onEvent) {
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    
+    let boundary;
+    while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+      const rawEvent = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+      
+      let event = 'message';
+      let data = '';
+      rawEvent.split('\n').forEach(line => {
+        if (line.startsWith('event:')) {
+          event = line.slice(6).trim();
+        } else if (line.startsWith('data:')) {
+          data += line.slice(5).trim();
+        }
+      });
+      if (data) {
+        onEvent(event, JSON.parse(data));
+      }
+    }
+  }
+}
+
 function showError(message) {
   const errorDiv = document.getElementById('error');
   errorDiv.textContent = message;
@@ -126,7 +171,7 @@ function addMessage(sender, content) {
   chatContainer.scrollTop = chatContainer.scrollHeight;
 }
 
-function addWeatherResponse(weatherData) {
+function addWeatherResponse(weatherData, streaming = false) {
   const chatContainer = document.getElementById('chatContainer');
   const date = new Date(weatherData.date);
   
@@ -146,22 +191,6 @@ function addWeatherResponse(weatherData) {
   const precipitation = Number(weatherData.data_used.precipitation).toFixed(1);
   const windSpeed = Number(weatherData.data_used.wind_speed_10m).toFixed(1);
   
-  // Process forecast text for warnings
-  let forecastText = weatherData.forecast;
-  let warningsHtml = '';
-  
-  if (weatherData.disaster_warnings && Object.keys(weatherData.disaster_warnings).length > 0) {
-    const warningRegex = /(Weather Warnings:[\s\S]*?)(?=\n\n|$)/g;
-    const warningsMatch = forecastText.match(warningRegex);
-    if (warningsMatch) {
-      warningsHtml = `<div class="weather-warning">
-        <h3>⚠️ Weather Warnings</h3>
-        ${marked.parse(warningsMatch[0].replace('Weather Warnings:', ''))}
-      </div>`;
-      forecastText = forecastText.replace(warningRegex, '');
-    }
-  }
-  
   const messageDiv = document.createElement('div');
   messageDiv.className = 'message bot-message';
   messageDiv.innerHTML = `
@@ -187,10 +216,7 @@ function addWeatherResponse(weatherData) {
         </div>
       </div>
       <div class="forecast-toggle">Show Detailed Forecast ▼</div>
-      <div class="weather-forecast">
-        ${marked.parse(forecastText)}
-        ${warningsHtml}
-      </div>
+      <div class="weather-forecast"></div>
     </div>
   `;
   
@@ -200,14 +226,65 @@ function addWeatherResponse(weatherData) {
   const forecastToggle = messageDiv.querySelector('.forecast-toggle');
   const weatherForecast = messageDiv.querySelector('.weather-forecast');
   
-  forecastToggle.addEventListener('click', () => {
-    weatherForecast.classList.toggle('visible');
+  const updateToggleText = () => {
     forecastToggle.textContent = weatherForecast.classList.contains('visible') ? 
       'Hide Detailed Forecast ▲' : 'Show Detailed Forecast ▼';
+  };
+  
+  forecastToggle.addEventListener('click', () => {
+    weatherForecast.classList.toggle('visible');
+    updateToggleText();
   });
   
+  // Show the forecast while it is being written
+  if (streaming) {
+    weatherForecast.classList.add('visible');
+    updateToggleText();
+  }
+  renderForecast(weatherForecast, weatherData);
+  
   // Scroll to bottom
   chatContainer.scrollTop = chatContainer.scrollHeight;
+  
+  // Re-render at most once per frame while tokens arrive
+  let renderPending = false;
+  return {
+    update(data, final = false) {
+      if (final) {
+        renderForecast(weatherForecast, data);
+        return;
+      }
+      if (renderPending) return;
+      renderPending = true;
+      requestAnimationFrame(() => {
+        renderPending = false;
+        renderForecast(weatherForecast, data);
+      });
+    }
+  };
+}
+
+function renderForecast(container, weatherData) {
+  // Process forecast text for warnings
+  let forecastText = weatherData.forecast;
+  let warningsHtml = '';
+  
+  if (weatherData.disaster_warnings && Object.keys(weatherData.disaster_warnings).length > 0) {
+    const warningRegex = /(Weather Warnings:[\s\S]*?)(?=\n\n|$)/g;
+    const warningsMatch = forecastText.match(warningRegex);
+    if (warningsMatch) {
+      warningsHtml = `<div class="weather-warning">
+        <h3>⚠️ Weather Warnings</h3>
+        ${marked.parse(warningsMatch[0].replace('Weather Warnings:', ''))}
+      </div>`;
+      forecastText = forecastText.replace(warningRegex, '');
+    }
+  }
+  
+  container.innerHTML = `
+    ${marked.parse(forecastText)}
+    ${warningsHtml}
+  `;
 }
 
 // Global error handler
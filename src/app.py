@@ -1,16 +1,34 @@
-from fastapi import FastAPI, HTTPException, Body, Request
+from fastapi import FastAPI, HTTPException, Body, Query, Request
 from pymongo import MongoClient
 from groq import Groq
 import os
-from pydantic import BaseModel
+import json
+import time
+import asyncio
+import signal
+from concurrent.futures import ThreadPoolExecutor
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 from typing import Optional, Dict, Any, List
-from datetime import datetime
+from datetime import datetime, timedelta
 import logging
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.templating import Jinja2Templates
-from config import Settings, detect_disaster_warnings
+from config import Settings
+from rules import detect_disaster_warnings
+from store import CachedPredictionStore, ColumnarPredictionStore, MongoPredictionStore, dataset_version
+from cache import LRUCache
+from series import accepts_gzip, encode_series, etag_matches, parse_fields, parse_granularity, series_etag, compress
+from prompts import MAX_REPORT_LENGTH, PROMPT_VERSION, build_prompt
+from forecast_cache import ForecastCache, forecast_cache_key, forecast_variants
+from concurrency import SingleFlight, await_within, hedge, run_blocking
+from llm_scheduler import LLMScheduler
+from length_governor import LengthGovernor, governed_stream
+from template_forecast import build_template_forecast
+from inference import load_predictor
+from static_assets import AssetManifest, StaticAssets
+from warnings_engine import LEVELS, build_warnings_index
+import metrics
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -30,13 +48,44 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
 
+# Per-stage timings of the forecast endpoints, exposed on /metrics and as a Server-Timing header
+app.add_middleware(
+    metrics.ServerTimingMiddleware,
+    paths=["/api/generate_forecast", "/api/generate_forecast/stream", "/api/generate_forecast/batch", "/api/warnings",
+           "/api/series"],
+)
+
+# Options shared by the single and batch forecast requests
+class ForecastOptions(BaseModel):
+    style: Optional[str] = "balanced"  # balanced, detailed, casual, broadcast
+    report_length: Optional[int] = Field(default=200, ge=1, le=MAX_REPORT_LENGTH)  # Default to 200 words
+    
+    # An explicit null means the default, it must not reach the cache key or the prompt
+    @field_validator("style", mode="before")
+    @classmethod
+    def default_style(cls, value):
+        return "balanced" if value is None else value
+    
+    @field_validator("report_length", mode="before")
+    @classmethod
+    def default_report_length(cls, value):
+        return 200 if value is None else value
+    
 # Pydantic model for request
-class ForecastRequest(BaseModel):
+class ForecastRequest(ForecastOptions):
     date: str
-    style: Optional[str] = "balanced"  # balanced, detailed, casual, broadcast
-    report_length: Optional[int] = 200  # Default to 200 words
+    latency_budget_ms: Optional[float] = Field(default=None, ge=0)  # Overrides Settings.FORECAST_LATENCY_BUDGET_MS
+    
+# Pydantic model for batch request: either an inclusive date range or an explicit list of dates
+class BatchForecastRequest(ForecastOptions):
+    model_config = ConfigDict(populate_by_name=True)
+    
+    date_from: Optional[str] = Field(default=None, alias="from")
+    date_to: Optional[str] = Field(default=None, alias="to")
+    dates: Optional[List[str]] = None
     
 # Pydantic model for disaster warning
 class DisasterWarning(BaseModel):
@@ -49,6 +98,9 @@ class ForecastResponse(BaseModel):
     forecast: str
     data_used: Dict[str, Any]
     disaster_warnings: Dict[str, DisasterWarning] = {}
+    cached: bool = False
+    template: bool = False  # Written by the local template generator, the LLM missed the latency budget
+    upgrade_pending: bool = False  # The LLM call is still running and will fill the cache for the next request
 
 # Startup event to initialize connections
 @app.on_event("startup")
@@ -61,6 +113,50 @@ async def startup_db_client():
     # Initialize Groq client
     app.groq_client = Groq(api_key=app.groq_api_key)
     
+    # Bounded executors keep the synchronous clients off the event loop
+    app.db_executor = ThreadPoolExecutor(max_workers=Settings.DB_EXECUTOR_WORKERS, thread_name_prefix="atmos-db")
+    app.llm_executor = ThreadPoolExecutor(max_workers=Settings.LLM_EXECUTOR_WORKERS, thread_name_prefix="atmos-llm")
+    # One thread for the model: online rollouts continue a single trajectory, one at a time
+    app.infer_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="atmos-infer")
+    app.llm_scheduler = LLMScheduler(
+        app.llm_executor,
+        max_concurrency=Settings.LLM_MAX_CONCURRENCY,
+        requests_per_minute=Settings.GROQ_REQUESTS_PER_MINUTE,
+        tokens_per_minute=Settings.GROQ_TOKENS_PER_MINUTE,
+        max_retries=Settings.LLM_MAX_RETRIES,
+    )
+    # Identical concurrent forecast requests share one upstream call
+    app.forecast_flights = SingleFlight()
+    
+    app.forecast_cache = None
+    if Settings.FORECAST_CACHE_ENABLED:
+        app.forecast_cache = ForecastCache(
+            memory_size=Settings.FORECAST_CACHE_MEMORY_SIZE,
+            ttl=Settings.FORECAST_CACHE_TTL_SECONDS,
+            path=Settings.FORECAST_CACHE_PATH,
+            max_keys=Settings.FORECAST_CACHE_MAX_KEYS,
+        )
+    
+    # Encoded /api/series bodies keyed on their ETag, which includes the dataset version
+    app.series_cache = LRUCache(max_size=Settings.SERIES_CACHE_SIZE, ttl=Settings.SERIES_CACHE_TTL_SECONDS)
+    
+    app.mongodb_client = None
+    app.db = None
+    app.store = None
+    app.warnings_index = None
+    app.dataset_version = None
+    app.predictor = None
+    
+    if Settings.STORAGE_BACKEND == "columnar":
+        # Predictions are served from memory-mapped files, MongoDB is not needed
+        try:
+            app.store = ColumnarPredictionStore(Settings.COLUMNAR_STORE_PATH)
+            logger.info(f"Using columnar prediction store at {Settings.COLUMNAR_STORE_PATH}")
+            await refresh_warnings_index()
+        except Exception as e:
+            logger.error(f"Failed to open columnar store: {str(e)}")
+        return
+    
     try:
         # Connect to MongoDB
         mongo_uri = os.getenv("MONGODB_URI", Settings.MONGO_URI)
@@ -69,12 +165,20 @@ async def startup_db_client():
         app.mongodb_client.admin.command('ping')
         app.db = app.mongodb_client[Settings.DB_NAME]
         
-        # Ensure the collection exists
-        if "weather_data" not in app.db.list_collection_names():
+        # Ensure a predictions collection exists
+        existing = app.db.list_collection_names()
+        if not any(name in existing for name in MongoPredictionStore.collections_to_try):
             app.db.create_collection("chennai_weather")
-            logger.warning("Created 'weather_data' collection as it did not exist")
+            logger.warning("Created 'chennai_weather' collection as it did not exist")
         
+        app.store = CachedPredictionStore(
+            MongoPredictionStore(app.db),
+            max_size=Settings.ROW_CACHE_SIZE,
+            ttl=Settings.ROW_CACHE_TTL_SECONDS,
+            negative_ttl=Settings.ROW_CACHE_NEGATIVE_TTL_SECONDS,
+        )
         logger.info("Connected to MongoDB and initialized Groq client")
+        await refresh_warnings_index()
     except Exception as e:
         logger.error(f"Failed to connect to MongoDB: {str(e)}")
         # Continue running without MongoDB for testing/development
@@ -84,178 +188,292 @@ async def startup_db_client():
 # Shutdown event to close connections
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    if getattr(app, 'forecast_cache', None):
+        app.forecast_cache.close()
+    if getattr(app, 'store', None):
+        app.store.close()
     if hasattr(app, 'mongodb_client') and app.mongodb_client:
         app.mongodb_client.close()
         logger.info("Closed MongoDB connection")
+    for executor_name in ('db_executor', 'llm_executor', 'infer_executor'):
+        if getattr(app, executor_name, None):
+            getattr(app, executor_name).shutdown(wait=False)
+
+async def lookup_weather_data(date_key: str):
+    """Fetch a prediction row, running blocking stores on the DB executor"""
+    store = app.store
+    if not store.blocking_io:
+        return store.get(date_key)
+    if isinstance(store, CachedPredictionStore):
+        found, row = store.cached(date_key)
+        if found:
+            return row
+    return await run_blocking(app.db_executor, store.get, date_key)
+
+async def refresh_warnings_index():
+    """Recompute the disaster warnings of every stored date in one vectorized pass and fingerprint the dataset"""
+    store = app.store
+    started = time.perf_counter()
+    try:
+        if store.blocking_io:
+            date_keys, columns = await run_blocking(app.db_executor, store.load_columns)
+        else:
+            date_keys, columns = store.load_columns()
+        app.warnings_index = build_warnings_index(date_keys, columns, Settings.DISASTER_THRESHOLDS)
+        app.dataset_version = dataset_version(date_keys, columns)
+    except Exception as e:
+        # Requests fall back to evaluating the rules per row, series responses go out without an ETag
+        logger.error(f"Failed to build warnings index: {str(e)}")
+        app.warnings_index = None
+        app.dataset_version = None
+        return
+    logger.info(f"Built warnings index for {len(date_keys)} dates in {(time.perf_counter() - started) * 1000:.1f}ms")
+    await refresh_predictor(date_keys)
+
+async def refresh_predictor(date_keys):
+    """(Re)load the model that serves dates past the last stored prediction"""
+    app.predictor = None
+    if not Settings.ONLINE_INFERENCE_ENABLED:
+        return
+    try:
+        app.predictor = await run_blocking(
+            app.infer_executor, load_predictor, Settings.MODEL_DIR, app.store, date_keys, app.infer_executor,
+            max_days=Settings.INFERENCE_MAX_DAYS,
+            max_wait=Settings.INFERENCE_MAX_WAIT_MS / 1000,
+            max_batch=Settings.INFERENCE_MAX_BATCH,
+        )
+    except Exception as e:
+        # Dates past the stored horizon stay 404s
+        logger.warning(f"Online inference is disabled: {str(e)}")
+
+async def lookup_online(date_key: str):
+    """Row of a date past the stored predictions from the in-process model, or None"""
+    predictor = getattr(app, 'predictor', None)
+    if predictor is None:
+        return None
+    with metrics.stage("inference"):
+        return await predictor.get(date_key)
+
+def series_version():
+    """Dataset version for series ETags, changed by rows online inference writes to the store"""
+    version = getattr(app, 'dataset_version', None)
+    predictor = getattr(app, 'predictor', None)
+    if version and predictor is not None and predictor.rows and app.store.writable:
+        return f"{version}.{len(predictor.rows)}"
+    return version
+
+def warnings_for(date_key: str, weather_data):
+    """Precomputed warnings for a stored date, evaluated on the fly when it is not indexed"""
+    index = getattr(app, 'warnings_index', None)
+    warnings = index.get(date_key) if index is not None else None
+    if warnings is None:
+        warnings = detect_disaster_warnings(weather_data)
+    return warnings
+
+async def resolve_forecast_inputs(request: ForecastRequest):
+    """Validate the request date and look up its prediction row and disaster warnings"""
+    # Validate and format date
+    try:
+        with metrics.stage("parse"):
+            parsed_date = datetime.strptime(request.date, '%Y-%m-%d')
+            formatted_date = parsed_date.strftime('%Y-%m-%d')  # Ensure consistent YYYY-MM-DD format
+        logger.info(f"Formatted date: {formatted_date}")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+    
+    # Check the prediction store
+    if getattr(app, 'store', None) is None:
+        raise HTTPException(status_code=503, detail="Database connection is not available")
+    
+    with metrics.stage("db"):
+        weather_data = await lookup_weather_data(formatted_date)
+    if not weather_data:
+        weather_data = await lookup_online(formatted_date)
+    
+    if not weather_data:
+        logger.warning(f"No weather data found for date: {formatted_date}")
+        raise HTTPException(status_code=404, detail=f"No weather data found for {formatted_date}. Please try a different date between 2024-01-01 and 2026-02-18.")
+    
+    # Apply disaster warning detection rules
+    with metrics.stage("warnings"):
+        disaster_warnings = warnings_for(formatted_date, weather_data)
+    return formatted_date, weather_data, disaster_warnings
+
+async def get_cached_forecast(cache_key: str, variants: int):
+    if not app.forecast_cache:
+        return None
+    with metrics.stage("cache"):
+        return await run_blocking(app.db_executor, app.forecast_cache.get, cache_key, variants)
+
+async def put_cached_forecast(cache_key: str, forecast: str, variants: int):
+    if app.forecast_cache and forecast:
+        with metrics.stage("cache_write"):
+            await run_blocking(app.db_executor, app.forecast_cache.put, cache_key, forecast, variants)
+
+def length_governor(report_length: int, disaster_warnings):
+    """Governor that ends the LLM stream at the requested length, None when disabled"""
+    if not Settings.LENGTH_GOVERNOR_ENABLED:
+        return None
+    return LengthGovernor(report_length, disaster_warnings, slack=Settings.LENGTH_GOVERNOR_SLACK)
+
+def stream_llm_forecast(prompt, report_length: int, disaster_warnings, result: dict):
+    """Governed Groq stream of one forecast; `result` receives its usage and first token time"""
+    return governed_stream(app.llm_scheduler, app.llm_executor, app.groq_client.chat.completions.create, prompt,
+                           Settings.GROQ_MODEL, length_governor(report_length, disaster_warnings), result)
+
+async def complete_llm_forecast(prompt, report_length: int, disaster_warnings):
+    """Read one governed stream to the end, returning the text and its usage and timing"""
+    result = {}
+    parts = [text async for text in stream_llm_forecast(prompt, report_length, disaster_warnings, result)]
+    return "".join(parts), result
+
+async def claim_generation(cache_key: str, variants: int) -> Optional[str]:
+    """
+    Take the forecast cache's generation lease for `cache_key`, shared by
+    every worker process using the same cache file. While another worker
+    holds it, wait for its forecast to land in the cache instead of calling
+    the LLM as well. Returns that forecast, or None once this process holds
+    the lease (also when the other worker failed or its lease expired).
+    """
+    cache = app.forecast_cache
+    lease = Settings.FORECAST_LEASE_SECONDS
+    if not cache or lease <= 0:
+        return None
+    waited = False
+    with metrics.stage("lease"):
+        while not await run_blocking(app.db_executor, cache.claim, cache_key, lease):
+            waited = True
+            await asyncio.sleep(Settings.FORECAST_LEASE_POLL_MS / 1000)
+            forecast = await run_blocking(app.db_executor, cache.get, cache_key, variants)
+            if forecast is not None:
+                metrics.FORECAST_LEASE_WAITS.inc()
+                return forecast
+        if waited:
+            # The other worker may have stored its forecast just before releasing the lease
+            forecast = await run_blocking(app.db_executor, cache.get, cache_key, variants)
+            if forecast is not None:
+                await release_generation(cache_key)
+                metrics.FORECAST_LEASE_WAITS.inc()
+                return forecast
+    return None
+
+async def release_generation(cache_key: str):
+    if app.forecast_cache and Settings.FORECAST_LEASE_SECONDS > 0:
+        await run_blocking(app.db_executor, app.forecast_cache.release, cache_key)
+
+async def generate_llm_forecast(request: ForecastRequest, weather_data, disaster_warnings, cache_key: str, variants: int):
+    """Stream the forecast from Groq through the rate-limited scheduler and length governor, and cache the result"""
+    # Another worker may already be generating this forecast
+    forecast = await claim_generation(cache_key, variants)
+    if forecast is not None:
+        return forecast
+    try:
+        return await call_llm_forecast(request, weather_data, disaster_warnings, cache_key, variants)
+    finally:
+        await release_generation(cache_key)
+
+async def call_llm_forecast(request: ForecastRequest, weather_data, disaster_warnings, cache_key: str, variants: int):
+    with metrics.stage("prompt"):
+        prompt = build_prompt(request.date, request.style, request.report_length, weather_data, disaster_warnings)
+    with metrics.stage("llm"):
+        llm_started = time.perf_counter()
+        # A slow first attempt is hedged with a second identical call, the first answer wins
+        forecast, result = await hedge(
+            lambda: complete_llm_forecast(prompt, request.report_length, disaster_warnings),
+            Settings.LLM_HEDGE_AFTER_MS / 1000,
+            on_hedge=metrics.LLM_HEDGES.inc,
+        )
+    usage = result.get("usage")
+    prompt.log_usage(usage)
+    first_token_at = result.get("first_token_at")
+    metrics.record_llm_usage(usage, first_token_at - llm_started if first_token_at else None)
+    await put_cached_forecast(cache_key, forecast, variants)
+    return forecast
+
+def latency_budget(request: ForecastRequest) -> Optional[float]:
+    """Seconds a forecast request may wait in total before a template forecast is served, None for no limit"""
+    budget_ms = request.latency_budget_ms if request.latency_budget_ms is not None else Settings.FORECAST_LATENCY_BUDGET_MS
+    return budget_ms / 1000 if budget_ms > 0 else None
+
+def template_forecast_response(request: ForecastRequest, formatted_date: str, weather_data, disaster_warnings,
+                               reason: str, upgrade_pending: bool):
+    """Forecast written locally from the prediction row, served when the LLM is too slow or failing"""
+    with metrics.stage("template"):
+        forecast = build_template_forecast(formatted_date, request.style, request.report_length,
+                                           weather_data, disaster_warnings)
+    metrics.TEMPLATE_FORECASTS.inc(reason=reason)
+    return ForecastResponse(
+        date=request.date,
+        forecast=forecast,
+        data_used=weather_data,
+        disaster_warnings=disaster_warnings,
+        template=True,
+        upgrade_pending=upgrade_pending
+    )
+
+def sse_event(event: str, data) -> str:
+    """Format one Server-Sent Events message with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def usage_to_dict(usage):
+    """Token usage from a Groq response or stream chunk as a plain dictionary"""
+    if usage is None:
+        return None
+    if hasattr(usage, "model_dump"):
+        return usage.model_dump()
+    return {
+        "prompt_tokens": getattr(usage, "prompt_tokens", None),
+        "completion_tokens": getattr(usage, "completion_tokens", None),
+        "total_tokens": getattr(usage, "total_tokens", None),
+    }
 
 # Main endpoint to generate forecast
 @app.post("/api/generate_forecast")
 async def generate_forecast(request: ForecastRequest):
     logger.info(f"Received request: {request}")
+    started = time.perf_counter()
+    budget = latency_budget(request)
     try:
-        # Validate and format date
-        try:
-            parsed_date = datetime.strptime(request.date, '%Y-%m-%d')
-            formatted_date = parsed_date.strftime('%Y-%m-%d')  # Ensure consistent YYYY-MM-DD format
-            logger.info(f"Formatted date: {formatted_date}")
-        except ValueError:
-            raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
-        
-        # Check MongoDB connection
-        if not hasattr(app, 'db') or app.db is None:
-            raise HTTPException(status_code=503, detail="Database connection is not available")
-        
-        # Query MongoDB with exact date match - try both collection names
-        weather_data = None
-        
-        # Try different collections and query formats
-        collections_to_try = ["chennai_weather", "weather_data"]
-        
-        for collection_name in collections_to_try:
-            if collection_name in app.db.list_collection_names():
-                collection = app.db[collection_name]
-                
-                # Try exact date format first
-                query1 = {"date": formatted_date}
-                
-                # Also try with regex to match date at beginning of string (for datetime fields)
-                query2 = {"date": {"$regex": f"^{formatted_date}"}}
-                
-                # Try different date formats that might be in the database
-                query3 = {"date": f"{formatted_date}T00:00:00Z"}
-                query4 = {"date": f"{formatted_date} 00:00:00+00:00"}
-                
-                fields = { 
-                    "_id": 0,
-                    "date": 1,
-                    "temperature_2m": 1,
-                    "relative_humidity_2m": 1,
-                    "dew_point_2m": 1,
-                    "apparent_temperature": 1,
-                    "precipitation": 1,
-                    "rain": 1,
-                    "snowfall": 1,
-                    "snow_depth": 1,
-                    "pressure_msl": 1,
-                    "surface_pressure": 1,
-                    "cloud_cover": 1,
-                    "cloud_cover_low": 1,
-                    "cloud_cover_mid": 1,
-                    "cloud_cover_high": 1,
-                    "wind_speed_10m": 1,
-                    "wind_speed_100m": 1,
-                    "wind_direction_10m": 1,
-                    "wind_direction_100m": 1,
-                    "wind_gusts_10m": 1,
-                }
-                
-                # Try each query
-                for query in [query1, query2, query3, query4]:
-                    logger.info(f"Trying MongoDB query on {collection_name}: {query}")
-                    result = collection.find_one(query, fields)
-                    if result:
-                        weather_data = result
-                        logger.info(f"Found data in collection {collection_name} with query {query}")
-                        break
-                
-                if weather_data:
-                    break
-        
-        # If no data found, log available data for debugging
-        if not weather_data:
-            logger.warning(f"No weather data found for date: {formatted_date}")
-            
-            # Log a sample of data to help debug
-            for collection_name in collections_to_try:
-                if collection_name in app.db.list_collection_names():
-                    collection = app.db[collection_name]
-                    sample = list(collection.find().limit(1))
-                    if sample:
-                        logger.info(f"Sample data from {collection_name}: {sample}")
-                        
-                    # Check date format in the collection
-                    dates_sample = list(collection.find({}, {"date": 1, "_id": 0}).limit(5))
-                    if dates_sample:
-                        logger.info(f"Sample dates from {collection_name}: {dates_sample}")
-            
-            raise HTTPException(status_code=404, detail=f"No weather data found for {formatted_date}. Please try a different date between 2024-01-01 and 2026-02-18.")
-        
-        # Apply disaster warning detection rules
-        disaster_warnings = detect_disaster_warnings(weather_data)
-        
-        # Determine style instruction based on request
-        style_instructions = {
-            "balanced": "Vary the summary format. Sometimes make it detailed and scientific, other times casual and conversational.",
-            "detailed": "Make the forecast detailed and scientific with technical meteorological information.",
-            "casual": "Make the forecast casual and conversational, as if talking to a friend.",
-            "broadcast": "Format the forecast like a professional weather reporter's broadcast script."
-        }
-        
-        style_text = style_instructions.get(request.style, style_instructions["balanced"])
-        
-        # Create a formatted warnings section for the LLM
-        warnings_section = ""
-        if disaster_warnings:
-            warnings_section = "\n\nWeather Warnings:\n\n"
-            for warning_type, warning_info in disaster_warnings.items():
-                severity = warning_info['level'].upper()
-                warnings_section += f"- {severity}: {warning_info['message']}\n"
-        else:
-            warnings_section = "\n\nWeather Warnings:\n\nNo weather warnings for this date.\n"
-        
-        # Add instruction to include the warnings section
-        instructions_for_warnings = """
-        Important: Make sure to include a 'Weather Warnings' section in your response,
-        with the exact warnings provided below. Do not use markdown formatting like # or **.
-        Format the warnings as a simple text section with the same style as your forecast.
-        Include this section at the end of your forecast.
-        """
-        
-        # Construct the dynamic prompt with specific word count instruction and warnings
-        prompt = f"""
-        Generate a weather forecast for {request.date} that is EXACTLY {request.report_length} words long.
-        Base the forecast on the following weather data.
-        Do not mention "today" or "tomorrow"—just focus on the future weather for this date.
-        {style_text}
-        {instructions_for_warnings}
-        Make sure the response is engaging and natural.
+        formatted_date, weather_data, disaster_warnings = await resolve_forecast_inputs(request)
         
-        Weather data:
-        - Temperature: {weather_data.get('temperature_2m', 'N/A')}°C (Feels like {weather_data.get('apparent_temperature', 'N/A')}°C)
-        - Humidity: {weather_data.get('relative_humidity_2m', 'N/A')}%
-        - Dew Point: {weather_data.get('dew_point_2m', 'N/A')}°C
-        - Precipitation: {weather_data.get('precipitation', 'N/A')} mm (Rain: {weather_data.get('rain', 'N/A')} mm, Snowfall: {weather_data.get('snowfall', 'N/A')} mm)
-        - Snow Depth: {weather_data.get('snow_depth', 'N/A')} mm
-        - Pressure: {weather_data.get('pressure_msl', 'N/A')} hPa (Surface: {weather_data.get('surface_pressure', 'N/A')} hPa)
-        - Cloud Cover: {weather_data.get('cloud_cover', 'N/A')}% (Low: {weather_data.get('cloud_cover_low', 'N/A')}%, Mid: {weather_data.get('cloud_cover_mid', 'N/A')}%, High: {weather_data.get('cloud_cover_high', 'N/A')}%)
-        - Wind: {weather_data.get('wind_speed_10m', 'N/A')} km/h at 10m, gusting to {weather_data.get('wind_gusts_10m', 'N/A')} km/h
-        
-        {warnings_section}
+        # Serve repeated (date, style, length) requests from the forecast cache
+        cache_key = forecast_cache_key(formatted_date, request.style, request.report_length,
+                                       weather_data, PROMPT_VERSION, Settings.GROQ_MODEL)
+        variants = forecast_variants(request.style)
+        forecast = await get_cached_forecast(cache_key, variants)
+        if forecast is not None:
+            logger.info(f"Serving cached forecast for {formatted_date}")
+            return ForecastResponse(
+                date=request.date,
+                forecast=forecast,
+                data_used=weather_data,
+                disaster_warnings=disaster_warnings,
+                cached=True
+            )
         
-        Remember: The response must be EXACTLY {request.report_length} words long. Not more, not less.
-        Make the forecast natural and engaging while maintaining accuracy.
-        Include the WEATHER WARNINGS section at the end of your forecast.
-        """
-
-        # Send the prompt to Groq's LLM with adjusted temperature for more consistent length
+        # Send the prompt to Groq's LLM, sharing the call with identical requests already in flight.
+        # With a latency budget the wait is cut off at the deadline, the call itself carries on.
         logger.info(f"Sending prompt to Groq's LLM")
         try:
-            completion = app.groq_client.chat.completions.create(
-                model="llama-3.3-70b-versatile",
-                messages=[
-                    {"role": "system", "content": f"You are a weather forecaster. Generate forecasts that are exactly {request.report_length} words long."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7,
-                max_tokens=1024,
-                top_p=0.9,
+            forecast = await await_within(
+                app.forecast_flights.do(
+                    cache_key,
+                    lambda: generate_llm_forecast(request, weather_data, disaster_warnings, cache_key, variants)
+                ),
+                budget - (time.perf_counter() - started) if budget is not None else None
             )
-            
-            # Extract the generated forecast
-            forecast = completion.choices[0].message.content
             logger.info("Successfully received forecast from Groq")
         except Exception as e:
+            # A timeout only means a missed deadline when there is one; otherwise it is an LLM error like any other
+            if budget is not None and isinstance(e, asyncio.TimeoutError):
+                logger.warning(f"LLM missed the {budget:.2f}s latency budget, serving a template forecast for {formatted_date}")
+                return template_forecast_response(request, formatted_date, weather_data, disaster_warnings,
+                                                  "deadline", upgrade_pending=True)
             logger.error(f"Error from Groq API: {str(e)}")
+            if budget is not None:
+                # Requests with a latency budget prefer a template forecast over an error
+                return template_forecast_response(request, formatted_date, weather_data, disaster_warnings,
+                                                  "error", upgrade_pending=False)
             raise HTTPException(status_code=502, detail=f"Error from language model service: {str(e)}")
         
         # Return response with forecast, data used, and disaster warnings
@@ -273,23 +491,287 @@ async def generate_forecast(request: ForecastRequest):
         logger.error(f"Error generating forecast: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error generating forecast: {str(e)}")
 
+# Streaming variant: data and warnings first, then forecast tokens as Server-Sent Events
+@app.post("/api/generate_forecast/stream")
+async def generate_forecast_stream(request: ForecastRequest):
+    logger.info(f"Received streaming request: {request}")
+    # Lookup errors are raised before the stream starts, so they keep their HTTP status codes
+    formatted_date, weather_data, disaster_warnings = await resolve_forecast_inputs(request)
+    cache_key = forecast_cache_key(formatted_date, request.style, request.report_length,
+                                   weather_data, PROMPT_VERSION, Settings.GROQ_MODEL)
+    variants = forecast_variants(request.style)
+    
+    async def events():
+        started = time.perf_counter()
+        yield sse_event("meta", {
+            "date": request.date,
+            "data_used": weather_data,
+            "disaster_warnings": disaster_warnings,
+        })
+        
+        forecast = await get_cached_forecast(cache_key, variants)
+        if forecast is not None:
+            logger.info(f"Serving cached forecast for {formatted_date}")
+            yield sse_event("token", {"text": forecast})
+            yield sse_event("done", {"cached": True, "usage": None, "seconds": round(time.perf_counter() - started, 3)})
+            return
+        
+        parts = []
+        result = {}
+        try:
+            # The stream keeps its scheduler slot until it is fully consumed or the governor ends it
+            with metrics.stage("prompt"):
+                prompt = build_prompt(request.date, request.style, request.report_length, weather_data, disaster_warnings)
+            llm_started = time.perf_counter()
+            async for text in stream_llm_forecast(prompt, request.report_length, disaster_warnings, result):
+                parts.append(text)
+                yield sse_event("token", {"text": text})
+        except Exception as e:
+            logger.error(f"Error from Groq API: {str(e)}")
+            yield sse_event("error", {"detail": f"Error from language model service: {str(e)}"})
+            return
+        
+        usage = result.get("usage")
+        first_token_at = result.get("first_token_at")
+        prompt.log_usage(usage)
+        metrics.add_stage("llm", time.perf_counter() - llm_started)
+        metrics.record_llm_usage(usage, first_token_at - llm_started if first_token_at else None)
+        forecast = "".join(parts)
+        await put_cached_forecast(cache_key, forecast, variants)
+        yield sse_event("done", {
+            "cached": False,
+            "usage": usage_to_dict(usage),
+            "time_to_first_token": round(first_token_at - started, 3) if first_token_at else None,
+            "seconds": round(time.perf_counter() - started, 3),
+        })
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+def parse_batch_dates(request: BatchForecastRequest) -> List[str]:
+    """Expand a batch request into a list of unique YYYY-MM-DD dates"""
+    try:
+        if request.dates:
+            days = [datetime.strptime(value, '%Y-%m-%d') for value in request.dates]
+        elif request.date_from and request.date_to:
+            start = datetime.strptime(request.date_from, '%Y-%m-%d')
+            end = datetime.strptime(request.date_to, '%Y-%m-%d')
+            if end < start:
+                raise HTTPException(status_code=400, detail="'to' must not be before 'from'")
+            # Check the size before expanding, a range spanning centuries would otherwise be built in full
+            if (end - start).days + 1 > Settings.BATCH_MAX_DATES:
+                raise HTTPException(status_code=400, detail=f"At most {Settings.BATCH_MAX_DATES} dates per batch")
+            days = [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+        else:
+            raise HTTPException(status_code=400, detail="Provide either 'dates' or both 'from' and 'to'")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+    
+    date_keys = list(dict.fromkeys(day.strftime('%Y-%m-%d') for day in days))
+    if len(date_keys) > Settings.BATCH_MAX_DATES:
+        raise HTTPException(status_code=400, detail=f"At most {Settings.BATCH_MAX_DATES} dates per batch")
+    return date_keys
+
+async def batch_forecast_item(date_key: str, weather_data, request: BatchForecastRequest):
+    """Generate one forecast of a batch, returning a result line instead of raising"""
+    if not weather_data:
+        return {"date": date_key, "status": 404, "detail": f"No weather data found for {date_key}"}
+    
+    single = ForecastRequest(date=date_key, style=request.style, report_length=request.report_length)
+    disaster_warnings = warnings_for(date_key, weather_data)
+    cache_key = forecast_cache_key(date_key, single.style, single.report_length,
+                                   weather_data, PROMPT_VERSION, Settings.GROQ_MODEL)
+    variants = forecast_variants(single.style)
+    result = {"date": date_key, "status": 200, "data_used": weather_data, "disaster_warnings": disaster_warnings}
+    
+    forecast = await get_cached_forecast(cache_key, variants)
+    if forecast is not None:
+        return {**result, "forecast": forecast, "cached": True}
+    try:
+        forecast = await app.forecast_flights.do(
+            cache_key,
+            lambda: generate_llm_forecast(single, weather_data, disaster_warnings, cache_key, variants)
+        )
+    except Exception as e:
+        logger.error(f"Error from Groq API for {date_key}: {str(e)}")
+        return {"date": date_key, "status": 502, "detail": f"Error from language model service: {str(e)}"}
+    return {**result, "forecast": forecast, "cached": False}
+
+# Batch endpoint: one database query, concurrent LLM calls, results streamed as NDJSON as they finish
+@app.post("/api/generate_forecast/batch")
+async def generate_forecast_batch(request: BatchForecastRequest):
+    logger.info(f"Received batch request: {request}")
+    date_keys = parse_batch_dates(request)
+    
+    if getattr(app, 'store', None) is None:
+        raise HTTPException(status_code=503, detail="Database connection is not available")
+    if app.store.blocking_io:
+        rows = await run_blocking(app.db_executor, app.store.get_many, date_keys)
+    else:
+        rows = app.store.get_many(date_keys)
+    missing = [date_key for date_key in date_keys if date_key not in rows]
+    if missing and getattr(app, 'predictor', None) is not None:
+        # Concurrent lookups, so every missing date joins the same rollout
+        with metrics.stage("inference"):
+            rows.update(await app.predictor.get_many(missing))
+    
+    async def results():
+        started = time.perf_counter()
+        tasks = [asyncio.ensure_future(batch_forecast_item(date_key, rows.get(date_key), request)) for date_key in date_keys]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                line = await finished
+                yield json.dumps(line) + "\n"
+        finally:
+            # Stop pending work if the client disconnects
+            for task in tasks:
+                task.cancel()
+        yield json.dumps({"done": True, "count": len(date_keys), "seconds": round(time.perf_counter() - started, 3)}) + "\n"
+    
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+async def ping_store():
+    """Round-trip a ping to the prediction store, returning (status, latency in ms)"""
+    store = getattr(app, 'store', None)
+    if store is None:
+        return "disconnected", None
+    started = time.perf_counter()
+    try:
+        if store.blocking_io:
+            await run_blocking(app.db_executor, store.ping)
+        else:
+            store.ping()
+    except Exception as e:
+        logger.error(f"Prediction store ping failed: {str(e)}")
+        return "unreachable", None
+    return "connected", round((time.perf_counter() - started) * 1000, 2)
+
 # Health check endpoint
 @app.get("/health")
 async def health_check():
-    db_status = "connected" if (hasattr(app, 'mongodb_client') and app.mongodb_client) else "disconnected"
+    db_status, db_ping_ms = await ping_store()
     return {
         "status": "healthy",
         "database": db_status,
+        "database_ping_ms": db_ping_ms,
+        "storage_backend": Settings.STORAGE_BACKEND,
+        "storage_version": getattr(getattr(app, 'store', None), 'version', None),
+        "row_cache": app.store.cache.stats() if isinstance(getattr(app, 'store', None), CachedPredictionStore) else None,
+        "forecast_cache": app.forecast_cache.stats() if getattr(app, 'forecast_cache', None) else None,
+        "forecast_flights": app.forecast_flights.stats() if getattr(app, 'forecast_flights', None) else None,
+        "llm_scheduler": app.llm_scheduler.stats() if getattr(app, 'llm_scheduler', None) else None,
+        "warnings_indexed": len(app.warnings_index) if getattr(app, 'warnings_index', None) is not None else None,
+        "dataset_version": getattr(app, 'dataset_version', None),
+        "online_inference": app.predictor.stats() if getattr(app, 'predictor', None) else None,
         "timestamp": datetime.now().isoformat()
     }
 
+# Prometheus scrape endpoint
+@app.get("/metrics")
+async def metrics_endpoint():
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+# Re-detect the lookup plan and drop cached rows after predictions are re-ingested
+@app.post("/api/admin/reload")
+async def reload_predictions():
+    if Settings.SUPERVISOR_PID:
+        # One worker of serve.py: its supervisor re-snapshots the data and replaces every worker
+        os.kill(Settings.SUPERVISOR_PID, signal.SIGHUP)
+        logger.info(f"Asked supervisor {Settings.SUPERVISOR_PID} to replace the workers")
+        return {"status": "reloading", "supervisor": Settings.SUPERVISOR_PID}
+    if getattr(app, 'store', None) is None:
+        raise HTTPException(status_code=503, detail="Database connection is not available")
+    app.store.invalidate()
+    app.series_cache.clear()
+    await refresh_warnings_index()
+    return {"status": "reloaded", "storage_backend": Settings.STORAGE_BACKEND,
+            "storage_version": getattr(app.store, 'version', None)}
+
+@app.get("/api/warnings")
+async def list_warnings(
+    date_from: Optional[str] = Query(None, alias="from"),
+    date_to: Optional[str] = Query(None, alias="to"),
+    level: str = "minor",
+):
+    """Dates with disaster warnings of at least `level`, e.g. every severe day in the next 90 days"""
+    if level not in LEVELS:
+        raise HTTPException(status_code=400, detail=f"Invalid level. Use one of: {', '.join(LEVELS)}")
+    try:
+        for value in (date_from, date_to):
+            if value:
+                datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+    if getattr(app, 'warnings_index', None) is None:
+        raise HTTPException(status_code=503, detail="Warnings index is not available")
+    
+    days = app.warnings_index.query(date_from, date_to, level)
+    return {"from": date_from, "to": date_to, "level": level, "count": len(days), "days": days}
+
+@app.get("/api/series")
+async def get_series(
+    request: Request,
+    date_from: Optional[str] = Query(None, alias="from"),
+    date_to: Optional[str] = Query(None, alias="to"),
+    fields: Optional[str] = None,
+    granularity: Optional[str] = None,
+):
+    """Hourly, daily or weekly prediction series for a date range as columnar JSON, revalidated with ETag/If-None-Match"""
+    try:
+        field_list = parse_fields(fields)
+        level = parse_granularity(granularity)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        for value in (date_from, date_to):
+            if value:
+                datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+    if date_from and date_to and date_to < date_from:
+        raise HTTPException(status_code=400, detail="'to' must not be before 'from'")
+    if getattr(app, 'store', None) is None:
+        raise HTTPException(status_code=503, detail="Database connection is not available")
+    
+    headers = {"Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    version = series_version()
+    etag = series_etag(version, date_from or "", date_to or "", field_list, level) if version else None
+    found, cached = False, None
+    if etag:
+        headers["ETag"] = etag
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+        found, cached = app.series_cache.get(etag)
+    
+    if not found:
+        lower, upper = date_from or "0001-01-01", date_to or "9999-12-31"
+        with metrics.stage("db"):
+            if app.store.blocking_io:
+                date_keys, columns = await run_blocking(app.db_executor, app.store.get_range, lower, upper, field_list,
+                                                         level)
+            else:
+                date_keys, columns = app.store.get_range(lower, upper, field_list, level)
+        with metrics.stage("encode"):
+            body = encode_series(date_from, date_to, field_list, date_keys, columns, level)
+            cached = (body, compress(body))
+        if etag:
+            app.series_cache.set(etag, cached)
+    
+    body, gzipped = cached
+    if gzipped is not None and accepts_gzip(request.headers.get("accept-encoding")):
+        return Response(gzipped, media_type="application/json", headers={**headers, "Content-Encoding": "gzip"})
+    return Response(body, media_type="application/json", headers=headers)
+
 # Now mount static files - at a prefix that won't conflict with API routes
-frontend_path = os.path.join(os.path.dirname(BASE_DIR), "frontend")
+frontend_path = os.path.join(os.path.dirname(BASE_DIR), Settings.FRONTEND_DIR)
 
 # Create a specific route for file:// protocol access
 @app.get("/api")
 async def api_info():
     return {"message": "API is running. You can use /api/generate_forecast for weather forecasts."}
 
-# Mount frontend files
-app.mount("/", StaticFiles(directory=frontend_path, html=True), name="static")
\ No newline at end of file
+# Mount frontend files: fingerprinted and precompressed once, then served from memory
+app.mount("/", StaticAssets(AssetManifest(frontend_path)), name="static")
\ No newline at end of file
@@ -0,0 +1,288 @@
+import asyncio
+import json
+import random
+import threading
+import time
+import uuid
+from typing import Any, Dict, Iterable, List, Optional
+
+import pandas as pd
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from ingest import DEFAULT_CSV_PATH, iter_chunks
+from rollups import rollup_levels
+
+# Stand-ins used by benchmark.py so the API can be load-tested without MongoDB or network access
+
+
+class FakeCursor:
+    """Query result with the cursor methods MongoPredictionStore calls; sorting sees the unprojected documents"""
+
+    def __init__(self, documents: List[Dict[str, Any]], projection: Optional[Dict[str, int]] = None):
+        self.documents = list(documents)
+        self.projection = projection
+
+    def sort(self, field: str, direction: int = 1):
+        self.documents.sort(key=lambda document: document.get(field), reverse=direction < 0)
+        return self
+
+    def __iter__(self):
+        return (FakeCollection._project(document, self.projection) for document in self.documents)
+
+
+class FakeCollection:
+    """
+    In-process collection supporting the lookups of MongoPredictionStore:
+    equality, $in and $gte/$lte filters on one field, and projections.
+    Every call sleeps for `latency` seconds to stand in for the network
+    round trip (the API runs these calls on its DB executor).
+    """
+
+    def __init__(self, documents: Iterable[Dict[str, Any]] = (), latency: float = 0.0, name: str = "",
+                 database: "FakeDatabase" = None):
+        self.documents: List[Dict[str, Any]] = list(documents)
+        self.latency = latency
+        self.name = name
+        self.database = database
+        self._indexes: Dict[str, Dict[Any, Dict[str, Any]]] = {}
+        self.calls = 0
+
+    def _index(self, field: str) -> Dict[Any, Dict[str, Any]]:
+        index = self._indexes.get(field)
+        if index is None:
+            index = {document[field]: document for document in self.documents if field in document}
+            self._indexes[field] = index
+        return index
+
+    def _round_trip(self):
+        self.calls += 1
+        if self.latency > 0:
+            time.sleep(self.latency)
+
+    @staticmethod
+    def _project(document: Dict[str, Any], projection: Optional[Dict[str, int]]) -> Dict[str, Any]:
+        if not projection:
+            return dict(document)
+        if not any(projection.values()):
+            # Exclusion-only projection such as {"_id": 0}
+            return {key: value for key, value in document.items() if key not in projection}
+        return {key: document[key] for key, include in projection.items() if include and key in document}
+
+    def _match(self, filter: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        if not filter:
+            return self.documents
+        (field, condition), = filter.items()
+        index = self._index(field)
+        if isinstance(condition, dict) and "$in" in condition:
+            return [index[value] for value in condition["$in"] if value in index]
+        if isinstance(condition, dict):
+            lower, upper = condition.get("$gte"), condition.get("$lte")
+            return [document for value, document in index.items()
+                    if (lower is None or value >= lower) and (upper is None or value <= upper)]
+        document = index.get(condition)
+        return [document] if document is not None else []
+
+    def find_one(self, filter: Optional[Dict[str, Any]] = None, projection: Optional[Dict[str, int]] = None):
+        self._round_trip()
+        matches = self._match(filter)
+        return self._project(matches[0], projection) if matches else None
+
+    def find(self, filter: Optional[Dict[str, Any]] = None, projection: Optional[Dict[str, int]] = None) -> FakeCursor:
+        self._round_trip()
+        return FakeCursor(self._match(filter), projection)
+
+
+class FakeDatabase:
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.collections: Dict[str, FakeCollection] = {}
+
+    def __getitem__(self, name: str) -> FakeCollection:
+        if name not in self.collections:
+            self.collections[name] = FakeCollection(latency=self.latency, name=name, database=self)
+        return self.collections[name]
+
+    def list_collection_names(self) -> List[str]:
+        return list(self.collections)
+
+    def create_collection(self, name: str) -> FakeCollection:
+        return self[name]
+
+    def command(self, name: str, *args, **kwargs):
+        if self.latency > 0:
+            time.sleep(self.latency)
+        return {"ok": 1.0}
+
+
+class FakeAdmin:
+    def command(self, name: str, *args, **kwargs):
+        return {"ok": 1.0}
+
+
+class FakeMongoClient:
+    """Drop-in for pymongo.MongoClient as used by app.py, every database name maps to the same data"""
+
+    def __init__(self, db: FakeDatabase):
+        self.db = db
+        self.admin = FakeAdmin()
+
+    def __getitem__(self, name: str) -> FakeDatabase:
+        return self.db
+
+    def close(self):
+        pass
+
+
+def load_fake_database(csv_path: str = DEFAULT_CSV_PATH, collection: str = "chennai_weather",
+                       latency: float = 0.0) -> FakeDatabase:
+    """Fill a fake database from the predictions CSV the same way ingest.py fills MongoDB, rollups included"""
+    db = FakeDatabase(latency=latency)
+    pyramid = rollup_levels(pd.concat(list(iter_chunks(csv_path, chunk_size=1000)), ignore_index=True))
+    db[f"{collection}_hourly"].documents.extend(pyramid["hourly"].to_dict("records"))
+    db[collection].documents.extend(pyramid["daily"].to_dict("records"))
+    db[f"{collection}_weekly"].documents.extend(pyramid["weekly"].to_dict("records"))
+    return db
+
+
+# Completion text of the fake LLM: sentences cycled up to the length, then the warnings section
+FAKE_SENTENCES = [
+    "Skies stay mostly clear through the day.",
+    "A light breeze keeps the afternoon comfortable.",
+    "Humidity climbs a little towards the evening.",
+]
+FAKE_WARNINGS_PIECES = ["\n\nWeather", " Warnings:", "\nNo", " weather", " warnings", " for", " this", " date."]
+
+
+def fake_completion_pieces(tokens: int) -> List[str]:
+    """`tokens` streamed pieces of one word each, like a model overshooting its word target"""
+    words = " ".join(FAKE_SENTENCES).split()
+    body = max(tokens - len(FAKE_WARNINGS_PIECES), 1)
+    pieces = [words[position % len(words)] if position == 0 else " " + words[position % len(words)]
+              for position in range(body)]
+    return pieces + FAKE_WARNINGS_PIECES
+
+
+class FakeGroqServer:
+    """
+    Groq-compatible chat completions endpoint with a configurable latency
+    model: `latency` seconds to the first token, then `tokens_per_second`.
+    A fraction `error_rate` of calls fails with `error_status`. Completions
+    are as long as max_tokens less the slack prompts.py adds to it, so they
+    overshoot the requested word count the way real completions often do.
+    """
+
+    def __init__(self, latency: float = 0.3, tokens_per_second: float = 250.0, error_rate: float = 0.0,
+                 error_status: int = 500, seed: Optional[int] = None):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.random = random.Random(seed)
+        self.calls = 0
+        self.errors = 0
+        self.tokens_sent = 0
+        self.app = FastAPI()
+        self.app.post("/openai/v1/chat/completions")(self.chat_completions)
+
+    def completion_tokens(self, body: Dict[str, Any]) -> int:
+        max_tokens = int(body.get("max_tokens") or body.get("max_completion_tokens") or 1024)
+        return max(1, int(max_tokens / 1.2))
+
+    @staticmethod
+    def prompt_tokens(body: Dict[str, Any]) -> int:
+        return sum(len(str(message.get("content", ""))) for message in body.get("messages", [])) // 4
+
+    def token_delay(self) -> float:
+        return 1.0 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+
+    async def chat_completions(self, request: Request):
+        body = await request.json()
+        self.calls += 1
+        if self.error_rate > 0 and self.random.random() < self.error_rate:
+            self.errors += 1
+            await asyncio.sleep(self.latency)
+            return JSONResponse(
+                {"error": {"message": "Simulated upstream failure", "type": "bench_error"}},
+                status_code=self.error_status,
+                headers={"retry-after": "0"},
+            )
+
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+        model = body.get("model", "bench")
+        tokens = self.completion_tokens(body)
+        usage = {
+            "prompt_tokens": self.prompt_tokens(body),
+            "completion_tokens": tokens,
+            "total_tokens": self.prompt_tokens(body) + tokens,
+        }
+
+        if not body.get("stream"):
+            await asyncio.sleep(self.latency + tokens * self.token_delay())
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": "".join(fake_completion_pieces(tokens))},
+                    "finish_reason": "stop",
+                }],
+                "usage": usage,
+            }
+
+        async def chunks():
+            def chunk(delta, finish_reason=None, **extra):
+                payload = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                           "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}], **extra}
+                return f"data: {json.dumps(payload)}\n\n"
+
+            await asyncio.sleep(self.latency)
+            yield chunk({"role": "assistant", "content": ""})
+            for piece in fake_completion_pieces(tokens):
+                yield chunk({"content": piece})
+                self.tokens_sent += 1
+                await asyncio.sleep(self.token_delay())
+            yield chunk({}, "stop", x_groq={"id": completion_id, "usage": usage})
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(chunks(), media_type="text/event-stream")
+
+    def stats(self):
+        return {"calls": self.calls, "errors": self.errors, "tokens_sent": self.tokens_sent}
+
+
+class ServerThread:
+    """Run an ASGI app under uvicorn on a background thread with its own event loop"""
+
+    def __init__(self, app, host: str = "127.0.0.1", port: int = 0):
+        self.server = uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_level="warning"))
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_until_complete(self.server.serve())
+        self.loop.close()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.servers[0].sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    def start(self, timeout: float = 30.0):
+        self.thread.start()
+        deadline = time.monotonic() + timeout
+        while not self.server.started:
+            if not self.thread.is_alive() or time.monotonic() > deadline:
+                raise RuntimeError("Server failed to start")
+            time.sleep(0.01)
+        return self
+
+    def stop(self):
+        self.server.should_exit = True
+        self.thread.join(timeout=30.0)
@@ -0,0 +1,276 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import httpx
+import numpy as np
+
+from bench_fakes import FakeGroqServer, FakeMongoClient, ServerThread, load_fake_database
+from ingest import DEFAULT_CSV_PATH
+from warmup import STYLES, REPORT_LENGTHS
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_RESULTS_DIR = os.path.join(os.path.dirname(BASE_DIR), "data", "benchmarks")
+
+# Traffic mixes: share of requests for hot keys (a few popular date/style/length combinations,
+# served from the forecast cache once generated), cold keys (a new combination every time, always
+# an LLM call) and dates with no prediction row (404)
+MIXES = {
+    "hot": {"hot": 1.0},
+    "cold": {"cold": 1.0},
+    "missing": {"missing": 1.0},
+    "mixed": {"hot": 0.7, "cold": 0.2, "missing": 0.1},
+}
+
+# Per-request loggers of the API that would otherwise flood the benchmark output
+QUIET_LOGGERS = ["app", "prompts", "store", "llm_scheduler", "httpx", "groq"]
+
+
+def percentiles(samples: List[float]) -> Dict[str, Optional[float]]:
+    """p50/p95/p99/max/mean of latencies in seconds, reported in milliseconds"""
+    if not samples:
+        return {"p50": None, "p95": None, "p99": None, "max": None, "mean": None}
+    values = np.asarray(samples) * 1000.0
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"p50": round(float(p50), 2), "p95": round(float(p95), 2), "p99": round(float(p99), 2),
+            "max": round(float(values.max()), 2), "mean": round(float(values.mean()), 2)}
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return None
+
+
+class LoopLagMonitor:
+    """Measures how late the event loop wakes up from a short sleep, i.e. how long it was blocked"""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples: List[float] = []
+        self.running = True
+
+    async def run(self):
+        while self.running:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(time.perf_counter() - started - self.interval, 0.0))
+
+    def stop(self):
+        self.running = False
+
+
+class TrafficGenerator:
+    """Produces forecast request payloads for a traffic mix"""
+
+    def __init__(self, date_keys: List[str], mix: Dict[str, float], styles=STYLES, lengths=REPORT_LENGTHS,
+                 hot_keys: int = 20, seed: Optional[int] = None):
+        self.random = random.Random(seed)
+        self.kinds = list(mix)
+        self.weights = [mix[kind] for kind in self.kinds]
+        combinations = [(day, style, length) for day in date_keys for style in styles for length in lengths]
+        self.random.shuffle(combinations)
+        # A few popular (date, style, length) keys requested over and over, every other key at most once
+        self.hot = combinations[:hot_keys]
+        self.cold = combinations[hot_keys:]
+        self.styles = list(styles)
+        self.lengths = list(lengths)
+        self.missing_year = int(date_keys[-1][:4]) + 5 if date_keys else 2100
+
+    def next(self):
+        kind = self.random.choices(self.kinds, self.weights)[0]
+        if kind == "cold" and not self.cold:
+            # Every key was used, the rest of the run can only hit the cache
+            kind = "hot"
+        if kind == "missing":
+            day = f"{self.missing_year}-{self.random.randint(1, 12):02d}-{self.random.randint(1, 28):02d}"
+            style, length = self.random.choice(self.styles), self.random.choice(self.lengths)
+        elif kind == "cold":
+            day, style, length = self.cold.pop()
+        else:
+            day, style, length = self.random.choice(self.hot)
+        return kind, {"date": day, "style": style, "report_length": length}
+
+
+async def drive(url: str, traffic: TrafficGenerator, concurrency: int, duration: float, max_requests: int):
+    """Closed-loop load: `concurrency` clients send requests back to back until the duration or count is reached"""
+    samples = []
+    deadline = time.perf_counter() + duration
+    issued = 0
+
+    async def client_loop(client: httpx.AsyncClient):
+        nonlocal issued
+        while time.perf_counter() < deadline and (not max_requests or issued < max_requests):
+            issued += 1
+            kind, payload = traffic.next()
+            started = time.perf_counter()
+            try:
+                response = await client.post(url, json=payload)
+                status = response.status_code
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            samples.append((kind, status, time.perf_counter() - started))
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    started = time.perf_counter()
+    async with httpx.AsyncClient(timeout=120.0, limits=limits) as client:
+        await asyncio.gather(*(client_loop(client) for _ in range(concurrency)))
+    return samples, time.perf_counter() - started
+
+
+def summarize(samples, seconds: float, lag_samples: List[float]):
+    """Latency percentiles, throughput and status counts overall and per request kind"""
+    def status_counts(rows):
+        counts = {}
+        for _, status, _ in rows:
+            counts[str(status)] = counts.get(str(status), 0) + 1
+        return counts
+
+    by_kind = {}
+    for kind in sorted({kind for kind, _, _ in samples}):
+        rows = [sample for sample in samples if sample[0] == kind]
+        by_kind[kind] = {"requests": len(rows), "latency_ms": percentiles([latency for _, _, latency in rows]),
+                         "status": status_counts(rows)}
+    return {
+        "requests": len(samples),
+        "seconds": round(seconds, 3),
+        "requests_per_second": round(len(samples) / seconds, 2) if seconds > 0 else None,
+        "latency_ms": percentiles([latency for _, _, latency in samples]),
+        "status": status_counts(samples),
+        "by_kind": by_kind,
+        "event_loop_lag_ms": percentiles(lag_samples),
+    }
+
+
+def run_mix(app_module, db, groq_url: str, cache_dir: str, mix_name: str, args):
+    """Start the API against the stand-ins, drive one traffic mix and collect its results"""
+    # Each mix starts from an empty forecast cache and fresh executors
+    app_module.Settings.FORECAST_CACHE_PATH = os.path.join(cache_dir, f"{mix_name}.sqlite3")
+    app_module.MongoClient = lambda *a, **kw: FakeMongoClient(db)
+    os.environ["GROQ_BASE_URL"] = groq_url
+    server = ServerThread(app_module.app).start()
+    monitor = LoopLagMonitor(args.lag_interval)
+    lag_task = asyncio.run_coroutine_threadsafe(monitor.run(), server.loop)
+    try:
+        date_keys = sorted(document["date_key"] for document in db["chennai_weather"].documents)
+        traffic = TrafficGenerator(date_keys, MIXES[mix_name], styles=args.styles, lengths=args.lengths,
+                                   hot_keys=args.hot_keys, seed=args.seed)
+        samples, seconds = asyncio.run(drive(f"{server.url}/api/generate_forecast", traffic, args.concurrency,
+                                             args.duration, args.requests))
+        health = httpx.get(f"{server.url}/health", timeout=10.0).json()
+    finally:
+        monitor.stop()
+        lag_task.result(timeout=5.0)
+        server.stop()
+
+    result = summarize(samples, seconds, monitor.samples)
+    result["server"] = {key: health.get(key) for key in ("row_cache", "forecast_cache", "forecast_flights", "llm_scheduler")}
+    return result
+
+
+def compare(results: dict, baseline: dict):
+    """Log the change of each mix's headline numbers against a previous results file"""
+    for mix_name, result in results["mixes"].items():
+        previous = baseline.get("mixes", {}).get(mix_name)
+        if not previous:
+            continue
+        changes = []
+        for label, now, before in [
+            ("rps", result["requests_per_second"], previous["requests_per_second"]),
+            *((name, result["latency_ms"][name], previous["latency_ms"][name]) for name in ("p50", "p95", "p99")),
+        ]:
+            if now is not None and before:
+                changes.append(f"{label} {before} -> {now} ({(now - before) / before * 100:+.1f}%)")
+        logger.info(f"{mix_name} vs {baseline.get('commit')}: {', '.join(changes)}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Load-test /api/generate_forecast offline against in-process MongoDB and Groq stand-ins")
+    parser.add_argument("--csv", default=DEFAULT_CSV_PATH, help="Predictions CSV loaded into the MongoDB stand-in")
+    parser.add_argument("--mixes", nargs="+", default=["mixed"], choices=list(MIXES), help="Traffic mixes to run")
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent clients")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds per mix")
+    parser.add_argument("--requests", type=int, default=0, help="Stop a mix after this many requests (0: duration only)")
+    parser.add_argument("--styles", nargs="+", default=STYLES, choices=STYLES)
+    parser.add_argument("--lengths", nargs="+", type=int, default=REPORT_LENGTHS, help="Report lengths in words")
+    parser.add_argument("--hot-keys", type=int, default=20, help="Number of popular (date, style, length) keys in the hot traffic")
+    parser.add_argument("--mongo-latency-ms", type=float, default=1.0, help="Simulated MongoDB round trip")
+    parser.add_argument("--llm-latency-ms", type=float, default=300.0, help="Simulated time to the first token")
+    parser.add_argument("--llm-tokens-per-second", type=float, default=250.0, help="Simulated generation speed")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0, help="Fraction of LLM calls that fail")
+    parser.add_argument("--llm-error-status", type=int, default=500, help="HTTP status of failed LLM calls, e.g. 429")
+    parser.add_argument("--lag-interval-ms", dest="lag_interval", type=lambda value: float(value) / 1000.0, default=0.01,
+                        help="Sampling interval of the event loop lag probe")
+    parser.add_argument("--seed", type=int, default=1, help="Seed of the traffic and error generators")
+    parser.add_argument("--out", help="Results file (default: data/benchmarks/<timestamp>-<commit>.json)")
+    parser.add_argument("--baseline", help="Earlier results file to compare against")
+    parser.add_argument("--verbose", action="store_true", help="Keep the API's per-request logging")
+    args = parser.parse_args(argv)
+
+    # Settings are read when app.py is imported; rate limits are off unless set explicitly
+    os.environ.setdefault("GROQ_API_KEY", "bench")
+    os.environ.setdefault("GROQ_REQUESTS_PER_MINUTE", "0")
+    os.environ.setdefault("GROQ_TOKENS_PER_MINUTE", "0")
+    os.environ["STORAGE_BACKEND"] = "mongo"
+    import app as app_module
+    if not args.verbose:
+        for name in QUIET_LOGGERS:
+            logging.getLogger(name).setLevel(logging.ERROR)
+
+    db = load_fake_database(args.csv, latency=args.mongo_latency_ms / 1000.0)
+    groq = FakeGroqServer(latency=args.llm_latency_ms / 1000.0, tokens_per_second=args.llm_tokens_per_second,
+                          error_rate=args.llm_error_rate, error_status=args.llm_error_status, seed=args.seed)
+    groq_server = ServerThread(groq.app).start()
+    commit = git_commit()
+    results = {
+        "commit": commit,
+        "started": datetime.now().isoformat(),
+        "settings": {key: value for key, value in vars(args).items() if key not in ("out", "baseline", "verbose")},
+        "mixes": {},
+    }
+    try:
+        with tempfile.TemporaryDirectory() as cache_dir:
+            for mix_name in args.mixes:
+                logger.info(f"Running mix {mix_name!r} with {args.concurrency} clients")
+                result = run_mix(app_module, db, groq_server.url, cache_dir, mix_name, args)
+                results["mixes"][mix_name] = result
+                logger.info(
+                    f"{mix_name}: {result['requests']} requests, {result['requests_per_second']} req/s, "
+                    f"p50/p95/p99 {result['latency_ms']['p50']}/{result['latency_ms']['p95']}/{result['latency_ms']['p99']}ms, "
+                    f"loop lag p99 {result['event_loop_lag_ms']['p99']}ms, status {result['status']}"
+                )
+    finally:
+        groq_server.stop()
+    results["llm_stand_in"] = groq.stats()
+
+    out = args.out or os.path.join(
+        DEFAULT_RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{commit or 'unknown'}.json")
+    if os.path.dirname(out):
+        os.makedirs(os.path.dirname(out), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(results, f, indent=2)
+    logger.info(f"Wrote results to {out}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(results, json.load(f))
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import Executor
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Hashable, Iterable, List, Optional
+
+_END = object()
+
+
+async def run_blocking(executor: Executor, fn: Callable, *args, **kwargs) -> Any:
+    """
+    Run a blocking call on a bounded executor without holding up the event
+    loop. Like asyncio.to_thread, the call sees the caller's context
+    variables (e.g. the request's metrics).
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(executor, functools.partial(context.run, fn, *args, **kwargs))
+
+
+async def iterate_blocking(executor: Executor, iterable: Iterable) -> AsyncIterator:
+    """Consume a blocking iterator (e.g. a streamed completion) one item per executor hop"""
+    iterator = iter(iterable)
+    while True:
+        item = await run_blocking(executor, next, iterator, _END)
+        if item is _END:
+            return
+        yield item
+
+
+async def await_within(awaitable: Awaitable[Any], timeout: Optional[float]) -> Any:
+    """
+    Await for at most `timeout` seconds (no limit when None). On timeout
+    asyncio.TimeoutError is raised but, unlike asyncio.wait_for, the work is
+    not cancelled: it keeps running in the background, so e.g. a shared LLM
+    call still completes and fills the forecast cache.
+    """
+    if timeout is None:
+        return await awaitable
+    task = asyncio.ensure_future(awaitable)
+    done, _ = await asyncio.wait({task}, timeout=max(timeout, 0.0))
+    if not done:
+        # Nobody awaits the result any more, mark a late failure as retrieved
+        task.add_done_callback(lambda finished: finished.cancelled() or finished.exception())
+        raise asyncio.TimeoutError()
+    return task.result()
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls with the same key into one execution.
+    The first caller starts the work as a task; callers arriving while it
+    runs await the same task. A cancelled caller does not cancel the work
+    for the others.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+        self.started = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(functools.partial(self._finished, key))
+            self.started += 1
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _finished(self, key: Hashable, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Mark the exception as retrieved even if every caller went away
+        if not task.cancelled():
+            task.exception()
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    def stats(self):
+        return {"in_flight": len(self._calls), "started": self.started, "coalesced": self.coalesced}
+
+
+async def hedge(fn: Callable[[], Awaitable[Any]], delay: float, on_hedge: Callable[[], None] = None) -> Any:
+    """
+    Hedged call: if `fn()` has not finished after `delay` seconds, start a
+    second identical call and return whichever succeeds first, cancelling
+    the other. Fails only when both attempts fail. delay <= 0 disables
+    hedging.
+    """
+    first = asyncio.ensure_future(fn())
+    if delay <= 0:
+        return await first
+    attempts = [first]
+    try:
+        done, _ = await asyncio.wait(attempts, timeout=delay)
+        if not done:
+            if on_hedge is not None:
+                on_hedge()
+            attempts.append(asyncio.ensure_future(fn()))
+        pending = set(attempts)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+        # Every attempt failed, report the first failure
+        return first.result()
+    finally:
+        for task in attempts:
+            if not task.done():
+                task.cancel()
+
+
+class MicroBatcher:
+    """
+    Group concurrent submissions into batches. A key waits at most
+    `max_wait` seconds (or until `max_batch` distinct keys are waiting),
+    then `run_batch` is awaited once with every waiting key and must return
+    a key -> result mapping; keys it leaves out resolve to None. Batches run
+    one at a time, in order; identical keys in one batch share a result.
+    """
+
+    def __init__(self, run_batch: Callable[[List[Hashable]], Awaitable[Dict[Hashable, Any]]],
+                 max_wait: float = 0.01, max_batch: int = 64):
+        self.run_batch = run_batch
+        self.max_wait = max_wait
+        self.max_batch = max(max_batch, 1)
+        self._pending: Dict[Hashable, asyncio.Future] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._running = asyncio.Lock()
+        self.batches = 0
+        self.items = 0
+        self.largest = 0
+
+    async def submit(self, key: Hashable) -> Any:
+        future = self._pending.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self._pending[key] = loop.create_future()
+            if len(self._pending) >= self.max_batch:
+                self._flush()
+            elif self._timer is None:
+                self._timer = loop.call_later(self.max_wait, self._flush)
+        return await asyncio.shield(future)
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, {}
+        if batch:
+            asyncio.ensure_future(self._run(batch))
+
+    async def _run(self, batch: Dict[Hashable, asyncio.Future]):
+        async with self._running:
+            self.batches += 1
+            self.items += len(batch)
+            self.largest = max(self.largest, len(batch))
+            try:
+                results = await self.run_batch(list(batch))
+            except Exception as e:
+                for future in batch.values():
+                    if not future.done():
+                        future.set_exception(e)
+                return
+            for key, future in batch.items():
+                if not future.done():
+                    future.set_result(results.get(key))
+
+    def stats(self):
+        return {"pending": len(self._pending), "batches": self.batches, "items": self.items, "largest": self.largest}
@@ -1,272 +1,94 @@
-from pymongo import MongoClient
-from groq import Groq
 import os
-import logging
+from rules import DISASTER_THRESHOLDS
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
+# Settings only: importing this module must not open connections or call APIs
+# (the old forecast script now lives in generate.py)
 
 class Settings:
     MONGO_URI = "mongo_uri"
-    DB_NAME = "db_name"
+    DB_NAME = os.getenv("MONGODB_DB", "db_name")
     COLLECTION_NAME = "collection_name"
     GROQ_API_KEY = 'your_groq_api_key'
+    GROQ_MODEL = os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile")
     
-    # Updated disaster warning thresholds with lower values to detect even minor warnings
-    DISASTER_THRESHOLDS = {
-        "heavy_rain": 20.0,  # mm precipitation (lowered from 30.0)
-        "flood_risk": 40.0,  # mm precipitation (lowered from 50.0)
-        "severe_wind": 50.0,  # km/h wind speed (lowered from 60.0)
-        "high_wind": 30.0,   # km/h wind speed (new minor threshold)
-        "extreme_heat": 38.0, # °C (lowered from 40.0)
-        "hot_weather": 34.0,  # °C (new minor threshold)
-        "high_humidity": 80.0, # % (new threshold)
-        "cyclone_risk": 70.0, # km/h wind with heavy rain (lowered from 80.0)
-        "drought_risk": {
-            "max_temp": 33.0,  # °C (lowered from 35.0)
-            "max_humidity": 40.0,  # % (raised from 30.0 to be more sensitive)
-            "max_precipitation": 1.0,  # mm (raised from 0.5 to be more sensitive)
-        }
-    }
-
-def get_db():
-    """Creates database connection"""
-    try:
-        client = MongoClient(Settings.MONGO_URI, serverSelectionTimeoutMS=5000)
-        db = client[Settings.DB_NAME]
-        collection = db[Settings.COLLECTION_NAME]
-        return client, collection
-    except Exception as e:
-        logger.error(f"Database connection error: {e}")
-        raise
-
-# Initialize clients
-client_groq = Groq(api_key=Settings.GROQ_API_KEY)
-mongo_client, collection = get_db()
-
-def format_date(date_str: str) -> str:
-    """Format YYYY-MM-DD to include default time"""
-    return f"{date_str} 23:00:00+00:00"
-
-def check_mongo_connection():
-    """Check if MongoDB connection is alive and reconnect if needed"""
-    global mongo_client, collection
-    try:
-        if mongo_client is None or not mongo_client.is_primary:
-            logger.warning("MongoDB connection lost, attempting to reconnect...")
-            mongo_client, collection = get_db()
-        return mongo_client is not None
-    except:
-        return False
-
-def format_date_with_default_time(date_str: str) -> str:
-    """Add default time to YYYY-MM-DD date format"""
-    return f"{date_str} 23:00:00+00:00"
-
-# Update how we get weather data
-def get_weather_data(date_str: str):
-    """Get weather data for a specific date"""
-    query_date = format_date_with_default_time(date_str)
-    return collection.find_one({"date": query_date}, {"_id": 0})
-
-def detect_disaster_warnings(weather_data):
-    """
-    Applies rule-based filtering to detect potential disaster conditions
-    Returns a dictionary with disaster types and severity levels
-    """
-    if not weather_data:
-        return {}
+    # Prediction storage backend: "mongo" or "columnar" (memory-mapped files built by ingest.py)
+    STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "mongo")
+    COLUMNAR_STORE_PATH = os.getenv(
+        "COLUMNAR_STORE_PATH",
+        os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "lstm_predictions", "predictions_store"),
+    )
     
-    warnings = {}
-    thresholds = Settings.DISASTER_THRESHOLDS
+    # Read-through row cache in front of MongoDB (misses are cached for the shorter TTL)
+    ROW_CACHE_SIZE = int(os.getenv("ROW_CACHE_SIZE", "1024"))
+    ROW_CACHE_TTL_SECONDS = float(os.getenv("ROW_CACHE_TTL_SECONDS", "300"))
+    ROW_CACHE_NEGATIVE_TTL_SECONDS = float(os.getenv("ROW_CACHE_NEGATIVE_TTL_SECONDS", "30"))
     
-    # Check for heavy rain and flooding
-    precipitation = float(weather_data.get('precipitation', 0))
-    if precipitation >= thresholds["flood_risk"]:
-        warnings["flood"] = {
-            "level": "severe",
-            "message": f"SEVERE FLOOD RISK: Extreme precipitation of {precipitation}mm expected."
-        }
-    elif precipitation >= thresholds["heavy_rain"]:
-        warnings["flood"] = {
-            "level": "moderate",
-            "message": f"FLOOD WATCH: Heavy rainfall of {precipitation}mm expected."
-        }
-    elif precipitation >= 10.0:  # Even minor rain warning
-        warnings["rain"] = {
-            "level": "minor",
-            "message": f"Moderate rainfall of {precipitation}mm expected."
-        }
+    # Online inference for dates past the stored predictions: the LSTM under MODEL_DIR continues the
+    # stored trajectory, requests arriving within INFERENCE_MAX_WAIT_MS (or INFERENCE_MAX_BATCH of
+    # them) share one rollout, and no more than INFERENCE_MAX_DAYS past the last stored day are served
+    ONLINE_INFERENCE_ENABLED = os.getenv("ONLINE_INFERENCE_ENABLED", "true").lower() == "true"
+    MODEL_DIR = os.getenv(
+        "MODEL_DIR",
+        os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "lstm_predictions", "model"),
+    )
+    INFERENCE_MAX_WAIT_MS = float(os.getenv("INFERENCE_MAX_WAIT_MS", "10"))
+    INFERENCE_MAX_BATCH = int(os.getenv("INFERENCE_MAX_BATCH", "64"))
+    INFERENCE_MAX_DAYS = int(os.getenv("INFERENCE_MAX_DAYS", "365"))
     
-    # Check for wind conditions
-    wind_speed = float(weather_data.get('wind_speed_10m', 0))
-    wind_gusts = float(weather_data.get('wind_gusts_10m', 0))
-    max_wind = max(wind_speed, wind_gusts)
+    # Concurrency limits: executor threads for the synchronous MongoDB/SQLite and Groq clients,
+    # and the number of LLM calls allowed in flight at once
+    DB_EXECUTOR_WORKERS = int(os.getenv("DB_EXECUTOR_WORKERS", "8"))
+    LLM_EXECUTOR_WORKERS = int(os.getenv("LLM_EXECUTOR_WORKERS", "16"))
+    LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
     
-    if max_wind >= thresholds["severe_wind"]:
-        warnings["wind"] = {
-            "level": "severe",
-            "message": f"SEVERE WIND WARNING: Wind speeds up to {max_wind}km/h expected."
-        }
-    elif max_wind >= thresholds["high_wind"]:
-        warnings["wind"] = {
-            "level": "moderate",
-            "message": f"WIND ADVISORY: Strong winds up to {max_wind}km/h expected."
-        }
-    elif max_wind >= 20.0:  # Even light wind warning
-        warnings["wind"] = {
-            "level": "minor",
-            "message": f"Breezy conditions with winds up to {max_wind}km/h expected."
-        }
+    # Groq rate limits enforced client-side (0 disables a limit); 429 responses are retried with backoff
+    GROQ_REQUESTS_PER_MINUTE = float(os.getenv("GROQ_REQUESTS_PER_MINUTE", "30"))
+    GROQ_TOKENS_PER_MINUTE = float(os.getenv("GROQ_TOKENS_PER_MINUTE", "12000"))
+    LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
     
-    # Check for temperature conditions
-    temperature = float(weather_data.get('temperature_2m', 0))
-    if temperature >= thresholds["extreme_heat"]:
-        warnings["heat"] = {
-            "level": "severe",
-            "message": f"EXTREME HEAT WARNING: Temperatures reaching {temperature}°C expected."
-        }
-    elif temperature >= thresholds["hot_weather"]:
-        warnings["heat"] = {
-            "level": "moderate",
-            "message": f"HEAT ADVISORY: Hot weather with temperatures of {temperature}°C expected."
-        }
-    elif temperature >= 30.0:  # Even warm weather
-        warnings["heat"] = {
-            "level": "minor",
-            "message": f"Warm weather with temperatures of {temperature}°C expected."
-        }
-    elif temperature <= 10.0:  # Cold weather
-        warnings["cold"] = {
-            "level": "minor",
-            "message": f"Cool conditions with temperatures of {temperature}°C expected."
-        }
+    # Latency budget of /api/generate_forecast: past it a template forecast is served while the LLM
+    # call finishes in the background and fills the cache (0 waits for the LLM, as before)
+    FORECAST_LATENCY_BUDGET_MS = float(os.getenv("FORECAST_LATENCY_BUDGET_MS", "0"))
+    # End LLM streams once the body reaches report_length words (plus LENGTH_GOVERNOR_SLACK of it to
+    # finish the sentence) and the warnings section is written, instead of running to max_tokens
+    LENGTH_GOVERNOR_ENABLED = os.getenv("LENGTH_GOVERNOR_ENABLED", "true").lower() == "true"
+    LENGTH_GOVERNOR_SLACK = float(os.getenv("LENGTH_GOVERNOR_SLACK", "0.1"))
+    # Start a second, hedged LLM call when the first has not answered after this long (0 disables)
+    LLM_HEDGE_AFTER_MS = float(os.getenv("LLM_HEDGE_AFTER_MS", "0"))
     
-    # Check for humidity conditions
-    humidity = float(weather_data.get('relative_humidity_2m', 50))
-    if humidity >= thresholds["high_humidity"]:
-        warnings["humidity"] = {
-            "level": "moderate",
-            "message": f"HIGH HUMIDITY: Uncomfortable conditions with humidity at {humidity}%."
-        }
-    elif humidity >= 70.0:  # Even moderate humidity
-        warnings["humidity"] = {
-            "level": "minor",
-            "message": f"Moderately humid conditions ({humidity}%) may cause discomfort."
-        }
+    # Encoded /api/series responses kept in memory (entries are keyed on the dataset version)
+    SERIES_CACHE_SIZE = int(os.getenv("SERIES_CACHE_SIZE", "256"))
+    SERIES_CACHE_TTL_SECONDS = float(os.getenv("SERIES_CACHE_TTL_SECONDS", "3600"))
     
-    # Check for cyclone conditions (high winds + rain)
-    if max_wind >= thresholds["cyclone_risk"] and precipitation >= thresholds["heavy_rain"]:
-        warnings["cyclone"] = {
-            "level": "severe",
-            "message": f"CYCLONE WARNING: High winds ({max_wind}km/h) with heavy rainfall ({precipitation}mm)."
-        }
-    elif max_wind >= 40.0 and precipitation >= 15.0:  # Even moderate storm
-        warnings["storm"] = {
-            "level": "moderate",
-            "message": f"STORM CONDITIONS: Moderate winds ({max_wind}km/h) with rainfall ({precipitation}mm)."
-        }
+    # Largest number of dates accepted by the batch forecast endpoint, and by one generate.py run
+    BATCH_MAX_DATES = int(os.getenv("BATCH_MAX_DATES", "62"))
+    GENERATE_MAX_DATES = int(os.getenv("GENERATE_MAX_DATES", "366"))
     
-    # Check for drought conditions
-    drought_threshold = thresholds["drought_risk"]
-    if (temperature >= drought_threshold["max_temp"] and 
-        humidity <= drought_threshold["max_humidity"] and 
-        precipitation <= drought_threshold["max_precipitation"]):
-        warnings["drought"] = {
-            "level": "moderate",
-            "message": f"DROUGHT CONDITIONS: High temperature ({temperature}°C), low humidity ({humidity}%), minimal precipitation."
-        }
+    # Generated forecast cache: in-memory LRU in front of a SQLite file that survives restarts
+    FORECAST_CACHE_ENABLED = os.getenv("FORECAST_CACHE_ENABLED", "true").lower() == "true"
+    FORECAST_CACHE_PATH = os.getenv(
+        "FORECAST_CACHE_PATH",
+        os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "forecast_cache.sqlite3"),
+    )
+    FORECAST_CACHE_MEMORY_SIZE = int(os.getenv("FORECAST_CACHE_MEMORY_SIZE", "512"))
+    FORECAST_CACHE_MAX_KEYS = int(os.getenv("FORECAST_CACHE_MAX_KEYS", "10000"))
+    FORECAST_CACHE_TTL_SECONDS = float(os.getenv("FORECAST_CACHE_TTL_SECONDS", str(7 * 86400)))
+    # Generations kept per key for the "balanced" style, rotated to keep its variety
+    FORECAST_CACHE_VARIANTS = int(os.getenv("FORECAST_CACHE_VARIANTS", "1"))
+    # Worker processes sharing FORECAST_CACHE_PATH let one of them call the LLM per forecast: the others
+    # wait up to FORECAST_LEASE_SECONDS for its result, checking every FORECAST_LEASE_POLL_MS (0 disables)
+    FORECAST_LEASE_SECONDS = float(os.getenv("FORECAST_LEASE_SECONDS", "60"))
+    FORECAST_LEASE_POLL_MS = float(os.getenv("FORECAST_LEASE_POLL_MS", "100"))
     
-    # Check for cloudiness if relevant
-    cloud_cover = float(weather_data.get('cloud_cover', 0))
-    if cloud_cover >= 80:
-        warnings["clouds"] = {
-            "level": "minor",
-            "message": f"OVERCAST CONDITIONS: Heavy cloud cover ({cloud_cover}%) expected."
-        }
+    # serve.py: API worker processes forked from one preloaded parent, and where it puts the shared
+    # snapshot of the MongoDB predictions (tmpfs, so the workers map one copy of the data)
+    WORKERS = int(os.getenv("WORKERS", "1"))
+    SHARED_SNAPSHOT_DIR = os.getenv("SHARED_SNAPSHOT_DIR", "/dev/shm")
+    # Set by serve.py before it forks: /api/admin/reload then has the parent replace every worker
+    SUPERVISOR_PID = None
     
-    # Check pressure for potential weather changes
-    pressure = float(weather_data.get('pressure_msl', 1013.25))
-    if pressure < 1000:
-        warnings["pressure"] = {
-            "level": "minor",
-            "message": f"LOW PRESSURE SYSTEM: Atmospheric pressure of {pressure}hPa may lead to unsettled weather."
-        }
-    elif pressure > 1025:
-        warnings["pressure"] = {
-            "level": "minor",
-            "message": f"HIGH PRESSURE SYSTEM: Atmospheric pressure of {pressure}hPa indicating stable conditions."
-        }
-        
-    return warnings
-
-# Define the target date (ensure format matches your MongoDB storage format)
-target_date = "2025-02-28"
-
-# Retrieve weather data from MongoDB
-if not check_mongo_connection():
-    print("Failed to connect to MongoDB.")
-    exit()
-
-weather_data = get_weather_data(target_date)
-
-if not weather_data:
-    print(f"No weather data found for {target_date}.")
-    exit()
-
-# Detect disaster warnings
-disaster_warnings = detect_disaster_warnings(weather_data)
-
-# Construct the dynamic prompt
-prompt = f"""
-Generate a **full-day weather forecast** for {target_date} based on the following data.
-Do not mention "today" or "tomorrow"—just focus on the future weather for this date.
-
-Vary the summary format every time. Sometimes make it **detailed and scientific**, 
-other times **casual and conversational**, or even **like a weather reporter's broadcast**. 
-Make sure the response feels **unique, natural, and engaging** each time.
-
-Here is the predicted weather data:
-
-- **Temperature:** {weather_data['temperature_2m']}°C (Feels like {weather_data['apparent_temperature']}°C)
-- **Humidity:** {weather_data['relative_humidity_2m']}%
-- **Dew Point:** {weather_data['dew_point_2m']}°C
-- **Precipitation:** {weather_data['precipitation']} mm (Rain: {weather_data['rain']} mm, Snowfall: {weather_data['snowfall']} mm)
-- **Snow Depth:** {weather_data['snow_depth']} mm
-- **Atmospheric Pressure:** {weather_data['pressure_msl']} hPa (Surface Pressure: {weather_data['surface_pressure']} hPa)
-- **Cloud Cover:** {weather_data['cloud_cover']}% (Low: {weather_data['cloud_cover_low']}%, Mid: {weather_data['cloud_cover_mid']}%, High: {weather_data['cloud_cover_high']}%)
-- **Wind Speed:** {weather_data['wind_speed_10m']} km/h at 10m, {weather_data['wind_speed_100m']} km/h at 100m
-- **Wind Direction:** {weather_data['wind_direction_10m']}° at 10m, {weather_data['wind_direction_100m']}° at 100m
-- **Wind Gusts:** {weather_data['wind_gusts_10m']} km/h
-
-Make sure the response is **not boring** and feels like a real forecast.
-"""
-
-# Include disaster warnings in the prompt if any
-if disaster_warnings:
-    prompt += "\n\nDisaster Warnings:\n"
-    for warning_type, warning_details in disaster_warnings.items():
-        prompt += f"- **{warning_type.capitalize()}** ({warning_details['level']}): {warning_details['message']}\n"
-
-# Send the prompt to Groq's LLM
-completion = client_groq.chat.completions.create(
-    model="meta-llama/llama-4-scout-17b-16e-instruct",
-    messages=[{"role": "user", "content": prompt}],
-    temperature=1,
-    max_completion_tokens=1024,
-    top_p=1,
-    stream=True
-)
-
-# Stream the response properly
-print("\n📡 Future Weather Forecast:\n")
-for chunk in completion:
-    if hasattr(chunk, "choices") and chunk.choices:  # Ensure chunk has choices
-        content = chunk.choices[0].delta.content
-        if content:  # Avoid printing None or empty content
-            print(content, end="", flush=True)
-
-# Close MongoDB connection
-if mongo_client:
-    mongo_client.close()
+    # Frontend served at / ("frontend" or "frontend_prod_level"), fingerprinted and precompressed at startup
+    FRONTEND_DIR = os.getenv("FRONTEND_DIR", "frontend")
+    
+    # Disaster warning thresholds, defined with the rules in rules.py
+    DISASTER_THRESHOLDS = DISASTER_THRESHOLDS
@@ -0,0 +1,238 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from cache import LRUCache
+from config import Settings
+
+logger = logging.getLogger(__name__)
+
+# Hits only note the access time in memory; it is written to the file at most this often
+# (or with the next write), so reads never take the SQLite write lock shared by the workers
+TOUCH_FLUSH_SECONDS = 30.0
+
+
+def row_hash(weather_data: Dict[str, Any]) -> str:
+    """Stable hash of a prediction row, so re-ingested data never serves stale text"""
+    payload = json.dumps(weather_data, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def forecast_variants(style: str) -> int:
+    """Generations cached per key; only the "balanced" style is meant to vary between calls"""
+    return max(Settings.FORECAST_CACHE_VARIANTS, 1) if style == "balanced" else 1
+
+
+def forecast_cache_key(date: str, style: str, report_length: int, weather_data: Dict[str, Any],
+                       prompt_version: str, model: str) -> str:
+    """Cache key for one generated forecast"""
+    parts = [date, style, str(report_length), row_hash(weather_data), prompt_version, model]
+    return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()
+
+
+class SQLiteForecastStore:
+    """
+    Persistent forecast tier that survives restarts, evicting least recently
+    used keys. The file is opened in WAL mode, so several API processes can
+    share it: readers never block the writer, and generation leases let one
+    process call the LLM for a key while the others wait for its result.
+    Access times of hits are batched (see TOUCH_FLUSH_SECONDS), so eviction
+    order lags reads by up to that long.
+    """
+
+    def __init__(self, path: str, max_keys: int = 10000, ttl: float = 7 * 86400.0,
+                 touch_interval: float = TOUCH_FLUSH_SECONDS):
+        self.path = path
+        self.max_keys = max_keys
+        self.ttl = ttl
+        self.touch_interval = touch_interval
+        self.evictions = 0
+        self._touched: Dict[str, float] = {}  # key -> access time not yet written
+        self._flushed = time.monotonic()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS forecasts ("
+            " key TEXT NOT NULL, variant INTEGER NOT NULL, forecast TEXT NOT NULL,"
+            " created REAL NOT NULL, accessed REAL NOT NULL, PRIMARY KEY (key, variant))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS forecasts_accessed ON forecasts (accessed)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS leases (key TEXT PRIMARY KEY, owner TEXT NOT NULL, expires REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> List[str]:
+        now = time.time()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT forecast FROM forecasts WHERE key = ? AND created >= ? ORDER BY variant",
+                (key, now - self.ttl),
+            ).fetchall()
+            if rows:
+                self._touched[key] = now
+                if time.monotonic() - self._flushed >= self.touch_interval:
+                    self._flush_touches()
+                    self._conn.commit()
+        return [row[0] for row in rows]
+
+    def _flush_touches(self):
+        if self._touched:
+            self._conn.executemany("UPDATE forecasts SET accessed = MAX(accessed, ?) WHERE key = ?",
+                                   [(accessed, key) for key, accessed in self._touched.items()])
+            self._touched.clear()
+        self._flushed = time.monotonic()
+
+    def add(self, key: str, variant: int, forecast: str):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO forecasts (key, variant, forecast, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, variant, forecast, now, now),
+            )
+            # Pending access times ride along with the write, before eviction reads them
+            self._flush_touches()
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float):
+        cursor = self._conn.execute("DELETE FROM forecasts WHERE created < ?", (now - self.ttl,))
+        self.evictions += cursor.rowcount
+        (keys,) = self._conn.execute("SELECT COUNT(DISTINCT key) FROM forecasts").fetchone()
+        if keys > self.max_keys:
+            cursor = self._conn.execute(
+                "DELETE FROM forecasts WHERE key IN ("
+                " SELECT key FROM forecasts GROUP BY key ORDER BY MAX(accessed) LIMIT ?)",
+                (keys - self.max_keys,),
+            )
+            self.evictions += cursor.rowcount
+
+    def claim(self, key: str, owner: str, ttl: float) -> bool:
+        """Take the generation lease of `key` unless another live owner holds it"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("DELETE FROM leases WHERE key = ? AND expires < ?", (key, now))
+            cursor = self._conn.execute("INSERT OR IGNORE INTO leases (key, owner, expires) VALUES (?, ?, ?)",
+                                        (key, owner, now + ttl))
+            self._conn.commit()
+        return cursor.rowcount == 1
+
+    def release(self, key: str, owner: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM leases WHERE key = ? AND owner = ?", (key, owner))
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._touched.clear()
+            self._conn.execute("DELETE FROM forecasts")
+            self._conn.execute("DELETE FROM leases")
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._flush_touches()
+            self._conn.commit()
+            self._conn.close()
+
+
+class ForecastCache:
+    """
+    Two-tier cache of generated forecasts: an in-memory LRU in front of a
+    persistent SQLite store. A key may hold several variants; once all
+    variants are generated, lookups rotate among them.
+    """
+
+    def __init__(self, memory_size: int = 512, ttl: float = 7 * 86400.0, path: Optional[str] = None,
+                 max_keys: int = 10000):
+        self.memory = LRUCache(max_size=memory_size, ttl=ttl)
+        self.disk = SQLiteForecastStore(path, max_keys=max_keys, ttl=ttl) if path else None
+        self._rotation = {}
+        self._lock = threading.Lock()
+        # Lease owner id, unique per process (the cache is created after serve.py forks the workers)
+        self.owner = f"{os.getpid()}-{id(self):x}"
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _variants(self, key: str, count: bool = True, wanted: int = 1) -> List[str]:
+        found, variants = self.memory.get(key)
+        # Another process sharing the disk tier may have added variants since they were cached here
+        if found and (len(variants) >= wanted or not self.disk):
+            if count:
+                self.memory_hits += 1
+            return variants
+        variants = self.disk.get(key) if self.disk else []
+        if variants:
+            if count:
+                self.disk_hits += 1
+            self.memory.set(key, variants)
+        return variants
+
+    def get(self, key: str, variants: int = 1) -> Optional[str]:
+        """Return a cached forecast, or None while fewer than `variants` generations exist"""
+        cached = self._variants(key, wanted=max(variants, 1))
+        if len(cached) < max(variants, 1):
+            self.misses += 1
+            return None
+        if len(cached) == 1:
+            return cached[0]
+        with self._lock:
+            turn = self._rotation.get(key, 0)
+            self._rotation[key] = turn + 1
+        return cached[turn % len(cached)]
+
+    def put(self, key: str, forecast: str, variants: int = 1):
+        """Store a new generation, replacing the oldest variant once the key is full"""
+        cached = list(self._variants(key, count=False))
+        variant = len(cached)
+        if variant >= max(variants, 1):
+            with self._lock:
+                variant = self._rotation.get(key, 0) % len(cached)
+            cached[variant] = forecast
+        else:
+            cached.append(forecast)
+        self.memory.set(key, cached)
+        if self.disk:
+            self.disk.add(key, variant, forecast)
+
+    def claim(self, key: str, ttl: float) -> bool:
+        """
+        Take the cross-process generation lease of `key`; False while another
+        process holds it. Always True without a disk tier.
+        """
+        return self.disk.claim(key, self.owner, ttl) if self.disk else True
+
+    def release(self, key: str):
+        if self.disk:
+            self.disk.release(key, self.owner)
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk:
+            self.disk.clear()
+        with self._lock:
+            self._rotation.clear()
+
+    def close(self):
+        if self.disk:
+            self.disk.close()
+
+    def stats(self):
+        return {
+            "memory": self.memory.stats(),
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "disk_evictions": self.disk.evictions if self.disk else 0,
+        }
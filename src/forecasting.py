@@ -0,0 +1,113 @@
+import logging
+import time
+from typing import Iterable, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Sequence length the Chennai LSTM was trained with (one week of hourly rows)
+SEQUENCE_LENGTH = 168
+
+# Columns allowed to go negative; everything else is clipped at zero
+SIGNED_COLUMNS = ("temperature_2m",)
+
+
+def clip_floor(columns: Sequence[str], signed_columns: Iterable[str] = SIGNED_COLUMNS) -> np.ndarray:
+    """Per-feature lower bound: 0 for clipped columns, -inf for the signed ones"""
+    signed = set(signed_columns)
+    return np.array([-np.inf if column in signed else 0.0 for column in columns], dtype=np.float32)
+
+
+class RolloutEngine:
+    """
+    Autoregressive rollout of a one-step sequence model.
+    The model is called through a tf.function traced once for a fixed input
+    signature instead of model.predict per step. Each rollout keeps its
+    window in a doubled ring buffer: a new step is written at `pos` and
+    `pos + length`, so the current window is always the contiguous slice
+    buf[pos + 1:pos + 1 + length] and nothing is shifted. Several rollouts
+    (ensemble members, scenarios) advance together as one batch.
+    With jit_compile the step is compiled by XLA, which on CPU is several
+    times faster than the plain graph for the stacked LSTM.
+    """
+
+    def __init__(self, model, floor: Optional[np.ndarray] = None, sequence_length: Optional[int] = None,
+                 n_features: Optional[int] = None, jit_compile: bool = True):
+        import tensorflow as tf
+
+        self.model = model
+        input_shape = getattr(model, "input_shape", None) or (None, None, None)
+        self.sequence_length = sequence_length or input_shape[1]
+        self.n_features = n_features or input_shape[2]
+        if not self.sequence_length or not self.n_features:
+            raise ValueError("sequence_length and n_features are required when the model has no input_shape")
+        self.floor = None if floor is None else np.asarray(floor, dtype=np.float32)
+        self.last_report = None
+
+        signature = [tf.TensorSpec([None, self.sequence_length, self.n_features], tf.float32)]
+        self._step = tf.function(lambda window: model(window, training=False),
+                                 input_signature=signature, jit_compile=jit_compile)
+
+    def rollout(self, windows: np.ndarray, steps: int) -> np.ndarray:
+        """
+        Roll `windows` (length x features, or members x length x features)
+        forward `steps` steps. Returns members x steps x features, or
+        steps x features for a single window.
+        """
+        windows = np.asarray(windows, dtype=np.float32)
+        single = windows.ndim == 2
+        if single:
+            windows = windows[np.newaxis]
+        members, length, features = windows.shape
+        if (length, features) != (self.sequence_length, self.n_features):
+            raise ValueError(f"Expected windows of shape ({self.sequence_length}, {self.n_features}), got ({length}, {features})")
+
+        buffer = np.empty((members, 2 * length, features), dtype=np.float32)
+        buffer[:, :length] = windows
+        buffer[:, length:] = windows
+        outputs = np.empty((members, steps, features), dtype=np.float32)
+
+        started = time.perf_counter()
+        pos = length - 1
+        for step in range(steps):
+            pred = self._step(buffer[:, pos + 1:pos + 1 + length]).numpy()
+            if self.floor is not None:
+                np.maximum(pred, self.floor, out=pred)
+            outputs[:, step] = pred
+            pos = (pos + 1) % length
+            buffer[:, pos] = pred
+            buffer[:, pos + length] = pred
+        seconds = time.perf_counter() - started
+
+        self.last_report = {
+            "members": members,
+            "steps": steps,
+            "seconds": round(seconds, 3),
+            "steps_per_second": round(steps / seconds, 1) if seconds else None,
+            "member_steps_per_second": round(members * steps / seconds, 1) if seconds else None,
+        }
+        logger.info(f"Rollout of {members} x {steps} steps in {seconds:.2f}s "
+                    f"({self.last_report['steps_per_second']} steps/s)")
+        return outputs[0] if single else outputs
+
+
+def predictions_frame(scaled: np.ndarray, scaler, columns: Sequence[str], start_date, freq: str = "D",
+                      signed_columns: Iterable[str] = SIGNED_COLUMNS):
+    """Scaled rollout output (steps x features) as a DataFrame in original units with a date column"""
+    import pandas as pd
+
+    values = scaler.inverse_transform(np.asarray(scaled, dtype=np.float64))
+    # Inverse scaling can push clipped columns slightly below zero again
+    np.maximum(values, clip_floor(columns, signed_columns).astype(np.float64), out=values)
+    frame = pd.DataFrame(values, columns=list(columns))
+    frame.insert(0, "date", pd.date_range(start=start_date, periods=len(frame), freq=freq))
+    return frame
+
+
+def predict_future_weather_extended(model, scaler, last_window: np.ndarray, columns: Sequence[str], start_date,
+                                    days: int = 730, engine: Optional[RolloutEngine] = None):
+    """Drop-in replacement for the notebook function: roll the last window forward `days` steps"""
+    engine = engine or RolloutEngine(model, floor=clip_floor(columns))
+    scaled = engine.rollout(last_window, days)
+    return predictions_frame(scaled, scaler, columns, start_date)
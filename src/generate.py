@@ -0,0 +1,216 @@
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import List
+
+from groq import Groq
+
+from concurrency import run_blocking
+from config import Settings
+from forecast_cache import ForecastCache, forecast_cache_key, forecast_variants
+from length_governor import LengthGovernor, governed_stream
+from llm_scheduler import LLMScheduler
+from prompts import PROMPT_VERSION, build_prompt
+from store import ColumnarPredictionStore, MongoPredictionStore
+from warmup import STYLES
+from warnings_engine import evaluate_rows
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def expand_dates(dates: List[str], date_from: str = None, date_to: str = None, max_dates: int = 0) -> List[str]:
+    """
+    Unique YYYY-MM-DD dates from an explicit list and/or an inclusive range.
+    Raises ValueError on a bad date, a reversed range or more than
+    `max_dates` dates (0: no limit), each date being one LLM call.
+    """
+    try:
+        days = [datetime.strptime(value, "%Y-%m-%d") for value in dates or []]
+        start = datetime.strptime(date_from or date_to, "%Y-%m-%d") if date_from or date_to else None
+        end = datetime.strptime(date_to or date_from, "%Y-%m-%d") if date_from or date_to else None
+    except ValueError:
+        raise ValueError("Invalid date format. Use YYYY-MM-DD")
+    too_many = f"At most {max_dates} dates per run (GENERATE_MAX_DATES or --max-dates)"
+    if start is not None:
+        if end < start:
+            raise ValueError("--to must not be before --from")
+        # Check the size before expanding, like the batch endpoint
+        if max_dates and (end - start).days + 1 > max_dates:
+            raise ValueError(too_many)
+        days.extend(start + timedelta(days=offset) for offset in range((end - start).days + 1))
+    date_keys = list(dict.fromkeys(day.strftime("%Y-%m-%d") for day in days))
+    if max_dates and len(date_keys) > max_dates:
+        raise ValueError(too_many)
+    return date_keys
+
+
+def open_store(backend: str):
+    """Open the prediction store the API would use, returning (store, client to close)"""
+    if backend == "columnar":
+        return ColumnarPredictionStore(Settings.COLUMNAR_STORE_PATH), None
+    from pymongo import MongoClient
+
+    client = MongoClient(os.getenv("MONGODB_URI", Settings.MONGO_URI), serverSelectionTimeoutMS=5000)
+    return MongoPredictionStore(client[Settings.DB_NAME]), client
+
+
+class ForecastWriter:
+    """
+    Streams forecast text as it arrives: into <out>/<date>.txt when an output
+    directory is given, and to stdout. With one worker tokens are printed
+    live; with several, each forecast is printed whole once it is complete
+    so the outputs do not interleave.
+    """
+
+    def __init__(self, out_dir: str = None, live: bool = True):
+        self.out_dir = out_dir
+        self.live = live
+        if out_dir:
+            os.makedirs(out_dir, exist_ok=True)
+
+    def open(self, date_key: str):
+        return _ForecastOutput(self, date_key)
+
+
+class _ForecastOutput:
+    def __init__(self, writer: ForecastWriter, date_key: str):
+        self.writer = writer
+        self.date_key = date_key
+        self.parts = []
+        self.file = open(os.path.join(writer.out_dir, f"{date_key}.txt"), "w") if writer.out_dir else None
+        if writer.live:
+            print(f"\n=== {date_key} ===", flush=True)
+
+    def write(self, text: str):
+        self.parts.append(text)
+        if self.file:
+            self.file.write(text)
+            self.file.flush()
+        if self.writer.live:
+            sys.stdout.write(text)
+            sys.stdout.flush()
+
+    def close(self):
+        if self.file:
+            self.file.close()
+        if self.writer.live:
+            print(flush=True)
+        else:
+            print(f"\n=== {self.date_key} ===\n{''.join(self.parts)}", flush=True)
+
+
+async def generate_one(date_key: str, weather_data, warnings, args, groq_client, scheduler: LLMScheduler,
+                       executor, writer: ForecastWriter, cache, stats: dict):
+    """Stream one forecast through the scheduler and store it in the forecast cache"""
+    prompt = build_prompt(date_key, args.style, args.length, weather_data, warnings)
+    output = writer.open(date_key)
+    governor = LengthGovernor(args.length, warnings, slack=Settings.LENGTH_GOVERNOR_SLACK) if args.governor else None
+    result = {}
+    try:
+        async for text in governed_stream(scheduler, executor, groq_client.chat.completions.create, prompt,
+                                          Settings.GROQ_MODEL, governor, result):
+            output.write(text)
+    except Exception as e:
+        stats["failed"] += 1
+        logger.error(f"{date_key}: {str(e)}")
+        return
+    finally:
+        output.close()
+
+    prompt.log_usage(result.get("usage"))
+    stats["generated"] += 1
+    if cache is not None:
+        key = forecast_cache_key(date_key, args.style, args.length, weather_data, PROMPT_VERSION, Settings.GROQ_MODEL)
+        # As many variants as the API rotates through, so its lookups find them
+        await run_blocking(executor, cache.put, key, "".join(output.parts), forecast_variants(args.style))
+
+
+async def generate_all(date_keys: List[str], store, args):
+    """Look up every date with one query, then generate the forecasts concurrently"""
+    rows = store.get_many(date_keys)
+    missing = [date_key for date_key in date_keys if date_key not in rows]
+    for date_key in missing:
+        logger.warning(f"No weather data found for {date_key}")
+    found = [date_key for date_key in date_keys if date_key in rows]
+    # One vectorized pass over the requested rows instead of the rules per date
+    warnings = dict(zip(found, evaluate_rows([rows[date_key] for date_key in found], Settings.DISASTER_THRESHOLDS)))
+
+    stats = {"generated": 0, "missing": len(missing), "failed": 0}
+    executor = ThreadPoolExecutor(max_workers=args.concurrency + 1, thread_name_prefix="atmos-generate")
+    scheduler = LLMScheduler(
+        executor,
+        max_concurrency=args.concurrency,
+        requests_per_minute=Settings.GROQ_REQUESTS_PER_MINUTE,
+        tokens_per_minute=Settings.GROQ_TOKENS_PER_MINUTE,
+        max_retries=Settings.LLM_MAX_RETRIES,
+    )
+    groq_client = Groq(api_key=os.getenv("GROQ_API_KEY", Settings.GROQ_API_KEY))
+    writer = ForecastWriter(args.out, live=args.concurrency == 1)
+    cache = ForecastCache(
+        memory_size=0,
+        ttl=Settings.FORECAST_CACHE_TTL_SECONDS,
+        path=Settings.FORECAST_CACHE_PATH,
+        max_keys=Settings.FORECAST_CACHE_MAX_KEYS,
+    ) if args.cache else None
+
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(
+            generate_one(date_key, rows[date_key], warnings[date_key], args, groq_client, scheduler, executor,
+                         writer, cache, stats)
+            for date_key in found
+        ))
+    finally:
+        if cache is not None:
+            cache.close()
+        executor.shutdown(wait=False)
+    stats["seconds"] = round(time.perf_counter() - started, 1)
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate forecasts for many dates concurrently, streaming the text")
+    parser.add_argument("dates", nargs="*", help="Dates to forecast (YYYY-MM-DD)")
+    parser.add_argument("--from", dest="date_from", help="First date of an inclusive range")
+    parser.add_argument("--to", dest="date_to", help="Last date of an inclusive range")
+    parser.add_argument("--style", default="balanced", choices=STYLES)
+    parser.add_argument("--length", type=int, default=200, help="Report length in words")
+    parser.add_argument("--concurrency", type=int, default=4, help="LLM calls in flight at once")
+    parser.add_argument("--max-dates", type=int, default=Settings.GENERATE_MAX_DATES,
+                        help="Refuse to generate more dates than this in one run (0: no limit)")
+    parser.add_argument("--out", help="Directory to write one <date>.txt per forecast")
+    parser.add_argument("--backend", choices=["mongo", "columnar"], default=Settings.STORAGE_BACKEND,
+                        help="Prediction store to read")
+    parser.add_argument("--cache", action=argparse.BooleanOptionalAction, default=Settings.FORECAST_CACHE_ENABLED,
+                        help="Store the forecasts in the API's forecast cache")
+    parser.add_argument("--governor", action=argparse.BooleanOptionalAction, default=Settings.LENGTH_GOVERNOR_ENABLED,
+                        help="End each stream once the forecast reaches --length words and its warnings section")
+    args = parser.parse_args(argv)
+
+    try:
+        date_keys = expand_dates(args.dates, args.date_from, args.date_to, args.max_dates)
+    except ValueError as e:
+        parser.error(str(e))
+    if not date_keys:
+        parser.error("Give one or more dates or a --from/--to range")
+
+    store, client = open_store(args.backend)
+    try:
+        stats = asyncio.run(generate_all(date_keys, store, args))
+    finally:
+        store.close()
+        if client is not None:
+            client.close()
+    logger.info(f"Generation finished: {stats}")
+    return stats
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import Executor
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+import metrics
+from concurrency import MicroBatcher, run_blocking
+from forecasting import RolloutEngine, clip_floor, predictions_frame
+from ingest import normalize_chunk
+from rollups import rollup
+from store import current_version_dir, lookup_row
+from training import load_artifacts, rollout_start
+
+logger = logging.getLogger(__name__)
+
+# Online inference for dates past the last stored prediction. The stored predictions are one
+# rollout of the current model from its final training window (one step per day, starting on
+# the model's last_date, see forecasting.predict_future_weather_extended), so continuing that
+# rollout gives exactly the rows an offline run with a longer horizon would have stored.
+
+
+def _day(date_key: str):
+    return datetime.strptime(date_key, "%Y-%m-%d").date()
+
+
+class OnlinePredictor:
+    """
+    Serves daily prediction rows beyond the stored horizon from the model
+    in-process. There is a single trajectory, so requests that arrive
+    together are answered by one rollout up to the furthest of their dates
+    (see concurrency.MicroBatcher). Every computed day is kept in memory and,
+    when the store is writable, written back to it, so no day is computed
+    twice. All model work runs on `executor`, which should have one thread.
+    """
+
+    def __init__(self, engine: RolloutEngine, scaler, columns: List[str], window: np.ndarray, origin,
+                 last_stored: str, store, executor: Executor, max_days: int = 365, max_wait: float = 0.01,
+                 max_batch: int = 64):
+        self.engine = engine
+        self.scaler = scaler
+        self.columns = list(columns)
+        self.store = store
+        self.executor = executor
+        self.last_stored = _day(last_stored)
+        self.max_day = self.last_stored + timedelta(days=max_days)
+        # Trajectory state: the scaled input window and the timestamp of the step it predicts next
+        self._window = np.ascontiguousarray(window, dtype=np.float32)
+        self._next = pd.Timestamp(origin)
+        self.rows: Dict[str, Dict[str, Any]] = {}
+        self.steps = 0
+        self.batcher = MicroBatcher(self._run_batch, max_wait=max_wait, max_batch=max_batch)
+
+    def covers(self, date_key: str) -> bool:
+        """Whether `date_key` lies in the window online inference serves"""
+        try:
+            day = _day(date_key)
+        except ValueError:
+            return False
+        return self.last_stored < day <= self.max_day
+
+    async def get(self, date_key: str) -> Optional[Dict[str, Any]]:
+        """Row of a day past the stored horizon, computing it if needed; None outside the served window"""
+        row = self.rows.get(date_key)
+        if row is not None:
+            metrics.record_lookup("online_memo")
+            return row
+        if not self.covers(date_key):
+            return None
+        row = await self.batcher.submit(date_key)
+        if row is not None:
+            metrics.record_lookup("online")
+        return row
+
+    async def get_many(self, date_keys: List[str]) -> Dict[str, Dict[str, Any]]:
+        rows = await asyncio.gather(*(self.get(date_key) for date_key in date_keys))
+        return {date_key: row for date_key, row in zip(date_keys, rows) if row is not None}
+
+    async def _run_batch(self, date_keys: List[str]) -> Dict[str, Dict[str, Any]]:
+        target = max(_day(date_key) for date_key in date_keys)
+        await run_blocking(self.executor, self._extend, target, len(date_keys))
+        return {date_key: self.rows.get(date_key) for date_key in date_keys}
+
+    def _extend(self, target, dates: int):
+        """Roll the trajectory forward until it covers `target`, then keep and store the new rows"""
+        steps = (target - self._next.date()).days + 1
+        if steps <= 0:
+            return
+        started = time.perf_counter()
+        scaled = self.engine.rollout(self._window, steps)
+        frame = predictions_frame(scaled, self.scaler, self.columns, self._next)
+        frame["date"] = frame["date"].astype(str)
+        daily = rollup(normalize_chunk(frame), "daily")
+        # The first rollout also passes the stored days between the model's origin and the horizon
+        daily = daily[daily["date_key"] > self.last_stored.isoformat()]
+        rows = daily.replace({np.nan: None}).to_dict("records")
+
+        self._window = np.concatenate([self._window, scaled])[-len(self._window):]
+        self._next += pd.Timedelta(days=steps)
+        self.steps += steps
+        # Served like stored rows, the full ones (rollup extras included) are what gets written back
+        self.rows.update((row["date_key"], lookup_row(dict(row))) for row in rows)
+        if self.store.writable and rows:
+            try:
+                self.store.put_many(rows)
+            except Exception as e:
+                logger.warning(f"Could not store {len(rows)} online predictions: {str(e)}")
+        seconds = time.perf_counter() - started
+        metrics.record_inference_batch(dates, steps, seconds)
+        logger.info(f"Online inference: {steps} steps for {dates} requested dates up to {target} in {seconds:.2f}s")
+
+    def stats(self):
+        return {
+            "last_stored": self.last_stored.isoformat(),
+            "max_date": self.max_day.isoformat(),
+            "computed_days": len(self.rows),
+            "steps": self.steps,
+            **self.batcher.stats(),
+        }
+
+
+def load_predictor(model_root: str, store, date_keys: List[str], executor: Executor, **options) -> OnlinePredictor:
+    """
+    Load the current model version under `model_root` and build its
+    predictor for a store whose last daily row is the latest of
+    `date_keys`. Raises when the artifacts or TensorFlow are missing.
+    """
+    if not date_keys:
+        raise ValueError("No stored predictions to continue from")
+    model, scaler, last_window, meta = load_artifacts(current_version_dir(model_root))
+    columns = meta["columns"]
+    engine = RolloutEngine(model, floor=clip_floor(columns))
+    window = rollout_start(last_window, meta["sequence_length"])
+    predictor = OnlinePredictor(engine, scaler, columns, window, meta["last_date"], max(date_keys), store,
+                                executor, **options)
+    logger.info(f"Online inference ready past {predictor.last_stored} (up to {predictor.max_day})")
+    return predictor
@@ -0,0 +1,261 @@
+import argparse
+import json
+import logging
+import os
+import time
+
+import httpx
+import numpy as np
+import pandas as pd
+from pymongo import ASCENDING, MongoClient, ReplaceOne
+
+from config import Settings
+from rollups import hour_keys, level_fields, rollup_levels
+from store import COLUMNAR_FORMAT_VERSION, DEFAULT_COLUMNAR_PATH, LEVEL_KEYS, WEATHER_FIELDS, week_start
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CSV_PATH = os.path.join(os.path.dirname(BASE_DIR), "lstm_predictions", "predictions.csv")
+
+# LSTM bookkeeping columns that are not weather values (index column and scaled date features)
+DROP_COLUMNS = ["Unnamed: 0", "year", "month", "day", "hour"]
+
+
+def normalize_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    """Drop non-weather columns and add the canonical YYYY-MM-DD date_key and YYYY-MM-DDTHH hour_key"""
+    chunk = chunk.drop(columns=[column for column in DROP_COLUMNS if column in chunk.columns])
+    timestamps = pd.to_datetime(chunk["date"], utc=True)
+    chunk["date_key"] = timestamps.dt.strftime("%Y-%m-%d")
+    chunk["hour_key"] = hour_keys(timestamps)
+    return chunk
+
+
+def iter_chunks(csv_path: str, chunk_size: int):
+    """Stream the predictions CSV as normalized frames, one per chunk"""
+    for chunk in pd.read_csv(csv_path, chunksize=chunk_size):
+        yield normalize_chunk(chunk)
+
+
+def iter_record_batches(csv_path: str, chunk_size: int):
+    """Stream the predictions CSV as lists of documents, one list per chunk"""
+    for chunk in iter_chunks(csv_path, chunk_size):
+        yield chunk.to_dict("records")
+
+
+def level_collections(collection):
+    """Collections of the rollup pyramid: daily rows in `collection`, the others next to it"""
+    return {
+        "hourly": collection.database[f"{collection.name}_hourly"],
+        "daily": collection,
+        "weekly": collection.database[f"{collection.name}_weekly"],
+    }
+
+
+def ensure_indexes(collection):
+    """Create the unique index on each level's key every lookup relies on"""
+    for granularity, level in level_collections(collection).items():
+        key_field = LEVEL_KEYS[granularity]
+        level.create_index([(key_field, ASCENDING)], unique=True, name=f"{key_field}_unique")
+
+
+def write_records(collection, key_field: str, records, drop: bool):
+    """insert_many into a freshly dropped collection, upserts on the key otherwise"""
+    if not records:
+        return
+    if drop:
+        collection.insert_many(records, ordered=False)
+    else:
+        collection.bulk_write([ReplaceOne({key_field: record[key_field]}, record, upsert=True) for record in records],
+                              ordered=False)
+
+
+def ingest_predictions(collection, csv_path: str = DEFAULT_CSV_PATH, chunk_size: int = 1000, drop: bool = False):
+    """
+    Load the predictions CSV into the rollup pyramid: hourly rows stream into
+    "<collection>_hourly", then daily and weekly rollups are written to the
+    collection itself and "<collection>_weekly".
+    With drop=True the collections are recreated and filled with insert_many,
+    otherwise rows are upserted on their key so re-runs are idempotent; the
+    rollups of every week touched by the CSV are then recomputed from all of
+    its stored hours, not only the new ones.
+    Returns a dictionary with the row counts and throughput.
+    """
+    levels = level_collections(collection)
+    if drop:
+        for level in levels.values():
+            level.drop()
+    ensure_indexes(collection)
+
+    rows = 0
+    frames = []
+    started = time.perf_counter()
+    for chunk in iter_chunks(csv_path, chunk_size):
+        if chunk.empty:
+            continue
+        write_records(levels["hourly"], "hour_key", chunk.to_dict("records"), drop)
+        frames.append(chunk[["date", "date_key", "hour_key"] + [field for field in WEATHER_FIELDS if field in chunk.columns]])
+        rows += len(chunk)
+        logger.info(f"Ingested {rows} hourly rows")
+
+    stats = {"rows": rows}
+    if frames:
+        hourly = pd.concat(frames, ignore_index=True)
+        if not drop:
+            # Re-read every stored hour of the touched weeks with one range query
+            first = week_start(hourly["date_key"].min())
+            last = (pd.Timestamp(week_start(hourly["date_key"].max())) + pd.Timedelta(days=6)).strftime("%Y-%m-%d")
+            stored = list(levels["hourly"].find({"hour_key": {"$gte": first, "$lte": f"{last}T23"}}, {"_id": 0}))
+            hourly = pd.DataFrame(stored)
+        pyramid = rollup_levels(hourly)
+        for granularity in ("daily", "weekly"):
+            write_records(levels[granularity], LEVEL_KEYS[granularity], pyramid[granularity].to_dict("records"), drop)
+            stats[f"{granularity}_rows"] = len(pyramid[granularity])
+
+    elapsed = time.perf_counter() - started
+    rows_per_second = rows / elapsed if elapsed > 0 else float(rows)
+    return {**stats, "seconds": round(elapsed, 3), "rows_per_second": round(rows_per_second, 1)}
+
+
+def save_array_atomic(path: str, array: np.ndarray):
+    """Write an .npy file next to its target and rename it into place, so running servers keep a valid mapping"""
+    with open(path + ".tmp", "wb") as f:
+        np.save(f, array)
+    os.replace(path + ".tmp", path)
+
+
+def write_columnar_level(out_dir: str, frame: pd.DataFrame, keys: np.ndarray, **meta):
+    """Write one level of the columnar store: values (field, row), the sorted key index, and meta.json"""
+    os.makedirs(out_dir, exist_ok=True)
+    fields = level_fields(frame)
+    # One contiguous float64 column per field, so values.npy is laid out as (field, row)
+    values = np.ascontiguousarray(frame[fields].to_numpy(dtype=np.float64).T)
+    save_array_atomic(os.path.join(out_dir, "values.npy"), values)
+    save_array_atomic(os.path.join(out_dir, "dates.npy"), keys)
+    save_array_atomic(os.path.join(out_dir, "date_text.npy"), frame["date"].astype(str).to_numpy().astype(str))
+    meta_path = os.path.join(out_dir, "meta.json")
+    with open(meta_path + ".tmp", "w") as f:
+        json.dump({"format_version": COLUMNAR_FORMAT_VERSION, "fields": fields, "rows": len(frame), **meta}, f, indent=2)
+    os.replace(meta_path + ".tmp", meta_path)
+
+
+def write_columnar_store(out_dir: str, pyramid):
+    """Write every level of a rollup pyramid (see rollups.rollup_levels) as one columnar store"""
+    # The subdirectories go first, the top-level meta.json that lists them is written last
+    write_columnar_level(os.path.join(out_dir, "hourly"), pyramid["hourly"],
+                         pyramid["hourly"]["hour_key"].to_numpy().astype("datetime64[h]"))
+    write_columnar_level(os.path.join(out_dir, "weekly"), pyramid["weekly"],
+                         pyramid["weekly"]["week_key"].to_numpy().astype("datetime64[D]"))
+    write_columnar_level(out_dir, pyramid["daily"], pyramid["daily"]["date_key"].to_numpy().astype("datetime64[D]"),
+                         levels=["daily", "hourly", "weekly"])
+
+
+def build_columnar_store(csv_path: str = DEFAULT_CSV_PATH, out_dir: str = DEFAULT_COLUMNAR_PATH, chunk_size: int = 1000):
+    """
+    Convert the predictions CSV into the memory-mapped file set read by
+    store.ColumnarPredictionStore: daily rollups at the top level, hourly
+    rows and weekly rollups in subdirectories. Returns the same statistics
+    as ingest_predictions.
+    """
+    started = time.perf_counter()
+    hourly = pd.concat(list(iter_chunks(csv_path, chunk_size)), ignore_index=True)
+    pyramid = rollup_levels(hourly)
+    write_columnar_store(out_dir, pyramid)
+
+    rows = len(pyramid["hourly"])
+    elapsed = time.perf_counter() - started
+    rows_per_second = rows / elapsed if elapsed > 0 else float(rows)
+    return {"rows": rows, "daily_rows": len(pyramid["daily"]), "weekly_rows": len(pyramid["weekly"]),
+            "seconds": round(elapsed, 3), "rows_per_second": round(rows_per_second, 1)}
+
+
+def snapshot_columnar_store(collection, out_dir: str):
+    """
+    Copy the prediction collections into a columnar store, e.g. on tmpfs
+    so several API processes map one copy of the data (see serve.py).
+    A collection without hourly rows (data ingested before the rollup
+    pyramid) is treated as one row per day.
+    """
+    started = time.perf_counter()
+    levels = level_collections(collection)
+    frames = {granularity: pd.DataFrame(list(levels[granularity].find({}, {"_id": 0})))
+              for granularity in ("hourly", "daily", "weekly")}
+    if frames["hourly"].empty or frames["weekly"].empty:
+        pyramid = rollup_levels(normalize_chunk(frames["daily"]))
+    else:
+        # The daily level is read as stored, it can hold days the hourly level does not (see inference.py)
+        pyramid = {granularity: frame.sort_values(LEVEL_KEYS[granularity], ignore_index=True)
+                   for granularity, frame in frames.items()}
+    write_columnar_store(out_dir, pyramid)
+    stats = {granularity: len(frame) for granularity, frame in pyramid.items()}
+    logger.info(f"Snapshot of {collection.name} written to {out_dir} in {time.perf_counter() - started:.2f}s: {stats}")
+    return stats
+
+
+def notify_reload(url: str):
+    """
+    Ask a running API to drop its row cache and re-detect the lookup plan.
+    Under serve.py the worker that answers forwards it to the supervisor as
+    a SIGHUP, which re-snapshots the data and replaces every worker.
+    """
+    if not url:
+        return
+    try:
+        response = httpx.post(url, timeout=10.0)
+        response.raise_for_status()
+        result = response.json()
+        if result.get("status") == "reloading":
+            logger.info(f"Notified {url}: supervisor {result.get('supervisor')} is replacing the workers")
+        else:
+            logger.info(f"Notified {url}: {result}")
+    except Exception as e:
+        logger.error(f"Failed to notify {url}: {str(e)}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk ingest LSTM predictions into MongoDB or a columnar store")
+    parser.add_argument("--csv", default=DEFAULT_CSV_PATH, help="Path to the predictions CSV")
+    parser.add_argument("--target", choices=["mongo", "columnar"], default="mongo", help="Where to load the predictions")
+    parser.add_argument("--out", default=DEFAULT_COLUMNAR_PATH, help="Output directory for --target columnar")
+    parser.add_argument("--mongo-uri", default=os.getenv("MONGODB_URI", "mongodb://localhost:27017"))
+    parser.add_argument("--db", default=Settings.DB_NAME, help="Database name")
+    parser.add_argument("--collection", default="chennai_weather", help="Collection name")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Rows per CSV chunk and write batch")
+    parser.add_argument("--drop", action="store_true", help="Drop the collection before loading")
+    parser.add_argument(
+        "--notify",
+        default=os.getenv("ATMOS_RELOAD_URL"),
+        help="Reload endpoint of a running API to call after loading, e.g. http://localhost:8000/api/admin/reload "
+             "(under serve.py it has the supervisor re-snapshot and replace every worker, like a SIGHUP)",
+    )
+    args = parser.parse_args(argv)
+
+    if args.target == "columnar":
+        stats = build_columnar_store(args.csv, args.out, chunk_size=args.chunk_size)
+        logger.info(
+            f"Wrote {stats['rows']} hourly, {stats['daily_rows']} daily and {stats['weekly_rows']} weekly rows to {args.out} "
+            f"in {stats['seconds']}s ({stats['rows_per_second']} rows/s)"
+        )
+        notify_reload(args.notify)
+        return stats
+
+    client = MongoClient(args.mongo_uri, serverSelectionTimeoutMS=5000)
+    try:
+        collection = client[args.db][args.collection]
+        stats = ingest_predictions(collection, args.csv, chunk_size=args.chunk_size, drop=args.drop)
+    finally:
+        client.close()
+
+    logger.info(
+        f"Loaded {stats['rows']} hourly, {stats.get('daily_rows', 0)} daily and {stats.get('weekly_rows', 0)} weekly rows "
+        f"into {args.db}.{args.collection} "
+        f"in {stats['seconds']}s ({stats['rows_per_second']} rows/s)"
+    )
+    notify_reload(args.notify)
+    return stats
+
+
+if __name__ == "__main__":
+    main()
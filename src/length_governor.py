@@ -0,0 +1,164 @@
+import math
+import re
+import time
+from concurrent.futures import Executor
+from types import SimpleNamespace
+from typing import AsyncIterator, Callable, Dict, Optional
+
+import metrics
+from concurrency import iterate_blocking
+from llm_scheduler import LLMScheduler
+from prompts import ForecastPrompt, build_warnings_section, count_tokens
+
+# The section the prompt makes every forecast end with (see prompts.USER_TEMPLATE), on a line of its own
+WARNINGS_HEADING = re.compile(r"^[^\w\n]*weather\s+warnings", re.IGNORECASE | re.MULTILINE)
+# A sentence ends at ., ! or ? followed by whitespace, so "24." of "24.5°C" does not count
+SENTENCE_END = re.compile(r"[.!?][\"')\]]*(?=\s)")
+WORD = re.compile(r"\S+")
+# Words and numbers a warnings line is matched on; the generic ones say nothing about which warning it is
+TERM = re.compile(r"\d+(?:\.\d+)?|[a-z]{4,}")
+GENERIC_TERMS = {"warning", "warnings", "expected", "conditions", "with", "weather", "advisory", "apply", "following"}
+# The line of a section without warnings, e.g. "No weather warnings for this date."
+NO_WARNINGS = re.compile(r"\b(?:no|none|nil)\b", re.IGNORECASE)
+
+
+def warning_terms(message: str) -> set:
+    return set(TERM.findall(message.lower())) - GENERIC_TERMS
+
+
+def mentions_warning(line: str, terms: set) -> bool:
+    """Whether a line of the model's warnings section states the warning with these terms"""
+    found = terms & set(TERM.findall(line.lower()))
+    # One of its figures, or half of its words
+    return any(term[0].isdigit() for term in found) or (bool(found) and 2 * len(found) >= len(terms))
+
+
+class LengthGovernor:
+    """
+    Decides where a streamed forecast ends instead of trusting the model to
+    stop at `report_length` words. Once the body reaches the target the
+    current sentence may finish (within `slack` of the target) and the text
+    is cut; the warnings section the prompt asks for is then appended from
+    the warnings themselves. If the model starts its own warnings section
+    first, the text ends once that section has a line stating each warning
+    (or the "no warnings" line); preambles and rephrasings that match none
+    are passed on, and a section that never matches runs to the end.
+    """
+
+    def __init__(self, report_length: int, disaster_warnings: Dict[str, Dict[str, str]], slack: float = 0.1):
+        self.target = max(int(report_length), 1)
+        self.max_body_words = self.target + max(8, math.ceil(self.target * slack))
+        self.disaster_warnings = disaster_warnings
+        self.pending = [warning_terms(info["message"]) for info in disaster_warnings.values()]
+        self.text = ""
+        self.heading_at: Optional[int] = None
+        self.finished = False
+        self.cut = None  # "body" or "warnings" when the governor ended the text
+        self.mid_sentence = False
+
+    def feed(self, piece: str) -> str:
+        """Take the next streamed piece and return the part of it to pass on"""
+        if self.finished or not piece:
+            return ""
+        candidate = self.text + piece
+        if self.heading_at is None:
+            match = WARNINGS_HEADING.search(candidate)
+            if match:
+                self.heading_at = match.start()
+        end = self._body_end(candidate) if self.heading_at is None else self._warnings_end(candidate)
+        if end is None:
+            self.text = candidate
+            return piece
+        end = max(end, len(self.text))
+        emitted = candidate[len(self.text):end]
+        self.text = candidate[:end]
+        self.finished = True
+        return emitted
+
+    def _body_end(self, text: str) -> Optional[int]:
+        words = list(WORD.finditer(text))
+        if len(words) < self.target:
+            return None
+        boundary = SENTENCE_END.search(text, words[self.target - 1].start())
+        if boundary and len(WORD.findall(text, 0, boundary.end())) <= self.max_body_words:
+            self.cut = "body"
+            return boundary.end()
+        if len(words) > self.max_body_words:
+            # No sentence end in reach: cut after the last allowed word
+            self.cut = "body"
+            self.mid_sentence = True
+            return words[self.max_body_words - 1].end()
+        return None
+
+    def _warnings_end(self, text: str) -> Optional[int]:
+        # Complete lines of the section, the heading line included ("Weather Warnings: none expected.")
+        position = self.heading_at
+        for line in text[self.heading_at:].split("\n")[:-1]:  # the last piece is still incomplete
+            position += len(line) + 1
+            if self._states_warnings(line):
+                self.cut = "warnings"
+                return position - 1
+        return None
+
+    def _states_warnings(self, line: str) -> bool:
+        """Take one line of the section; True once every warning has been stated"""
+        if not self.disaster_warnings:
+            return bool(NO_WARNINGS.search(line))
+        self.pending = [terms for terms in self.pending if not mentions_warning(line, terms)]
+        return not self.pending
+
+    def tail(self) -> str:
+        """Text to append once the stream is over: the warnings section when the model did not write one"""
+        if self.heading_at is not None:
+            return ""
+        ending = "." if self.mid_sentence else ""
+        separator = "\n\n" if self.text.strip() else ""
+        return ending + separator + build_warnings_section(self.disaster_warnings)
+
+
+def estimated_usage(prompt: ForecastPrompt, completion_text: str):
+    """Usage of a stream closed before its final chunk, estimated with the local token counter"""
+    completion_tokens = count_tokens(completion_text)
+    return SimpleNamespace(prompt_tokens=prompt.input_tokens, completion_tokens=completion_tokens,
+                           total_tokens=prompt.input_tokens + completion_tokens)
+
+
+async def governed_stream(scheduler: LLMScheduler, executor: Executor, create: Callable, prompt: ForecastPrompt,
+                          model: str, governor: Optional[LengthGovernor] = None,
+                          result: Optional[dict] = None) -> AsyncIterator[str]:
+    """
+    Stream one forecast completion through the scheduler, yielding the text
+    the governor lets through and closing the upstream stream as soon as it
+    has enough. Without a governor every piece passes. When given, `result`
+    receives the usage ("usage", estimated for streams closed early) and
+    the time to the first piece ("first_token_at", perf_counter seconds).
+    """
+    result = result if result is not None else {}
+    usage = None
+    received = []
+    async with scheduler.stream(create, estimated_tokens=prompt.estimated_tokens, stream=True,
+                                **prompt.completion_params(model)) as stream:
+        async for chunk in iterate_blocking(executor, stream):
+            # The last chunk carries the token usage for the whole completion
+            chunk_usage = getattr(getattr(chunk, "x_groq", None), "usage", None)
+            if chunk_usage is not None:
+                usage = chunk_usage
+            if not getattr(chunk, "choices", None) or not chunk.choices[0].delta.content:
+                continue
+            content = chunk.choices[0].delta.content
+            received.append(content)
+            text = governor.feed(content) if governor is not None else content
+            if text:
+                result.setdefault("first_token_at", time.perf_counter())
+                yield text
+            if governor is not None and governor.finished:
+                break
+    if governor is not None:
+        tail = governor.tail()
+        if tail:
+            yield tail
+        if governor.cut is not None and usage is None:
+            usage = estimated_usage(prompt, "".join(received))
+            metrics.record_governor_stop(governor.cut, max(prompt.max_tokens - usage.completion_tokens, 0))
+    scheduler.settle(prompt.estimated_tokens, usage)
+    result["usage"] = usage
@@ -0,0 +1,157 @@
+import asyncio
+import logging
+import random
+import time
+from concurrent.futures import Executor
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Optional
+
+from concurrency import run_blocking
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Async token bucket refilled continuously at `per_minute` units per minute"""
+
+    def __init__(self, per_minute: float, capacity: Optional[float] = None):
+        self.per_minute = per_minute
+        self.capacity = capacity if capacity is not None else per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.per_minute > 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.per_minute / 60.0)
+        self.updated = now
+
+    async def acquire(self, amount: float = 1.0):
+        if not self.enabled:
+            return
+        # A request larger than the whole bucket would wait forever, let it drain the bucket instead
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) * 60.0 / self.per_minute)
+
+    def refund(self, amount: float):
+        """Return unused units, e.g. when a call used fewer tokens than estimated"""
+        if self.enabled and amount > 0:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+
+def is_rate_limited(error: Exception) -> bool:
+    return getattr(error, "status_code", None) == 429 or type(error).__name__ == "RateLimitError"
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Delay requested by the upstream Retry-After header, if any"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class LLMScheduler:
+    """
+    Admission control for Groq calls.
+    Every call takes one request from the requests-per-minute bucket and its
+    estimated tokens from the tokens-per-minute bucket, runs on the LLM
+    executor with at most `max_concurrency` calls in flight, and is retried
+    with exponential backoff on 429 responses. A 429 pauses all callers until
+    the backoff expires, so a burst does not keep hammering the limit.
+    """
+
+    def __init__(self, executor: Executor, max_concurrency: int = 8, requests_per_minute: float = 0,
+                 tokens_per_minute: float = 0, max_retries: int = 3, base_backoff: float = 1.0):
+        self.executor = executor
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.paused_until = 0.0
+        self.calls = 0
+        self.rate_limited = 0
+
+    async def admit(self, estimated_tokens: int = 0):
+        """Wait for the global backoff and both rate limit buckets"""
+        delay = self.paused_until - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        await self.requests.acquire(1)
+        await self.tokens.acquire(estimated_tokens)
+
+    def settle(self, estimated_tokens: int, usage) -> None:
+        """Give back the part of the token estimate a finished call did not use"""
+        used = getattr(usage, "total_tokens", None)
+        if used is not None:
+            self.tokens.refund(estimated_tokens - used)
+
+    def backoff(self, error: Exception, attempt: int) -> float:
+        delay = retry_after_seconds(error)
+        if delay is None:
+            delay = self.base_backoff * (2 ** attempt) + random.uniform(0, self.base_backoff)
+        self.paused_until = max(self.paused_until, time.monotonic() + delay)
+        self.rate_limited += 1
+        return delay
+
+    @asynccontextmanager
+    async def stream(self, fn: Callable[..., Any], *args, estimated_tokens: int = 0, **kwargs):
+        """
+        Start a streamed completion under the rate limits, retrying on 429:
+        yields the stream and keeps its concurrency slot until the caller has
+        finished consuming it, then closes it. The caller reports the final
+        usage through settle().
+        """
+        attempt = 0
+        while True:
+            await self.admit(estimated_tokens)
+            await self.semaphore.acquire()
+            try:
+                stream = await run_blocking(self.executor, fn, *args, **kwargs)
+            except Exception as e:
+                self.semaphore.release()
+                # A call that never started used no tokens: give the estimate back before retrying or
+                # raising, or every 429 would drain the bucket again for all the other callers
+                self.tokens.refund(estimated_tokens)
+                if not is_rate_limited(e) or attempt == self.max_retries:
+                    raise
+                delay = self.backoff(e, attempt)
+                attempt += 1
+                logger.warning(f"Rate limited by the LLM service, retrying in {delay:.1f}s")
+                continue
+            break
+        self.calls += 1
+        try:
+            yield stream
+        finally:
+            self.semaphore.release()
+            # A caller that stops reading early (length governor, client gone) must not leave the
+            # upstream response open; closing a fully read stream is a no-op
+            close = getattr(stream, "close", None)
+            if close is not None:
+                try:
+                    await run_blocking(self.executor, close)
+                except Exception as e:
+                    logger.warning(f"Failed to close LLM stream: {str(e)}")
+
+    def stats(self):
+        return {
+            "calls": self.calls,
+            "rate_limited": self.rate_limited,
+            "requests_available": round(self.requests.tokens, 1) if self.requests.enabled else None,
+            "tokens_available": round(self.tokens.tokens) if self.tokens.enabled else None,
+        }
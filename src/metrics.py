@@ -0,0 +1,283 @@
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Latency buckets in seconds, widened past the Prometheus defaults for LLM calls
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 100)
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    """Monotonic counter with optional labels, rendered in the Prometheus text format"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labels, key)} {_format_number(value)}" for key, value in values]
+
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels, rendered in the Prometheus text format"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: Sequence[float] = LATENCY_BUCKETS, labels: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        self.labels = tuple(labels)
+        # Per label set: count per bucket (last slot is +Inf), sum and count
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labels)
+        slot = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][slot] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        with self._lock:
+            series = sorted((key, [list(counts), total, count]) for key, (counts, total, count) in self._series.items())
+        lines = []
+        for key, (counts, total, count) in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_format_number(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "atmos_request_seconds", "Time to serve an instrumented API request", labels=("endpoint", "status")))
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "atmos_stage_seconds", "Time spent per stage of an API request", labels=("endpoint", "stage")))
+DB_QUERIES_PER_REQUEST = REGISTRY.register(Histogram(
+    "atmos_db_queries_per_request", "Prediction store queries issued by one API request", COUNT_BUCKETS,
+    labels=("endpoint",)))
+DB_QUERIES = REGISTRY.register(Counter(
+    "atmos_db_queries_total", "Prediction store queries by backend and lookup variant", labels=("backend", "variant")))
+LOOKUPS = REGISTRY.register(Counter(
+    "atmos_lookups_total", "Prediction row lookups by the variant that answered them", labels=("variant",)))
+LLM_PROMPT_TOKENS = REGISTRY.register(Histogram(
+    "atmos_llm_prompt_tokens", "Prompt tokens per LLM call", TOKEN_BUCKETS, labels=("endpoint",)))
+LLM_COMPLETION_TOKENS = REGISTRY.register(Histogram(
+    "atmos_llm_completion_tokens", "Completion tokens per LLM call", TOKEN_BUCKETS, labels=("endpoint",)))
+LLM_TIME_TO_FIRST_TOKEN = REGISTRY.register(Histogram(
+    "atmos_llm_time_to_first_token_seconds", "Time from sending an LLM call to its first token", labels=("endpoint",)))
+LLM_HEDGES = REGISTRY.register(Counter(
+    "atmos_llm_hedged_calls_total", "LLM calls duplicated because the first attempt was slow"))
+GOVERNOR_STOPS = REGISTRY.register(Counter(
+    "atmos_llm_governor_stops_total", "LLM streams closed early by the length governor, by the section it cut",
+    labels=("section",)))
+GOVERNOR_TOKENS_SAVED = REGISTRY.register(Counter(
+    "atmos_llm_governor_tokens_saved_total", "Completion tokens of the max_tokens budget not generated because the length governor closed the stream"))
+TEMPLATE_FORECASTS = REGISTRY.register(Counter(
+    "atmos_template_forecasts_total", "Template forecasts served in place of the LLM, by reason", labels=("reason",)))
+FORECAST_LEASE_WAITS = REGISTRY.register(Counter(
+    "atmos_forecast_lease_waits_total", "LLM calls saved by waiting for the forecast another worker process was generating"))
+INFERENCE_BATCH_DATES = REGISTRY.register(Histogram(
+    "atmos_inference_batch_dates", "Dates answered by one batched online rollout", COUNT_BUCKETS))
+INFERENCE_STEPS = REGISTRY.register(Counter(
+    "atmos_inference_steps_total", "Days rolled forward by online inference"))
+INFERENCE_SECONDS = REGISTRY.register(Histogram(
+    "atmos_inference_seconds", "Time of one batched online rollout, including writing its rows"))
+
+
+class RequestTimings:
+    """Stage durations and query counts collected while one request is served"""
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.db_queries = 0
+        self.lookup: Optional[str] = None
+
+    def add(self, stage: str, seconds: float):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def server_timing(self) -> str:
+        """Server-Timing header value with the stages measured so far and the elapsed total"""
+        entries = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in self.stages.items()]
+        if self.lookup:
+            entries.append(f'lookup;desc="{self.lookup}"')
+        entries.append(f"total;dur={(time.perf_counter() - self.started) * 1000:.1f}")
+        return ", ".join(entries)
+
+    def finish(self, status: int):
+        REQUEST_SECONDS.observe(time.perf_counter() - self.started, endpoint=self.endpoint, status=status)
+        for stage, seconds in self.stages.items():
+            STAGE_SECONDS.observe(seconds, endpoint=self.endpoint, stage=stage)
+        DB_QUERIES_PER_REQUEST.observe(self.db_queries, endpoint=self.endpoint)
+
+
+_current: contextvars.ContextVar = contextvars.ContextVar("atmos_request_timings", default=None)
+
+
+@contextmanager
+def stage(name: str):
+    """Time a block as one stage of the current request; a no-op outside instrumented requests"""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - started)
+
+
+def add_stage(name: str, seconds: float):
+    """Record a stage timed by the caller, e.g. one spanning the yields of a streamed response"""
+    timings = _current.get()
+    if timings is not None:
+        timings.add(name, seconds)
+
+
+def record_db_query(backend: str, variant: str):
+    """Count one prediction store query, called from the store on whatever thread runs it"""
+    DB_QUERIES.inc(backend=backend, variant=variant)
+    timings = _current.get()
+    if timings is not None:
+        timings.db_queries += 1
+
+
+def record_lookup(variant: str):
+    """Note which variant (row cache, MongoDB field, columnar, ...) answered a row lookup"""
+    LOOKUPS.inc(variant=variant)
+    timings = _current.get()
+    if timings is not None:
+        timings.lookup = variant
+
+
+def record_llm_usage(usage, time_to_first_token: Optional[float] = None):
+    """Token counts of one LLM call and, when known, its time to first token"""
+    timings = _current.get()
+    endpoint = timings.endpoint if timings is not None else ""
+    prompt_tokens = getattr(usage, "prompt_tokens", None)
+    completion_tokens = getattr(usage, "completion_tokens", None)
+    if prompt_tokens is not None:
+        LLM_PROMPT_TOKENS.observe(prompt_tokens, endpoint=endpoint)
+    if completion_tokens is not None:
+        LLM_COMPLETION_TOKENS.observe(completion_tokens, endpoint=endpoint)
+    if time_to_first_token is None:
+        # Non-streamed Groq responses report their queue and prompt processing time
+        queue_time, prompt_time = getattr(usage, "queue_time", None), getattr(usage, "prompt_time", None)
+        if queue_time is not None and prompt_time is not None:
+            time_to_first_token = queue_time + prompt_time
+    if time_to_first_token is not None:
+        LLM_TIME_TO_FIRST_TOKEN.observe(time_to_first_token, endpoint=endpoint)
+
+
+def record_governor_stop(section: str, tokens_saved: int):
+    """Count one stream the length governor closed and the completion budget it left unused"""
+    GOVERNOR_STOPS.inc(section=section)
+    GOVERNOR_TOKENS_SAVED.inc(tokens_saved)
+
+
+def record_inference_batch(dates: int, steps: int, seconds: float):
+    """Record one batched online rollout: the dates it answered and the days it computed"""
+    INFERENCE_BATCH_DATES.observe(dates)
+    INFERENCE_STEPS.inc(steps)
+    INFERENCE_SECONDS.observe(seconds)
+
+
+class ServerTimingMiddleware:
+    """
+    ASGI middleware that collects RequestTimings for the given paths,
+    adds them as a Server-Timing header and records the histograms once
+    the response body is complete. Streamed responses only carry the
+    stages finished before their headers were sent.
+    """
+
+    def __init__(self, app, paths: Iterable[str]):
+        self.app = app
+        self.paths = set(paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings(scope["path"])
+        token = _current.set(timings)
+        status = 500
+
+        async def send_with_timings(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", timings.server_timing().encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timings)
+        finally:
+            _current.reset(token)
+            timings.finish(status)
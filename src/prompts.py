@@ -0,0 +1,191 @@
+import logging
+import math
+import re
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever the prompt text changes, cached forecasts are keyed on it
+PROMPT_VERSION = "2"
+
+# Style instructions for the supported forecast styles
+STYLE_INSTRUCTIONS = {
+    "balanced": "Vary the summary format. Sometimes make it detailed and scientific, other times casual and conversational.",
+    "detailed": "Make the forecast detailed and scientific with technical meteorological information.",
+    "casual": "Make the forecast casual and conversational, as if talking to a friend.",
+    "broadcast": "Format the forecast like a professional weather reporter's broadcast script."
+}
+
+SYSTEM_TEMPLATE = """
+    You are a weather forecaster.
+    Write forecasts that are exactly {report_length} words long, in plain text without markdown like # or **.
+"""
+
+USER_TEMPLATE = """
+    Write a weather forecast for {date} that is EXACTLY {report_length} words long, based on the weather data below.
+    Do not mention "today" or "tomorrow", just focus on the weather for this date.
+    {style_text}
+    Make it natural, engaging and accurate.
+    End with a plain-text 'Weather Warnings' section in the same style that lists exactly the warnings given below.
+
+    Weather data:
+    {weather}
+
+    {warnings}
+"""
+
+WEATHER_LINES = [
+    ("Temperature", "{temperature_2m}°C (feels like {apparent_temperature}°C)"),
+    ("Humidity", "{relative_humidity_2m}%"),
+    ("Dew point", "{dew_point_2m}°C"),
+    ("Precipitation", "{precipitation} mm (rain {rain} mm, snowfall {snowfall} mm)"),
+    ("Snow depth", "{snow_depth} mm"),
+    ("Pressure", "{pressure_msl} hPa (surface {surface_pressure} hPa)"),
+    ("Cloud cover", "{cloud_cover}% (low {cloud_cover_low}%, mid {cloud_cover_mid}%, high {cloud_cover_high}%)"),
+    ("Wind", "{wind_speed_10m} km/h at 10m, gusting to {wind_gusts_10m} km/h"),
+]
+
+# Extra lines for rows rolled up from several hourly readings (see rollups.py), where the
+# lines above show means and totals; single-reading rows keep the prompt text unchanged
+ROLLUP_LINES = [
+    ("Temperature range", "{temperature_2m_min}°C to {temperature_2m_max}°C"),
+    ("Peak wind", "{wind_speed_10m_max} km/h at 10m"),
+]
+
+# Output budget: English prose runs ~1.35 tokens per word, plus slack for the model overshooting
+TOKENS_PER_WORD = 1.35
+OUTPUT_SLACK = 1.2
+OUTPUT_OVERHEAD_TOKENS = 16
+MAX_OUTPUT_TOKENS = 1024
+# Longest report_length accepted: its body and a warnings section still fit in MAX_OUTPUT_TOKENS
+MAX_REPORT_LENGTH = 600
+
+# Llama 3 uses a tiktoken BPE close to cl100k_base; without tiktoken fall back to a regex estimate
+try:
+    import tiktoken
+
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except Exception:
+    _encoding = None
+
+TOKEN_PIECES = re.compile(r"\d{1,3}|[^\W\d_]+|[^\w\s]|\n")
+
+
+def count_tokens(text: str) -> int:
+    """Local token count of `text` (exact with tiktoken installed, within ~10% otherwise)"""
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    tokens = 0
+    for piece in TOKEN_PIECES.findall(text):
+        # Common words are one token, long ones split roughly every 6 characters
+        tokens += 1 + (len(piece) - 1) // 6 if piece[0].isalpha() else 1
+    return tokens
+
+
+def compile_template(text: str) -> str:
+    """Strip indentation and trailing space, keeping single blank lines between paragraphs"""
+    lines = [line.strip() for line in text.strip().splitlines()]
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines))
+
+
+class PromptTemplate:
+    """System and user templates for one style, compiled once at import"""
+
+    def __init__(self, style: str, style_text: str):
+        self.style = style
+        self.system = compile_template(SYSTEM_TEMPLATE)
+        # The style text is baked in, leaving only per-request fields
+        self.user = compile_template(USER_TEMPLATE).replace("{style_text}", style_text.replace("{", "{{").replace("}", "}}"))
+        self.weather = "\n".join(f"- {label}: {line}" for label, line in WEATHER_LINES)
+        self.rollup_weather = "\n".join(f"- {label}: {line}" for label, line in ROLLUP_LINES)
+
+
+TEMPLATES = {style: PromptTemplate(style, text) for style, text in STYLE_INSTRUCTIONS.items()}
+
+
+class ForecastPrompt:
+    """Rendered messages for one forecast with their token budget"""
+
+    def __init__(self, style: str, messages: List[Dict[str, str]], input_tokens: int, max_tokens: int):
+        self.version = PROMPT_VERSION
+        self.style = style
+        self.messages = messages
+        self.input_tokens = input_tokens
+        self.max_tokens = max_tokens
+
+    @property
+    def estimated_tokens(self) -> int:
+        """Worst-case cost of the call, used for the tokens-per-minute budget"""
+        return self.input_tokens + self.max_tokens
+
+    def completion_params(self, model: str) -> Dict[str, Any]:
+        """Arguments for the Groq chat completion of this prompt"""
+        # Adjusted temperature for more consistent length
+        return {
+            "model": model,
+            "messages": self.messages,
+            "temperature": 0.7,
+            "max_tokens": self.max_tokens,
+            "top_p": 0.9,
+        }
+
+    def log_usage(self, usage) -> None:
+        """Log the actual token cost of the completion next to the local estimate"""
+        if usage is None:
+            return
+        logger.info(
+            f"Prompt v{self.version} {self.style}: {getattr(usage, 'prompt_tokens', None)} input tokens "
+            f"(estimated {self.input_tokens}), {getattr(usage, 'completion_tokens', None)} output tokens "
+            f"(max {self.max_tokens})"
+        )
+
+
+def format_value(value: Any) -> str:
+    """Weather values rounded to one decimal, the model gains nothing from six"""
+    if value is None:
+        return "N/A"
+    if isinstance(value, float):
+        return f"{value:.1f}"
+    return str(value)
+
+
+class _WeatherValues(dict):
+    def __missing__(self, key):
+        return "N/A"
+
+
+def build_warnings_section(disaster_warnings: Dict[str, Dict[str, str]]) -> str:
+    """Create a formatted warnings section for the LLM"""
+    if not disaster_warnings:
+        return "Weather Warnings:\nNo weather warnings for this date."
+    lines = [f"- {info['level'].upper()}: {info['message']}" for info in disaster_warnings.values()]
+    return "Weather Warnings:\n" + "\n".join(lines)
+
+
+def output_token_budget(report_length: int, warnings_section: str) -> int:
+    """max_tokens for a forecast of `report_length` words that ends with the warnings section"""
+    budget = math.ceil(report_length * TOKENS_PER_WORD * OUTPUT_SLACK) + count_tokens(warnings_section)
+    return min(budget + OUTPUT_OVERHEAD_TOKENS, MAX_OUTPUT_TOKENS)
+
+
+def build_prompt(date: str, style: Optional[str], report_length: int,
+                 weather_data: Dict[str, Any], disaster_warnings: Dict[str, Dict[str, str]]) -> ForecastPrompt:
+    """Render the compiled template of `style` for one forecast and size its token budget"""
+    template = TEMPLATES.get(style) or TEMPLATES["balanced"]
+    warnings_section = build_warnings_section(disaster_warnings)
+    values = _WeatherValues((key, format_value(value)) for key, value in weather_data.items())
+    weather = template.weather.format_map(values)
+    if (weather_data.get("hours") or 1) > 1:
+        weather += "\n" + template.rollup_weather.format_map(values)
+
+    system = template.system.format(report_length=report_length)
+    user = template.user.format(date=date, report_length=report_length, weather=weather, warnings=warnings_section)
+    messages = [
+        {"role": "system", "content": system},
+        {"role": "user", "content": user},
+    ]
+    prompt = ForecastPrompt(template.style, messages, count_tokens(system) + count_tokens(user),
+                            output_token_budget(report_length, warnings_section))
+    logger.info(f"Prompt v{PROMPT_VERSION} {prompt.style} for {date}: {prompt.input_tokens} input tokens, "
+                f"max_tokens={prompt.max_tokens}")
+    return prompt
@@ -0,0 +1,144 @@
+import argparse
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from pymongo import MongoClient
+
+from config import Settings
+from forecasting import RolloutEngine, clip_floor, predict_future_weather_extended
+from ingest import DEFAULT_COLUMNAR_PATH, DEFAULT_CSV_PATH, build_columnar_store, ingest_predictions, notify_reload
+from store import current_version, current_version_dir, publish_version, version_dir
+from training import (DEFAULT_MODEL_DIR, load_artifacts, load_observations, make_datasets, rollout_start,
+                      save_artifacts)
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_HORIZON_DAYS = 730
+PREDICTIONS_FILE = "predictions.csv"
+CHANGED_FILE = "changed.csv"
+
+
+def base_predictions(model_dir: str, fallback: str = DEFAULT_CSV_PATH) -> pd.DataFrame:
+    """Predictions of the current version, or the shipped CSV for an unversioned model"""
+    path = os.path.join(model_dir, PREDICTIONS_FILE)
+    return pd.read_csv(path if os.path.exists(path) else fallback)
+
+
+def merge_predictions(base: pd.DataFrame, changed: pd.DataFrame) -> pd.DataFrame:
+    """Keep base rows before the regenerated horizon and replace everything from its first day on"""
+    changed = changed.copy()
+    changed["date"] = changed["date"].astype(str)
+    first_day = changed["date"].iloc[0][:10]
+    kept = base[base["date"].astype(str).str[:10] < first_day]
+    return pd.concat([kept, changed], ignore_index=True)[list(base.columns)]
+
+
+def retrain(observations_csv: str, model_root: str = DEFAULT_MODEL_DIR, epochs: int = 2, batch_size: int = 32,
+            days: Optional[int] = None, version: Optional[str] = None, fallback_predictions: str = DEFAULT_CSV_PATH):
+    """
+    Fine-tune the current model on observations newer than its checkpoint and
+    write a new version (model, scaler, window, predictions) under
+    <model_root>/versions/<version>. Returns the version and its outputs,
+    or None when there is nothing new; the caller publishes it.
+    """
+    started = time.perf_counter()
+    source_dir = current_version_dir(model_root)
+    model, scaler, last_window, meta = load_artifacts(source_dir)
+    sequence_length = meta["sequence_length"]
+
+    values, columns, last_date = load_observations(observations_csv, since=meta["last_date"])
+    if not len(values):
+        logger.info(f"No observations after {meta['last_date']}, nothing to retrain")
+        return None
+    if columns != meta["columns"]:
+        raise ValueError(f"Observation columns {columns} do not match the model's {meta['columns']}")
+
+    # The checkpoint's final window gives the first new rows their history, so only new data is visited
+    new_scaled = scaler.transform(values)
+    data = np.concatenate([last_window[-sequence_length:], new_scaled.astype(np.float32, copy=False)])
+    train_ds, _ = make_datasets(data, sequence_length, batch_size, validation_split=0.0)
+    model.fit(train_ds, epochs=epochs)
+    fit_seconds = time.perf_counter() - started
+
+    days = days or meta.get("horizon_days", DEFAULT_HORIZON_DAYS)
+    engine = RolloutEngine(model, floor=clip_floor(columns))
+    changed = predict_future_weather_extended(model, scaler, rollout_start(data, sequence_length), columns, last_date,
+                                              days=days, engine=engine)
+    predictions = merge_predictions(base_predictions(source_dir, fallback_predictions), changed)
+
+    version = version or datetime.now().strftime("%Y%m%d%H%M%S")
+    out_dir = version_dir(model_root, version)
+    save_artifacts(out_dir, model, scaler, columns, data, last_date,
+                   rows=meta.get("rows", 0) + len(values), parent=current_version(model_root),
+                   new_rows=len(values), horizon_days=days)
+    changed.to_csv(os.path.join(out_dir, CHANGED_FILE), index=False)
+    predictions.to_csv(os.path.join(out_dir, PREDICTIONS_FILE), index=False)
+
+    logger.info(
+        f"Retrained version {version} on {len(values)} new rows in {fit_seconds:.1f}s, "
+        f"regenerated {len(changed)} of {len(predictions)} prediction days "
+        f"({engine.last_report['steps_per_second']} steps/s), total {time.perf_counter() - started:.1f}s"
+    )
+    return {
+        "version": version,
+        "dir": out_dir,
+        "new_rows": len(values),
+        "changed_days": len(changed),
+        "seconds": round(time.perf_counter() - started, 1),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fine-tune the LSTM on new observations and publish a new version")
+    parser.add_argument("--observations", required=True, help="Hourly observations CSV (only rows after the checkpoint are used)")
+    parser.add_argument("--model-root", default=DEFAULT_MODEL_DIR, help="Model directory written by training.py")
+    parser.add_argument("--epochs", type=int, default=2)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--days", type=int, default=None, help="Prediction horizon to regenerate (default: as before)")
+    parser.add_argument("--fallback-predictions", default=DEFAULT_CSV_PATH,
+                        help="Predictions CSV to merge into when the current model has none")
+    parser.add_argument("--target", choices=["columnar", "mongo", "none"], default="columnar",
+                        help="Where to publish the regenerated predictions")
+    parser.add_argument("--store", default=DEFAULT_COLUMNAR_PATH, help="Columnar store root for --target columnar")
+    parser.add_argument("--mongo-uri", default=os.getenv("MONGODB_URI", "mongodb://localhost:27017"))
+    parser.add_argument("--db", default=Settings.DB_NAME, help="Database name")
+    parser.add_argument("--collection", default="chennai_weather", help="Collection name")
+    parser.add_argument(
+        "--notify",
+        default=os.getenv("ATMOS_RELOAD_URL"),
+        help="Reload endpoint of a running API to call after publishing, e.g. http://localhost:8000/api/admin/reload "
+             "(under serve.py it has the supervisor re-snapshot and replace every worker, like a SIGHUP)",
+    )
+    args = parser.parse_args(argv)
+
+    result = retrain(args.observations, args.model_root, epochs=args.epochs, batch_size=args.batch_size,
+                     days=args.days, fallback_predictions=args.fallback_predictions)
+    if result is None:
+        return None
+
+    version = result["version"]
+    if args.target == "columnar":
+        # Write the new store version next to the old one, then flip CURRENT; readers swap on reload
+        build_columnar_store(os.path.join(result["dir"], PREDICTIONS_FILE), version_dir(args.store, version))
+        publish_version(args.store, version)
+    elif args.target == "mongo":
+        # Only the regenerated days are upserted
+        client = MongoClient(args.mongo_uri, serverSelectionTimeoutMS=5000)
+        try:
+            ingest_predictions(client[args.db][args.collection], os.path.join(result["dir"], CHANGED_FILE))
+        finally:
+            client.close()
+    publish_version(args.model_root, version)
+    notify_reload(args.notify)
+    return result
+
+
+if __name__ == "__main__":
+    main()
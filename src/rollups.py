@@ -0,0 +1,103 @@
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from store import LEVEL_KEYS, ROLLUP_EXTRA_FIELDS, WEATHER_FIELDS
+
+# Rollup pyramid: hourly prediction rows are aggregated into daily and weekly rows once, at
+# ingest time, so requests read one precomputed row whatever the resolution of the data.
+# Keys are "2025-03-01T13" for hours, the day for days and the Monday for weeks.
+
+# How each weather field is aggregated; a rolled-up row keeps the field names of an hourly
+# one, so prompts and warning rules read daily and weekly rows unchanged
+AGGREGATIONS = {field: "mean" for field in WEATHER_FIELDS}
+AGGREGATIONS.update({
+    "precipitation": "sum",
+    "rain": "sum",
+    "snowfall": "sum",
+    "snow_depth": "max",
+    "wind_gusts_10m": "max",
+    "wind_direction_10m": "circular_mean",
+    "wind_direction_100m": "circular_mean",
+})
+
+# Extra rollup fields (store.ROLLUP_EXTRA_FIELDS besides "hours"): name -> (source field, aggregation)
+EXTREMES = {
+    "temperature_2m_min": ("temperature_2m", "min"),
+    "temperature_2m_max": ("temperature_2m", "max"),
+    "wind_speed_10m_max": ("wind_speed_10m", "max"),
+}
+
+# Fields of a rolled-up row, in storage order; "hours" counts the hourly rows behind it
+ROLLUP_FIELDS = WEATHER_FIELDS + ROLLUP_EXTRA_FIELDS
+
+
+def hour_keys(timestamps: pd.Series) -> pd.Series:
+    return timestamps.dt.strftime("%Y-%m-%dT%H")
+
+
+def week_starts(timestamps: pd.Series) -> pd.Series:
+    """Monday of the (UTC) week of every timestamp, as YYYY-MM-DD"""
+    days = timestamps.dt.tz_localize(None).dt.normalize() if timestamps.dt.tz is not None else timestamps.dt.normalize()
+    return (days - pd.to_timedelta(days.dt.weekday, unit="D")).dt.strftime("%Y-%m-%d")
+
+
+def _circular_mean(degrees: pd.Series) -> float:
+    values = degrees.dropna().to_numpy(dtype=np.float64)
+    if not len(values):
+        return np.nan
+    # The sin/cos round trip is not exact, a single reading is kept as it is
+    if len(values) == 1:
+        return float(values[0])
+    radians = np.deg2rad(values)
+    return float(np.rad2deg(np.arctan2(np.sin(radians).mean(), np.cos(radians).mean())) % 360.0)
+
+
+def rollup(frame: pd.DataFrame, granularity: str) -> pd.DataFrame:
+    """
+    Aggregate normalized hourly rows (see ingest.normalize_chunk) into one
+    row per day or per week. The result holds the level's key field, a
+    `date` text (the last timestamp of a day, the Monday of a week) and
+    ROLLUP_FIELDS; a day with a single row rolls up to that row.
+    """
+    key_field = LEVEL_KEYS[granularity]
+    timestamps = pd.to_datetime(frame["date"], utc=True)
+    keys = frame["date_key"] if granularity == "daily" else week_starts(timestamps)
+    fields = [field for field in WEATHER_FIELDS if field in frame.columns]
+    grouped = frame.assign(_key=keys.to_numpy(), _ts=timestamps.to_numpy()).sort_values("_ts").groupby("_key", sort=True)
+
+    columns: Dict[str, pd.Series] = {}
+    for field in fields:
+        how = AGGREGATIONS[field]
+        if how == "circular_mean":
+            columns[field] = grouped[field].agg(_circular_mean)
+        elif how == "sum":
+            columns[field] = grouped[field].sum(min_count=1)
+        else:
+            columns[field] = grouped[field].agg(how)
+    for name, (source, how) in EXTREMES.items():
+        if source in frame.columns:
+            columns[name] = grouped[source].agg(how)
+    columns["hours"] = grouped["date"].size().astype(np.float64)
+
+    result = pd.DataFrame(columns)
+    result.index.name = key_field
+    result = result.reset_index()
+    result["date"] = grouped["date"].last().to_numpy() if granularity == "daily" else result[key_field]
+    return result[[key_field, "date"] + [name for name in ROLLUP_FIELDS if name in result.columns]]
+
+
+def rollup_levels(frame: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """Every level of the pyramid for a frame of normalized hourly rows"""
+    hourly = frame.drop_duplicates(subset="hour_key", keep="last").sort_values("hour_key")
+    return {
+        "hourly": hourly,
+        "daily": rollup(hourly, "daily"),
+        "weekly": rollup(hourly, "weekly"),
+    }
+
+
+def level_fields(frame: pd.DataFrame) -> List[str]:
+    """Value fields present in one level's frame, in storage order"""
+    return [field for field in ROLLUP_FIELDS if field in frame.columns]
@@ -0,0 +1,47 @@
+from typing import Any, Dict, Mapping, Optional
+
+from warnings_engine import evaluate_rows
+
+# Disaster warning thresholds and rules. Nothing here opens a connection, so
+# workers and CLIs import it in milliseconds; the rule table itself lives in
+# warnings_engine.WARNING_RULES.
+
+# Updated disaster warning thresholds with lower values to detect even minor warnings
+DISASTER_THRESHOLDS = {
+    "heavy_rain": 20.0,  # mm precipitation (lowered from 30.0)
+    "flood_risk": 40.0,  # mm precipitation (lowered from 50.0)
+    "severe_wind": 50.0,  # km/h wind speed (lowered from 60.0)
+    "high_wind": 30.0,   # km/h wind speed (new minor threshold)
+    "extreme_heat": 38.0, # °C (lowered from 40.0)
+    "hot_weather": 34.0,  # °C (new minor threshold)
+    "high_humidity": 80.0, # % (new threshold)
+    "cyclone_risk": 70.0, # km/h wind with heavy rain (lowered from 80.0)
+    "drought_risk": {
+        "max_temp": 33.0,  # °C (lowered from 35.0)
+        "max_humidity": 40.0,  # % (raised from 30.0 to be more sensitive)
+        "max_precipitation": 1.0,  # mm (raised from 0.5 to be more sensitive)
+    },
+    "moderate_rain": 10.0,  # mm precipitation (minor)
+    "breezy_wind": 20.0,  # km/h wind speed (minor)
+    "warm_weather": 30.0,  # °C (minor)
+    "cool_weather": 10.0,  # °C and below (minor)
+    "moderate_humidity": 70.0,  # % (minor)
+    "storm_risk": {
+        "min_wind": 40.0,  # km/h wind
+        "min_precipitation": 15.0,  # mm precipitation
+    },
+    "overcast": 80.0,  # % cloud cover
+    "low_pressure": 1000.0,  # hPa, below
+    "high_pressure": 1025.0,  # hPa, above
+}
+
+
+def detect_disaster_warnings(weather_data: Optional[Mapping[str, Any]],
+                             thresholds: Mapping[str, Any] = DISASTER_THRESHOLDS) -> Dict[str, Dict[str, str]]:
+    """
+    Applies rule-based filtering to detect potential disaster conditions
+    Returns a dictionary with disaster types and severity levels
+    """
+    if not weather_data:
+        return {}
+    return evaluate_rows([weather_data], thresholds)[0]
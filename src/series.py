@@ -0,0 +1,90 @@
+import gzip
+import hashlib
+import json
+from typing import Any, List, Optional
+
+from store import GRANULARITIES, ROLLUP_EXTRA_FIELDS, WEATHER_FIELDS
+
+# Served when the request names no fields: what the charts plot
+DEFAULT_SERIES_FIELDS = ["temperature_2m", "precipitation", "wind_speed_10m"]
+
+# Fields a series can be read for; the rollup extras are null on hourly rows
+SERIES_FIELDS = WEATHER_FIELDS + ROLLUP_EXTRA_FIELDS
+
+# Bodies smaller than this are sent uncompressed, gzip would not pay for its header
+GZIP_MIN_BYTES = 1024
+
+# orjson serializes float lists several times faster than json; fall back when it is not installed
+try:
+    import orjson
+
+    def dumps(payload: Any) -> bytes:
+        return orjson.dumps(payload)
+except ImportError:
+    def dumps(payload: Any) -> bytes:
+        return json.dumps(payload, separators=(",", ":")).encode("utf-8")
+
+
+def parse_fields(text: Optional[str]) -> List[str]:
+    """Comma-separated field names, validated against the stored weather fields"""
+    if not text:
+        return list(DEFAULT_SERIES_FIELDS)
+    fields = list(dict.fromkeys(name.strip() for name in text.split(",") if name.strip()))
+    unknown = [name for name in fields if name not in SERIES_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}. Use any of: {', '.join(SERIES_FIELDS)}")
+    return fields
+
+
+def parse_granularity(text: Optional[str]) -> str:
+    """Rollup level of a series request, daily by default"""
+    granularity = (text or "daily").strip().lower()
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Unknown granularity: {text}. Use any of: {', '.join(GRANULARITIES)}")
+    return granularity
+
+
+def series_etag(dataset_version: str, date_from: str, date_to: str, fields: List[str], granularity: str = "daily") -> str:
+    """Weak ETag of one range response, changing whenever the dataset does"""
+    query = f"{date_from}|{date_to}|{','.join(fields)}|{granularity}"
+    query = hashlib.sha256(query.encode("utf-8")).hexdigest()[:12]
+    return f'W/"{dataset_version}-{query}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header names `etag` (weak comparison, as RFC 9110 asks for GETs)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if (candidate[2:] if candidate.startswith("W/") else candidate) == opaque:
+            return True
+    return False
+
+
+def accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    return "gzip" in (accept_encoding or "").lower()
+
+
+def encode_series(date_from: str, date_to: str, fields: List[str], date_keys: List[str], columns,
+                  granularity: str = "daily") -> bytes:
+    """Columnar JSON body: one list of keys (days, hours or week Mondays) and one list of values per field"""
+    return dumps({
+        "from": date_from,
+        "to": date_to,
+        "granularity": granularity,
+        "fields": fields,
+        "count": len(date_keys),
+        "dates": date_keys,
+        "values": {name: columns[name] for name in fields},
+    })
+
+
+def compress(body: bytes) -> Optional[bytes]:
+    """Gzipped body, or None when it is too small to be worth compressing"""
+    if len(body) < GZIP_MIN_BYTES:
+        return None
+    return gzip.compress(body, compresslevel=6, mtime=0)
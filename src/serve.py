@@ -0,0 +1,213 @@
+import argparse
+import logging
+import math
+import os
+import shutil
+import signal
+import socket
+import tempfile
+import time
+from typing import Dict, Optional
+
+import uvicorn
+
+from config import Settings
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Workers that exit sooner than this after starting are restarted with a delay, not in a tight loop
+MIN_WORKER_SECONDS = 5.0
+
+
+def export_snapshot(root: str) -> str:
+    """Copy the MongoDB predictions into a fresh columnar store under `root` and return its path"""
+    from pymongo import MongoClient
+
+    from ingest import snapshot_columnar_store
+    from store import MongoPredictionStore
+
+    client = MongoClient(os.getenv("MONGODB_URI", Settings.MONGO_URI), serverSelectionTimeoutMS=5000)
+    try:
+        store = MongoPredictionStore(client[Settings.DB_NAME])
+        if store.plan is None:
+            raise RuntimeError("No MongoDB collection with prediction data to snapshot")
+        out_dir = tempfile.mkdtemp(prefix="atmos-snapshot-", dir=root)
+        try:
+            snapshot_columnar_store(store.db[store.plan[0]], out_dir)
+        except Exception:
+            shutil.rmtree(out_dir, ignore_errors=True)
+            raise
+    finally:
+        client.close()
+    return out_dir
+
+
+def share_limits(workers: int):
+    """Split the client-side Groq limits between the workers, so together they stay within them"""
+    Settings.GROQ_REQUESTS_PER_MINUTE /= workers
+    Settings.GROQ_TOKENS_PER_MINUTE /= workers
+    Settings.LLM_MAX_CONCURRENCY = max(math.ceil(Settings.LLM_MAX_CONCURRENCY / workers), 1)
+
+
+class Supervisor:
+    """
+    Pre-forking process manager. The parent imports the app (and everything
+    it imports) once and forks the workers from it, so they share those
+    pages copy-on-write and accept connections on one listening socket.
+    Workers that die are replaced; SIGHUP (also sent by /api/admin/reload)
+    takes a new snapshot and replaces every worker; SIGTERM and SIGINT stop
+    them all.
+    """
+
+    def __init__(self, api, sock: socket.socket, workers: int, snapshot_root: Optional[str] = None,
+                 log_level: str = "info"):
+        self.api = api
+        self.sock = sock
+        self.workers = workers
+        self.snapshot_root = snapshot_root
+        self.log_level = log_level
+        self.snapshot: Optional[str] = None
+        self.children: Dict[int, float] = {}  # pid -> start time
+        self.retiring = set()  # workers of the previous generation, stopped by a reload
+        self.stopping = False
+        self.reloading = False
+
+    def take_snapshot(self):
+        """Point new workers at a fresh snapshot; returns the previous one to remove once they are replaced"""
+        previous = self.snapshot
+        self.snapshot = export_snapshot(self.snapshot_root)
+        Settings.STORAGE_BACKEND = "columnar"
+        Settings.COLUMNAR_STORE_PATH = self.snapshot
+        return previous
+
+    def spawn(self):
+        pid = os.fork()
+        if pid == 0:
+            self._run_worker()
+        self.children[pid] = time.monotonic()
+
+    def _run_worker(self):
+        status = 0
+        try:
+            for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+                signal.signal(signum, signal.SIG_DFL)
+            config = uvicorn.Config(self.api.app, log_level=self.log_level, lifespan="on")
+            uvicorn.Server(config).run(sockets=[self.sock])
+        except BaseException:
+            logger.exception(f"Worker {os.getpid()} failed")
+            status = 1
+        finally:
+            os._exit(status)
+
+    def _stop(self, signum, frame):
+        self.stopping = True
+        for pid in list(self.children):
+            self._kill(pid)
+
+    def _reload(self, signum, frame):
+        self.reloading = True
+
+    def _kill(self, pid: int, signum: int = signal.SIGTERM):
+        try:
+            os.kill(pid, signum)
+        except ProcessLookupError:
+            pass
+
+    def replace_workers(self):
+        """Start a new generation of workers, then stop the old one"""
+        previous = self.take_snapshot() if self.snapshot_root else None
+        old = [pid for pid in self.children if pid not in self.retiring]
+        for _ in range(self.workers):
+            self.spawn()
+        for pid in old:
+            self.retiring.add(pid)
+            self._kill(pid)
+        # Files mapped by the old workers stay readable after they are removed
+        if previous:
+            shutil.rmtree(previous, ignore_errors=True)
+        logger.info(f"Replaced workers {old} with {[pid for pid in self.children if pid not in self.retiring]}")
+
+    def run(self):
+        # Workers inherit it and forward /api/admin/reload as a SIGHUP, see app.reload_predictions
+        Settings.SUPERVISOR_PID = os.getpid()
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+        signal.signal(signal.SIGHUP, self._reload)
+        try:
+            if self.snapshot_root:
+                try:
+                    self.take_snapshot()
+                except Exception as e:
+                    logger.error(f"Snapshot failed, the workers read MongoDB themselves: {str(e)}")
+            for _ in range(self.workers):
+                self.spawn()
+            logger.info(f"Started {self.workers} workers: {list(self.children)}")
+            while self.children:
+                if self.reloading and not self.stopping:
+                    self.reloading = False
+                    try:
+                        self.replace_workers()
+                    except Exception as e:
+                        logger.error(f"Reload failed, keeping the running workers: {str(e)}")
+                self._reap()
+                time.sleep(0.2)
+        finally:
+            if self.snapshot:
+                shutil.rmtree(self.snapshot, ignore_errors=True)
+
+    def _reap(self):
+        while self.children:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+            if pid == 0:
+                return
+            started = self.children.pop(pid, None)
+            if pid in self.retiring:
+                self.retiring.discard(pid)
+                continue
+            if started is None or self.stopping:
+                continue
+            logger.warning(f"Worker {pid} exited with status {os.waitstatus_to_exitcode(status)}, restarting it")
+            if time.monotonic() - started < MIN_WORKER_SECONDS:
+                time.sleep(1.0)
+            self.spawn()
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the API from several worker processes sharing one copy of the data")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=Settings.WORKERS)
+    parser.add_argument("--snapshot", action=argparse.BooleanOptionalAction, default=None,
+                        help="Serve a tmpfs snapshot of the MongoDB predictions (default: with the mongo backend and "
+                             "more than one worker)")
+    parser.add_argument("--snapshot-dir", default=Settings.SHARED_SNAPSHOT_DIR, help="Where to write the snapshot")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args(argv)
+
+    workers = max(args.workers, 1)
+    snapshot = args.snapshot if args.snapshot is not None else Settings.STORAGE_BACKEND == "mongo" and workers > 1
+    share_limits(workers)
+    sock = bind_socket(args.host, args.port)
+
+    # Preload: import the app in the parent so every worker forks from the same pages
+    import app as api
+
+    logger.info(f"Serving on http://{args.host}:{args.port} with {workers} workers"
+                f"{' from a shared snapshot' if snapshot else ''}")
+    Supervisor(api, sock, workers, args.snapshot_dir if snapshot else None, args.log_level).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+import argparse
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+from typing import Dict, List, Optional
+
+# Brotli beats gzip by another 15-20% on text assets; served only when the package is installed
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Fingerprinted names never change content, so browsers may keep them for a year without asking
+IMMUTABLE = "public, max-age=31536000, immutable"
+# Entry pages keep their names and are revalidated on every load (a 304 when unchanged)
+REVALIDATE = "no-cache"
+
+ENTRY_PAGES = {"index.html"}
+TEXT_TYPES = {".html", ".css", ".js", ".svg", ".json", ".txt"}
+# Assets are rewritten in this order, so the names a file refers to are hashed before it is
+REWRITE_ORDER = {".css": 1, ".js": 2, ".html": 3}
+# Smaller bodies are sent as they are
+COMPRESS_MIN_BYTES = 256
+
+
+class Asset:
+    """One servable file: its body, precompressed variants and response headers"""
+
+    def __init__(self, name: str, body: bytes, cache_control: str):
+        self.name = name
+        self.body = body
+        self.cache_control = cache_control
+        self.digest = hashlib.sha256(body).hexdigest()[:12]
+        self.media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        self.encoded: Dict[str, bytes] = {}
+        if len(body) >= COMPRESS_MIN_BYTES and os.path.splitext(name)[1] in TEXT_TYPES:
+            gzipped = gzip.compress(body, compresslevel=9, mtime=0)
+            if len(gzipped) < len(body):
+                self.encoded["gzip"] = gzipped
+            if brotli is not None:
+                compressed = brotli.compress(body, quality=11)
+                if len(compressed) < len(gzipped):
+                    self.encoded["br"] = compressed
+
+    def etag(self, encoding: Optional[str]) -> str:
+        return f'"{self.digest}-{encoding}"' if encoding else f'"{self.digest}"'
+
+
+def hashed_name(name: str, body: bytes) -> str:
+    stem, extension = os.path.splitext(name)
+    return f"{stem}.{hashlib.sha256(body).hexdigest()[:10]}{extension}"
+
+
+def rewrite_references(text: str, names: Dict[str, str]) -> str:
+    """Replace quoted or url()-wrapped references to the original names with the hashed ones"""
+    if not names:
+        return text
+    pattern = re.compile(r"""(?<=["'(])(?:\./)?(%s)(?=["')?#])""" % "|".join(re.escape(name) for name in names))
+    return pattern.sub(lambda match: names[match.group(1)], text)
+
+
+class AssetManifest:
+    """
+    The frontend directory turned into immutable, fingerprinted assets:
+    every file but the entry pages gets a content hash in its name, the
+    references to it are rewritten, and text files are compressed once.
+    The original names stay servable, revalidated through their ETag.
+    """
+
+    def __init__(self, source_dir: str):
+        self.source_dir = source_dir
+        self.assets: Dict[str, Asset] = {}
+        self.hashed: Dict[str, str] = {}  # original name -> fingerprinted name
+        self.build()
+
+    def build(self):
+        names = sorted(
+            (name for name in os.listdir(self.source_dir) if os.path.isfile(os.path.join(self.source_dir, name))),
+            key=lambda name: (REWRITE_ORDER.get(os.path.splitext(name)[1], 0), name),
+        )
+        for name in names:
+            with open(os.path.join(self.source_dir, name), "rb") as f:
+                body = f.read()
+            if os.path.splitext(name)[1] in REWRITE_ORDER:
+                body = rewrite_references(body.decode("utf-8"), self.hashed).encode("utf-8")
+            if name in ENTRY_PAGES:
+                self.assets[name] = Asset(name, body, REVALIDATE)
+                continue
+            fingerprinted = hashed_name(name, body)
+            self.hashed[name] = fingerprinted
+            self.assets[fingerprinted] = Asset(fingerprinted, body, IMMUTABLE)
+            self.assets[name] = Asset(name, body, REVALIDATE)
+        logger.info(f"Built {len(self.hashed)} fingerprinted frontend assets from {self.source_dir}")
+
+    def get(self, path: str) -> Optional[Asset]:
+        name = path.strip("/") or "index.html"
+        return self.assets.get(name)
+
+    def write(self, out_dir: str) -> List[str]:
+        """Write every asset and its precompressed variants (.gz, .br) for a web server or CDN to serve"""
+        os.makedirs(out_dir, exist_ok=True)
+        written = []
+        suffixes = {"gzip": ".gz", "br": ".br"}
+        for name, asset in self.assets.items():
+            for encoding, body in [(None, asset.body)] + list(asset.encoded.items()):
+                path = os.path.join(out_dir, name + (suffixes[encoding] if encoding else ""))
+                with open(path, "wb") as f:
+                    f.write(body)
+                written.append(path)
+        return written
+
+
+def choose_encoding(asset: Asset, accept_encoding: str) -> Optional[str]:
+    """Best precompressed variant the client accepts: br, then gzip, else the plain body"""
+    accepted = {part.split(";")[0].strip().lower() for part in accept_encoding.split(",")}
+    for encoding in ("br", "gzip"):
+        if encoding in asset.encoded and encoding in accepted:
+            return encoding
+    return None
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in tags or etag in tags
+
+
+class StaticAssets:
+    """
+    ASGI app serving an AssetManifest from memory: GET and HEAD only, the
+    precompressed body the client accepts, and a 304 when If-None-Match
+    names the current ETag.
+    """
+
+    def __init__(self, manifest: AssetManifest):
+        self.manifest = manifest
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return
+        path = scope["path"]
+        root_path = scope.get("root_path", "")
+        if root_path and path.startswith(root_path):
+            path = path[len(root_path):]
+        headers = {key.decode("latin-1").lower(): value.decode("latin-1") for key, value in scope["headers"]}
+        asset = self.manifest.get(path) if scope["method"] in ("GET", "HEAD") else None
+        if asset is None:
+            status = 404 if scope["method"] in ("GET", "HEAD") else 405
+            await self._send(send, status, [(b"content-type", b"text/plain; charset=utf-8")],
+                             b"Not Found" if status == 404 else b"Method Not Allowed")
+            return
+
+        encoding = choose_encoding(asset, headers.get("accept-encoding", ""))
+        etag = asset.etag(encoding)
+        response_headers = [
+            (b"cache-control", asset.cache_control.encode("latin-1")),
+            (b"etag", etag.encode("latin-1")),
+            (b"vary", b"Accept-Encoding"),
+        ]
+        if etag_matches(headers.get("if-none-match", ""), etag):
+            await self._send(send, 304, response_headers, b"")
+            return
+        body = asset.encoded[encoding] if encoding else asset.body
+        response_headers.append((b"content-type", self._content_type(asset).encode("latin-1")))
+        if encoding:
+            response_headers.append((b"content-encoding", encoding.encode("latin-1")))
+        await self._send(send, 200, response_headers, b"" if scope["method"] == "HEAD" else body, len(body))
+
+    @staticmethod
+    def _content_type(asset: Asset) -> str:
+        text = asset.media_type.startswith("text/") or asset.media_type in ("application/javascript", "image/svg+xml")
+        return f"{asset.media_type}; charset=utf-8" if text else asset.media_type
+
+    @staticmethod
+    async def _send(send, status: int, headers, body: bytes, length: Optional[int] = None):
+        if status != 304:
+            headers = headers + [(b"content-length", str(len(body) if length is None else length).encode("latin-1"))]
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fingerprint and precompress a frontend for a web server or CDN")
+    parser.add_argument("--src", default=os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "frontend"))
+    parser.add_argument("--out", required=True, help="Directory to write the assets to")
+    args = parser.parse_args(argv)
+
+    manifest = AssetManifest(args.src)
+    written = manifest.write(args.out)
+    logger.info(f"Wrote {len(written)} files to {args.out}: {manifest.hashed}")
+    return manifest
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,433 @@
+import hashlib
+import json
+import logging
+import os
+import re
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Optional
+
+import numpy as np
+from pymongo import ReplaceOne
+
+from cache import MISSING, LRUCache
+from metrics import record_db_query, record_lookup
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_COLUMNAR_PATH = os.path.join(os.path.dirname(BASE_DIR), "lstm_predictions", "predictions_store")
+
+# Weather fields served to the API, in the order they are stored
+WEATHER_FIELDS = [
+    "temperature_2m",
+    "relative_humidity_2m",
+    "dew_point_2m",
+    "apparent_temperature",
+    "precipitation",
+    "rain",
+    "snowfall",
+    "snow_depth",
+    "pressure_msl",
+    "surface_pressure",
+    "cloud_cover",
+    "cloud_cover_low",
+    "cloud_cover_mid",
+    "cloud_cover_high",
+    "wind_speed_10m",
+    "wind_speed_100m",
+    "wind_direction_10m",
+    "wind_direction_100m",
+    "wind_gusts_10m",
+]
+
+# Extra fields of rolled-up (daily and weekly) rows, computed by rollups.py at ingest time
+ROLLUP_EXTRA_FIELDS = ["temperature_2m_min", "temperature_2m_max", "wind_speed_10m_max", "hours"]
+
+# Levels of the rollup pyramid and the key field each is indexed on
+GRANULARITIES = ["hourly", "daily", "weekly"]
+LEVEL_KEYS = {"hourly": "hour_key", "daily": "date_key", "weekly": "week_key"}
+
+COLUMNAR_FORMAT_VERSION = 1
+
+DATE_PREFIX = re.compile(r"^\d{4}-\d{2}-\d{2}")
+
+# Versioned artifact layout: <root>/versions/<version>/ plus a <root>/CURRENT pointer file
+CURRENT_POINTER = "CURRENT"
+VERSIONS_DIR = "versions"
+
+
+def current_version(root: str) -> Optional[str]:
+    """Version named by <root>/CURRENT, or None for an unversioned directory"""
+    try:
+        with open(os.path.join(root, CURRENT_POINTER)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def current_version_dir(root: str) -> str:
+    """Directory holding the current artifacts of `root`"""
+    version = current_version(root)
+    return os.path.join(root, VERSIONS_DIR, version) if version else root
+
+
+def version_dir(root: str, version: str) -> str:
+    return os.path.join(root, VERSIONS_DIR, version)
+
+
+def dataset_version(date_keys, columns) -> str:
+    """Fingerprint of a whole prediction set, changes whenever any date or value does"""
+    digest = hashlib.sha256("\n".join(date_keys).encode("utf-8"))
+    for field in sorted(columns):
+        digest.update(field.encode("utf-8"))
+        digest.update(np.ascontiguousarray(columns[field], dtype=np.float64).tobytes())
+    return digest.hexdigest()[:16]
+
+
+def week_start(date_key: str) -> str:
+    """Monday of the week holding a YYYY-MM-DD date"""
+    day = datetime.strptime(date_key, "%Y-%m-%d")
+    return (day - timedelta(days=day.weekday())).strftime("%Y-%m-%d")
+
+
+def null_nan(values) -> list:
+    """Column values as a list with NaN reported as null, like MongoDB would"""
+    return [None if value != value else value for value in values]
+
+
+def lookup_row(row: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    A row as lookups return it: a day rolled up from a single reading is
+    that reading, so its rollup extras are dropped and data_used and the
+    prompt see the same fields as before the rollup pyramid.
+    """
+    if row is not None and (row.get("hours") or 1) <= 1:
+        for name in ROLLUP_EXTRA_FIELDS:
+            row.pop(name, None)
+    return row
+
+
+def publish_version(root: str, version: str):
+    """Atomically point <root>/CURRENT at an already written version"""
+    if not os.path.isdir(version_dir(root, version)):
+        raise FileNotFoundError(f"No version {version} under {root}")
+    pointer = os.path.join(root, CURRENT_POINTER)
+    with open(pointer + ".tmp", "w") as f:
+        f.write(version + "\n")
+    os.replace(pointer + ".tmp", pointer)
+    logger.info(f"Published {root} version {version}")
+
+
+class MongoPredictionStore:
+    """
+    Prediction lookups against MongoDB.
+    The collection and date format are detected once (detect_plan) so every
+    lookup is a single find_one; call refresh() after the data is re-ingested.
+    """
+
+    name = "mongo"
+    blocking_io = True
+    writable = True
+    collections_to_try = ["chennai_weather", "weather_data"]
+
+    def __init__(self, db):
+        self.db = db
+        self.fields = {"_id": 0, "date": 1, **{field: 1 for field in WEATHER_FIELDS + ROLLUP_EXTRA_FIELDS}}
+        self.plan = None
+        self.detect_plan()
+
+    def detect_plan(self):
+        """Pick the collection and build the query used for every lookup"""
+        self.plan = None
+        available = self.db.list_collection_names()
+        for collection_name in self.collections_to_try:
+            if collection_name not in available:
+                continue
+            sample = self.db[collection_name].find_one({}, {"_id": 0, "date": 1, "date_key": 1})
+            if not sample:
+                continue
+            logger.info(f"Sample date from {collection_name}: {sample}")
+
+            if "date_key" in sample:
+                # Canonical date_key written by ingest.py (unique index)
+                self.plan = (collection_name, "date_key", "")
+            elif isinstance(sample.get("date"), str) and DATE_PREFIX.match(sample["date"]):
+                # Stored dates share one time suffix, e.g. "2024-02-20 23:00:00+00:00"
+                self.plan = (collection_name, "date", sample["date"][10:])
+            else:
+                continue
+            logger.info(f"MongoDB lookup plan: collection={collection_name} field={self.plan[1]} suffix={self.plan[2]!r}")
+            return self.plan
+
+        logger.warning("No MongoDB collection with prediction data found")
+        return None
+
+    def refresh(self):
+        self.detect_plan()
+
+    def ping(self):
+        self.db.command("ping")
+
+    def get(self, date_key: str) -> Optional[Dict[str, Any]]:
+        """Return the prediction row for a YYYY-MM-DD date, or None"""
+        if self.plan is None:
+            record_lookup("none")
+            return None
+        collection_name, field, suffix = self.plan
+        record_db_query(self.name, field)
+        record_lookup(f"{self.name}_{field}")
+        return lookup_row(self.db[collection_name].find_one({field: f"{date_key}{suffix}"}, self.fields))
+
+    def get_many(self, date_keys: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Fetch several dates with one $in query, keyed by YYYY-MM-DD"""
+        date_keys = list(date_keys)
+        if self.plan is None or not date_keys:
+            return {}
+        collection_name, field, suffix = self.plan
+        record_db_query(self.name, f"{field}_in")
+        cursor = self.db[collection_name].find({field: {"$in": [f"{key}{suffix}" for key in date_keys]}}, self.fields)
+        return {str(row["date"])[:10]: lookup_row(row) for row in cursor}
+
+    def get_range(self, date_from: str, date_to: str, fields: Iterable[str], granularity: str = "daily"):
+        """
+        Keys in [date_from, date_to] of one rollup level and their values per
+        field, from one range query on the level's indexed key. Hourly and
+        weekly rows live in "<collection>_hourly" and "<collection>_weekly".
+        """
+        fields = list(fields)
+        if self.plan is None:
+            return [], {field: [] for field in fields}
+        collection_name, field, suffix = self.plan
+        if granularity == "daily":
+            lower, upper, key_field = f"{date_from}{suffix}", f"{date_to}{suffix}", field
+        else:
+            collection_name, key_field = f"{collection_name}_{granularity}", LEVEL_KEYS[granularity]
+            if granularity == "hourly":
+                lower, upper = date_from, f"{date_to}T23"
+            else:
+                lower, upper = week_start(date_from), date_to
+        record_db_query(self.name, f"{key_field}_range")
+        projection = {"_id": 0, "date": 1, key_field: 1, **{name: 1 for name in fields}}
+        rows = list(self.db[collection_name].find({key_field: {"$gte": lower, "$lte": upper}}, projection).sort(key_field, 1))
+        if granularity == "daily":
+            keys = [str(row["date"])[:10] for row in rows]
+        else:
+            keys = [row[key_field] for row in rows]
+        return keys, {name: null_nan(row.get(name) for row in rows) for name in fields}
+
+    def put_many(self, rows: Iterable[Dict[str, Any]]):
+        """Upsert daily rows computed after ingest (see inference.py) on the lookup field"""
+        if self.plan is None:
+            raise RuntimeError("No MongoDB collection with prediction data to write to")
+        collection_name, field, suffix = self.plan
+        operations = [ReplaceOne({field: row[field]}, row, upsert=True) for row in rows]
+        if operations:
+            record_db_query(self.name, "put_many")
+            self.db[collection_name].bulk_write(operations, ordered=False)
+
+    def load_columns(self):
+        """Read every row as (date keys, field -> float64 column), missing values as NaN"""
+        if self.plan is None:
+            return [], {}
+        collection_name, field, _ = self.plan
+        rows = list(self.db[collection_name].find({}, self.fields).sort(field, 1))
+        date_keys = [str(row["date"])[:10] for row in rows]
+        columns = {
+            name: np.array([np.nan if row.get(name) is None else row[name] for row in rows], dtype=np.float64)
+            for name in WEATHER_FIELDS + ROLLUP_EXTRA_FIELDS
+        }
+        return date_keys, columns
+
+    def close(self):
+        pass
+
+
+class CachedPredictionStore:
+    """Read-through LRU/TTL row cache in front of another store, including misses"""
+
+    def __init__(self, store, max_size: int = 1024, ttl: float = 300.0, negative_ttl: float = 30.0):
+        self.store = store
+        self.name = store.name
+        self.blocking_io = store.blocking_io
+        self.writable = store.writable
+        self.cache = LRUCache(max_size=max_size, ttl=ttl, negative_ttl=negative_ttl)
+
+    def cached(self, date_key: str):
+        """Cache-only lookup returning (found, row), never touches the underlying store"""
+        found, row = self.cache.get(date_key)
+        if found:
+            record_lookup("row_cache")
+        if found and row is MISSING:
+            return True, None
+        return found, row
+
+    def get(self, date_key: str) -> Optional[Dict[str, Any]]:
+        found, row = self.cached(date_key)
+        if found:
+            return row
+        row = self.store.get(date_key)
+        self.cache.set(date_key, MISSING if row is None else row)
+        return row
+
+    def get_many(self, date_keys: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        rows = {}
+        missing = []
+        for date_key in date_keys:
+            found, row = self.cached(date_key)
+            if not found:
+                missing.append(date_key)
+            elif row is not None:
+                rows[date_key] = row
+        if missing:
+            fetched = self.store.get_many(missing)
+            for date_key in missing:
+                row = fetched.get(date_key)
+                self.cache.set(date_key, MISSING if row is None else row)
+            rows.update(fetched)
+        return rows
+
+    def get_range(self, date_from: str, date_to: str, fields: Iterable[str], granularity: str = "daily"):
+        return self.store.get_range(date_from, date_to, fields, granularity)
+
+    def put_many(self, rows: Iterable[Dict[str, Any]]):
+        rows = list(rows)
+        self.store.put_many(rows)
+        # Replace the cached misses of the new dates
+        for row in rows:
+            self.cache.set(row["date_key"], row)
+
+    def load_columns(self):
+        return self.store.load_columns()
+
+    def ping(self):
+        self.store.ping()
+
+    def invalidate(self):
+        """Drop cached rows and re-detect the lookup plan (called after re-ingest)"""
+        self.cache.clear()
+        self.store.refresh()
+        logger.info(f"Invalidated {self.name} row cache")
+
+    def close(self):
+        self.store.close()
+
+
+class ColumnarPredictionStore:
+    """
+    Prediction lookups from a memory-mapped columnar file set.
+    values.npy holds one contiguous float64 column per weather field and
+    dates.npy the sorted datetime64[D] index, so a lookup is a binary search
+    plus a gather with no network I/O. Pages are shared between worker
+    processes through the OS page cache. The files at the top level hold
+    the daily rows; "hourly" and "weekly" subdirectories, when present,
+    hold the other levels of the rollup pyramid. If the path holds a CURRENT
+    pointer the version it names is opened, so refresh() hot-swaps to a
+    newly published version.
+    """
+
+    name = "columnar"
+    blocking_io = False
+    # The files are rebuilt by ingest.py, rows computed at runtime are not written back
+    writable = False
+
+    def __init__(self, path: str):
+        self.path = path
+        self.open()
+
+    def open(self):
+        version = current_version(self.path)
+        path = current_version_dir(self.path)
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        if meta.get("format_version") != COLUMNAR_FORMAT_VERSION:
+            raise ValueError(f"Unsupported columnar store format in {path}: {meta.get('format_version')}")
+        values = np.load(os.path.join(path, "values.npy"), mmap_mode="r")
+        dates = np.load(os.path.join(path, "dates.npy"), mmap_mode="r")
+        date_text = np.load(os.path.join(path, "date_text.npy"), mmap_mode="r")
+        self.fields, self.values, self.dates, self.date_text = meta["fields"], values, dates, date_text
+        self.levels = {"daily": (self.fields, values, dates)}
+        for granularity in meta.get("levels", []):
+            if granularity == "daily":
+                continue
+            level_path = os.path.join(path, granularity)
+            with open(os.path.join(level_path, "meta.json")) as f:
+                level_meta = json.load(f)
+            self.levels[granularity] = (
+                level_meta["fields"],
+                np.load(os.path.join(level_path, "values.npy"), mmap_mode="r"),
+                np.load(os.path.join(level_path, "dates.npy"), mmap_mode="r"),
+            )
+        self.version = version
+        logger.info(f"Opened columnar store {path} with {len(self.dates)} rows")
+
+    def refresh(self):
+        """Re-open the files, picking up a store rebuilt by ingest.py"""
+        self.open()
+
+    def invalidate(self):
+        self.refresh()
+
+    def ping(self):
+        # Touch the memory maps so a store whose files went away fails here
+        if self.dates is None or len(self.dates) == 0:
+            raise RuntimeError("Columnar store is closed or empty")
+        self.dates[-1]
+
+    def index_of(self, date_key: str) -> Optional[int]:
+        """Row index for a YYYY-MM-DD date, or None when it is not stored"""
+        try:
+            day = np.datetime64(date_key, "D")
+        except ValueError:
+            return None
+        idx = int(np.searchsorted(self.dates, day))
+        if idx >= len(self.dates) or self.dates[idx] != day:
+            return None
+        return idx
+
+    def get(self, date_key: str) -> Optional[Dict[str, Any]]:
+        """Return the prediction row for a YYYY-MM-DD date, or None"""
+        record_db_query(self.name, "index")
+        record_lookup(self.name)
+        idx = self.index_of(date_key)
+        if idx is None:
+            return None
+        row = {"date": str(self.date_text[idx])}
+        for field, value in zip(self.fields, self.values[:, idx].tolist()):
+            # NaN is not valid JSON, report missing values as null like MongoDB would
+            row[field] = None if value != value else value
+        return lookup_row(row)
+
+    def get_many(self, date_keys: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        rows = {}
+        for date_key in date_keys:
+            row = self.get(date_key)
+            if row is not None:
+                rows[date_key] = row
+        return rows
+
+    def get_range(self, date_from: str, date_to: str, fields: Iterable[str], granularity: str = "daily"):
+        """Keys in [date_from, date_to] of one rollup level and their values per field, sliced from the memory maps"""
+        fields = list(fields)
+        record_db_query(self.name, f"{granularity}_range")
+        if granularity not in self.levels:
+            return [], {name: [] for name in fields}
+        level_fields, values, dates = self.levels[granularity]
+        lower = week_start(date_from) if granularity == "weekly" else date_from
+        start = int(np.searchsorted(dates, np.datetime64(lower, "D"), side="left"))
+        end = int(np.searchsorted(dates, np.datetime64(date_to, "D") + 1, side="left"))
+        positions = {name: position for position, name in enumerate(level_fields)}
+        keys = dates[start:end].astype(str).tolist()
+        return keys, {
+            name: null_nan(values[positions[name], start:end].tolist()) if name in positions else [None] * len(keys)
+            for name in fields
+        }
+
+    def load_columns(self):
+        """Date keys and field columns straight from the memory maps, no copies"""
+        date_keys = self.dates.astype(str).tolist()
+        return date_keys, {field: self.values[position] for position, field in enumerate(self.fields)}
+
+    def close(self):
+        # Dropping the references unmaps the files
+        self.values = self.dates = self.date_text = None
+        self.levels = {}
@@ -0,0 +1,177 @@
+import math
+from datetime import datetime
+from typing import Any, Dict, List, Mapping, Optional
+
+from prompts import build_warnings_section
+
+# Deterministic forecast text assembled from phrase tables, served when the LLM misses the
+# request's latency budget (see Settings.FORECAST_LATENCY_BUDGET_MS). No I/O and no
+# randomness: the same row, warnings, style and length always give the same text.
+
+# (upper bound, description) bands, checked in order; the last band has no upper bound
+TEMPERATURE_BANDS = [(10, "cold"), (18, "cool"), (25, "mild"), (30, "warm"), (35, "hot"), (math.inf, "very hot")]
+SKY_BANDS = [(20, "clear skies"), (50, "partly cloudy skies"), (80, "mostly cloudy skies"), (math.inf, "overcast skies")]
+RAIN_BANDS = [(0.1, None), (2.5, "light showers"), (10, "moderate rain"), (50, "heavy rain"), (math.inf, "very heavy rain")]
+WIND_BANDS = [(12, "light"), (29, "moderate"), (39, "fresh"), (50, "strong"), (math.inf, "gale-force")]
+HUMIDITY_BANDS = [(40, "dry"), (70, "comfortable"), (85, "humid"), (math.inf, "very humid")]
+COMPASS = ["north", "north-east", "east", "south-east", "south", "south-west", "west", "north-west"]
+
+# Sentences per style. Each entry is (topic, template); a sentence is skipped when a value
+# it needs is missing, and optional topics are dropped first to stay within the length.
+STYLE_SENTENCES = {
+    "balanced": [
+        ("opening", "Here is the weather for {day}."),
+        ("temperature", "Expect {temperature_band} conditions with temperatures around {temperature}°C, feeling like {apparent}°C."),
+        ("range", "Temperatures range from {temperature_min}°C to {temperature_max}°C over the day."),
+        ("sky", "Look for {sky} with {rain_text}."),
+        ("wind", "Winds will be {wind_band} from the {wind_from} at {wind_speed} km/h, gusting to {wind_gusts} km/h."),
+        ("humidity", "Humidity sits at {humidity}%, so the air will feel {humidity_band}."),
+        ("pressure", "Pressure holds near {pressure} hPa."),
+        ("closing", "Plan your day accordingly."),
+    ],
+    "detailed": [
+        ("opening", "Meteorological outlook for {day}."),
+        ("temperature", "The 2 m air temperature is forecast at {temperature}°C with an apparent temperature of {apparent}°C, {temperature_band} for the season."),
+        ("range", "The diurnal range spans {temperature_min}°C to {temperature_max}°C."),
+        ("dew_point", "The dew point of {dew_point}°C and relative humidity of {humidity}% indicate {humidity_band} air."),
+        ("sky", "Total cloud cover is {cloud_cover}% (low {cloud_low}%, mid {cloud_mid}%, high {cloud_high}%), giving {sky}."),
+        ("rain", "Accumulated precipitation is {precipitation} mm, with {rain_text}."),
+        ("wind", "Surface winds blow from the {wind_from} at {wind_speed} km/h, reaching {wind_speed_100m} km/h at 100 m, with gusts to {wind_gusts} km/h."),
+        ("pressure", "Mean sea-level pressure stands at {pressure} hPa."),
+    ],
+    "casual": [
+        ("opening", "So, what's the weather doing on {day}?"),
+        ("temperature", "It's looking {temperature_band}, around {temperature}°C, though it'll feel more like {apparent}°C."),
+        ("range", "Expect anything from {temperature_min}°C to {temperature_max}°C."),
+        ("sky", "You'll get {sky} and {rain_text}."),
+        ("wind", "There's a {wind_band} breeze at about {wind_speed} km/h, with the odd gust up to {wind_gusts} km/h."),
+        ("humidity", "Humidity's at {humidity}%, so it'll feel {humidity_band}."),
+        ("closing", "Have a good one!"),
+    ],
+    "broadcast": [
+        ("opening", "Good day, here is your forecast for {day}."),
+        ("sky", "We are looking at {sky} across the region, with {rain_text}."),
+        ("temperature", "Temperatures will be {temperature_band}, near {temperature}°C, with a feels-like of {apparent}°C."),
+        ("range", "Expect a low of {temperature_min}°C and a high of {temperature_max}°C."),
+        ("wind", "Winds out of the {wind_from} at {wind_speed} km/h, gusting to {wind_gusts} km/h."),
+        ("humidity", "Relative humidity at {humidity}%."),
+        ("pressure", "Barometric pressure at {pressure} hPa."),
+        ("closing", "That's your weather, stay tuned for updates."),
+    ],
+}
+
+# Always included, whatever the report length
+CORE_TOPICS = {"opening", "temperature", "sky", "wind"}
+
+
+def _number(row: Mapping[str, Any], field: str) -> Optional[float]:
+    value = row.get(field)
+    if value is None:
+        return None
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if math.isnan(value) else value
+
+
+def _band(value: Optional[float], bands) -> Optional[str]:
+    if value is None:
+        return None
+    for upper, description in bands:
+        if value < upper:
+            return description
+    return bands[-1][1]
+
+
+def _compass(degrees: Optional[float]) -> Optional[str]:
+    if degrees is None:
+        return None
+    return COMPASS[int((degrees % 360) / 45 + 0.5) % 8]
+
+
+def _one_decimal(value: Optional[float]) -> Optional[str]:
+    return None if value is None else f"{value:.1f}"
+
+
+def _describe_day(date: str) -> str:
+    try:
+        return datetime.strptime(date, "%Y-%m-%d").strftime("%A, %d %B %Y")
+    except ValueError:
+        return date
+
+
+def forecast_values(date: str, weather_data: Mapping[str, Any]) -> Dict[str, Optional[str]]:
+    """Values the sentence templates draw on; None marks a value the row does not have"""
+    temperature = _number(weather_data, "temperature_2m")
+    precipitation = _number(weather_data, "precipitation")
+    wind_speed = _number(weather_data, "wind_speed_10m")
+    wind_gusts = _number(weather_data, "wind_gusts_10m")
+    humidity = _number(weather_data, "relative_humidity_2m")
+    rain = _band(precipitation, RAIN_BANDS)
+    multi_hour = (_number(weather_data, "hours") or 1) > 1
+    return {
+        "day": _describe_day(date),
+        "temperature": _one_decimal(temperature),
+        "temperature_band": _band(temperature, TEMPERATURE_BANDS),
+        "apparent": _one_decimal(_number(weather_data, "apparent_temperature")),
+        # Only rolled-up rows (see rollups.py) have a range worth reporting
+        "temperature_min": _one_decimal(_number(weather_data, "temperature_2m_min")) if multi_hour else None,
+        "temperature_max": _one_decimal(_number(weather_data, "temperature_2m_max")) if multi_hour else None,
+        "dew_point": _one_decimal(_number(weather_data, "dew_point_2m")),
+        "humidity": _one_decimal(humidity),
+        "humidity_band": _band(humidity, HUMIDITY_BANDS),
+        "cloud_cover": _one_decimal(_number(weather_data, "cloud_cover")),
+        "cloud_low": _one_decimal(_number(weather_data, "cloud_cover_low")),
+        "cloud_mid": _one_decimal(_number(weather_data, "cloud_cover_mid")),
+        "cloud_high": _one_decimal(_number(weather_data, "cloud_cover_high")),
+        "sky": _band(_number(weather_data, "cloud_cover"), SKY_BANDS),
+        "precipitation": _one_decimal(precipitation),
+        "rain_text": None if precipitation is None else (f"{rain} ({precipitation:.1f} mm)" if rain else "no rain expected"),
+        "wind_speed": _one_decimal(wind_speed),
+        "wind_speed_100m": _one_decimal(_number(weather_data, "wind_speed_100m")),
+        "wind_gusts": _one_decimal(wind_gusts),
+        "wind_band": _band(max(value for value in (wind_speed, wind_gusts, 0.0) if value is not None), WIND_BANDS),
+        "wind_from": _compass(_number(weather_data, "wind_direction_10m")),
+        "pressure": _one_decimal(_number(weather_data, "pressure_msl")),
+    }
+
+
+class _Missing(Exception):
+    pass
+
+
+class _StrictValues(dict):
+    def __missing__(self, key):
+        raise _Missing(key)
+
+
+def _render(template: str, values: Mapping[str, Optional[str]]) -> Optional[str]:
+    try:
+        return template.format_map(_StrictValues((key, value) for key, value in values.items() if value is not None))
+    except _Missing:
+        return None
+
+
+def build_template_forecast(date: str, style: Optional[str], report_length: int,
+                            weather_data: Mapping[str, Any], disaster_warnings: Dict[str, Dict[str, str]]) -> str:
+    """
+    Forecast text for one day in the given style, ending with the same
+    warnings section the LLM is asked for. Optional sentences are left out
+    once the text reaches `report_length` words; it is never padded.
+    """
+    sentences = STYLE_SENTENCES.get(style) or STYLE_SENTENCES["balanced"]
+    values = forecast_values(date, weather_data)
+    rendered = [(topic, _render(template, values)) for topic, template in sentences]
+    rendered = [(topic, text) for topic, text in rendered if text]
+
+    words = sum(len(text.split()) for topic, text in rendered if topic in CORE_TOPICS)
+    kept: List[str] = []
+    for topic, text in rendered:
+        if topic not in CORE_TOPICS:
+            length = len(text.split())
+            if words + length > report_length:
+                continue
+            words += length
+        kept.append(text)
+    return " ".join(kept) + "\n\n" + build_warnings_section(disaster_warnings)
@@ -0,0 +1,198 @@
+import argparse
+import json
+import logging
+import os
+import time
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from forecasting import SEQUENCE_LENGTH, RolloutEngine, clip_floor, predict_future_weather_extended
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_MODEL_DIR = os.path.join(os.path.dirname(BASE_DIR), "lstm_predictions", "model")
+
+MODEL_FILE = "model.keras"
+SCALER_FILE = "scaler.joblib"
+WINDOW_FILE = "last_window.npy"
+META_FILE = "meta.json"
+
+
+def load_observations(csv_path: str, since=None) -> Tuple[np.ndarray, List[str], Optional[pd.Timestamp]]:
+    """
+    Read an hourly observations CSV into one float32 matrix (rows x features).
+    Same features as the notebook: every column except `date`, followed by
+    year, month, day and hour of the timestamp. With `since` only rows
+    strictly after that timestamp are kept.
+    """
+    df = pd.read_csv(csv_path)
+    dates = pd.to_datetime(df.pop("date"))
+    if since is not None:
+        since = pd.Timestamp(since)
+        if dates.dt.tz is None and since.tz is not None:
+            since = since.tz_convert(None)
+        elif dates.dt.tz is not None and since.tz is None:
+            since = since.tz_localize(dates.dt.tz)
+        keep = (dates > since).to_numpy()
+        df, dates = df[keep], dates[keep]
+    df["year"] = dates.dt.year
+    df["month"] = dates.dt.month
+    df["day"] = dates.dt.day
+    df["hour"] = dates.dt.hour
+    columns = list(df.columns)
+    values = df.to_numpy(dtype=np.float32)
+    return values, columns, dates.max() if len(dates) else None
+
+
+def fit_scaler(values: np.ndarray):
+    """Fit the MinMaxScaler once and scale `values` in place (float32, no copy)"""
+    from sklearn.preprocessing import MinMaxScaler
+
+    scaler = MinMaxScaler(feature_range=(0, 1), copy=False)
+    scaler.fit(values)
+    return scaler, scaler.transform(values)
+
+
+def make_datasets(scaled: np.ndarray, sequence_length: int = SEQUENCE_LENGTH, batch_size: int = 32,
+                  validation_split: float = 0.1, seed: Optional[int] = None):
+    """
+    Batched, prefetched tf.data pipelines that cut windows out of `scaled`
+    on the fly. Like Keras' validation_split, the last `validation_split` of
+    the windows is held out for validation; training windows are shuffled.
+    """
+    import tensorflow as tf
+
+    samples = len(scaled) - sequence_length
+    train_samples = samples - int(samples * validation_split)
+
+    def windows(start: int, stop: int, shuffle: bool):
+        dataset = tf.keras.utils.timeseries_dataset_from_array(
+            scaled[start:stop + sequence_length],
+            scaled[start + sequence_length:stop + sequence_length],
+            sequence_length=sequence_length,
+            batch_size=batch_size,
+            shuffle=shuffle,
+            seed=seed,
+        )
+        return dataset.prefetch(tf.data.AUTOTUNE)
+
+    train = windows(0, train_samples, shuffle=True)
+    validation = windows(train_samples, samples, shuffle=False) if train_samples < samples else None
+    return train, validation
+
+
+def build_model(sequence_length: int, n_features: int):
+    """The three-layer LSTM from the notebook"""
+    from tensorflow.keras.layers import LSTM, Dense, Dropout, Input
+    from tensorflow.keras.models import Sequential
+
+    model = Sequential([
+        Input(shape=(sequence_length, n_features)),
+        LSTM(128, return_sequences=True),
+        Dropout(0.2),
+        LSTM(128, return_sequences=True),  # Second LSTM layer also returns sequences
+        Dropout(0.2),
+        LSTM(64, return_sequences=False),  # Third LSTM layer
+        Dropout(0.2),
+        Dense(64, activation='relu'),  # Use ReLU for hidden layers
+        Dense(n_features, activation='linear')  # Linear activation to allow both +ve/-ve temperature
+    ])
+    model.compile(optimizer='adam', loss='mse')
+    return model
+
+
+def rollout_start(scaled: np.ndarray, sequence_length: int = SEQUENCE_LENGTH) -> np.ndarray:
+    """
+    Start window of the prediction rollout: the last training window (X[-1]
+    of the original notebook), so the first step predicts the last observed
+    row and is dated last_date. Windows saved with only `sequence_length`
+    rows, before they kept the extra row, are used as they are.
+    """
+    if len(scaled) <= sequence_length:
+        return scaled[-sequence_length:]
+    return scaled[-sequence_length - 1:-1]
+
+
+def save_artifacts(out_dir: str, model, scaler, columns: List[str], scaled: np.ndarray, last_date, **extra):
+    """Persist the model with its scaler, feature columns and final rows (the history and rollout_start)"""
+    import joblib
+
+    os.makedirs(out_dir, exist_ok=True)
+    sequence_length = model.input_shape[1]
+    model.save(os.path.join(out_dir, MODEL_FILE))
+    joblib.dump(scaler, os.path.join(out_dir, SCALER_FILE))
+    np.save(os.path.join(out_dir, WINDOW_FILE), np.ascontiguousarray(scaled[-sequence_length - 1:], dtype=np.float32))
+    meta = {
+        "columns": list(columns),
+        "sequence_length": sequence_length,
+        "rows": len(scaled),
+        "last_date": pd.Timestamp(last_date).isoformat(),
+        "created": datetime.now().isoformat(),
+        **extra,
+    }
+    with open(os.path.join(out_dir, META_FILE), "w") as f:
+        json.dump(meta, f, indent=2)
+    logger.info(f"Saved model artifacts to {out_dir}")
+    return meta
+
+
+def load_artifacts(model_dir: str):
+    """Load (model, scaler, last_window, meta) written by save_artifacts"""
+    import joblib
+    import tensorflow as tf
+
+    with open(os.path.join(model_dir, META_FILE)) as f:
+        meta = json.load(f)
+    model = tf.keras.models.load_model(os.path.join(model_dir, MODEL_FILE))
+    scaler = joblib.load(os.path.join(model_dir, SCALER_FILE))
+    last_window = np.load(os.path.join(model_dir, WINDOW_FILE))
+    return model, scaler, last_window, meta
+
+
+def train(csv_path: str, out_dir: str, epochs: int = 10, batch_size: int = 32, validation_split: float = 0.1,
+          sequence_length: int = SEQUENCE_LENGTH):
+    """Train the LSTM on a CSV and save it with its scaler; returns (model, scaler, scaled, columns, last_date)"""
+    started = time.perf_counter()
+    values, columns, last_date = load_observations(csv_path)
+    scaler, scaled = fit_scaler(values)
+    logger.info(f"Loaded {len(scaled)} rows x {len(columns)} features ({scaled.nbytes / 1e6:.1f} MB)")
+
+    train_ds, validation_ds = make_datasets(scaled, sequence_length, batch_size, validation_split)
+    model = build_model(sequence_length, len(columns))
+    model.fit(train_ds, validation_data=validation_ds, epochs=epochs)
+
+    save_artifacts(out_dir, model, scaler, columns, scaled, last_date)
+    logger.info(f"Training finished in {time.perf_counter() - started:.1f}s")
+    return model, scaler, scaled, columns, last_date
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the LSTM weather model without materializing every window")
+    parser.add_argument("--csv", required=True, help="Hourly observations CSV with a date column")
+    parser.add_argument("--out", default=DEFAULT_MODEL_DIR, help="Directory for the model, scaler and metadata")
+    parser.add_argument("--epochs", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--validation-split", type=float, default=0.1)
+    parser.add_argument("--sequence-length", type=int, default=SEQUENCE_LENGTH)
+    parser.add_argument("--predict-days", type=int, default=0, help="Also roll the model forward this many steps")
+    parser.add_argument("--predictions-csv", default="predictions.csv", help="Where --predict-days writes its output")
+    args = parser.parse_args(argv)
+
+    model, scaler, scaled, columns, last_date = train(args.csv, args.out, args.epochs, args.batch_size,
+                                                      args.validation_split, args.sequence_length)
+    if args.predict_days:
+        engine = RolloutEngine(model, floor=clip_floor(columns))
+        frame = predict_future_weather_extended(model, scaler, scaled[-args.sequence_length:], columns, last_date,
+                                                days=args.predict_days, engine=engine)
+        frame.to_csv(args.predictions_csv, index=False)
+        logger.info(f"Wrote {len(frame)} predictions to {args.predictions_csv}")
+
+
+if __name__ == "__main__":
+    main()
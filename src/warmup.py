@@ -0,0 +1,85 @@
+import argparse
+import asyncio
+import logging
+import os
+import time
+from datetime import date, datetime, timedelta
+
+import httpx
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+STYLES = ["balanced", "detailed", "casual", "broadcast"]
+REPORT_LENGTHS = [100, 200, 300]
+
+
+async def warm_one(client: httpx.AsyncClient, semaphore: asyncio.Semaphore, url: str, payload: dict, stats: dict):
+    """Request one forecast so the server generates and caches it"""
+    async with semaphore:
+        try:
+            response = await client.post(url, json=payload)
+        except httpx.HTTPError as e:
+            stats["failed"] += 1
+            logger.error(f"{payload['date']} {payload['style']} {payload['report_length']}: {str(e)}")
+            return
+    if response.status_code == 404:
+        stats["missing"] += 1
+    elif response.status_code != 200:
+        stats["failed"] += 1
+        logger.error(f"{payload['date']} {payload['style']} {payload['report_length']}: HTTP {response.status_code}")
+    elif response.json().get("cached"):
+        stats["cached"] += 1
+    else:
+        stats["generated"] += 1
+
+
+async def warm_key(client: httpx.AsyncClient, semaphore: asyncio.Semaphore, url: str, payload: dict, repeats: int,
+                   stats: dict):
+    """Request one key `repeats` times in a row: concurrent repeats would share one call and store one variant"""
+    for _ in range(repeats):
+        await warm_one(client, semaphore, url, payload, stats)
+
+
+async def warm_up(base_url: str, start: date, days: int, styles, lengths, concurrency: int = 2, variants: int = 1):
+    """Pre-generate forecasts for `days` days from `start` through a running API"""
+    url = f"{base_url.rstrip('/')}/api/generate_forecast"
+    stats = {"generated": 0, "cached": 0, "missing": 0, "failed": 0}
+    semaphore = asyncio.Semaphore(concurrency)
+    keys = []
+    for offset in range(days):
+        day = (start + timedelta(days=offset)).strftime("%Y-%m-%d")
+        for style in styles:
+            # Balanced forecasts rotate between several cached variants, generate each of them
+            repeats = variants if style == "balanced" else 1
+            keys.extend(({"date": day, "style": style, "report_length": length}, repeats) for length in lengths)
+
+    started = time.perf_counter()
+    async with httpx.AsyncClient(timeout=120.0) as client:
+        await asyncio.gather(*(warm_key(client, semaphore, url, payload, repeats, stats) for payload, repeats in keys))
+    stats["seconds"] = round(time.perf_counter() - started, 1)
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pre-generate forecasts into the API's forecast cache")
+    parser.add_argument("--url", default=os.getenv("ATMOS_API_URL", "http://localhost:8000"), help="Base URL of the API")
+    parser.add_argument("--start", default=date.today().strftime("%Y-%m-%d"), help="First date (YYYY-MM-DD)")
+    parser.add_argument("--days", type=int, default=7, help="Number of days to warm")
+    parser.add_argument("--styles", nargs="+", default=["balanced"], choices=STYLES)
+    parser.add_argument("--lengths", nargs="+", type=int, default=REPORT_LENGTHS, help="Report lengths in words")
+    parser.add_argument("--variants", type=int, default=int(os.getenv("FORECAST_CACHE_VARIANTS", "1")),
+                        help="Generations per balanced key, should match FORECAST_CACHE_VARIANTS")
+    parser.add_argument("--concurrency", type=int, default=2, help="Requests in flight at once")
+    args = parser.parse_args(argv)
+
+    start = datetime.strptime(args.start, "%Y-%m-%d").date()
+    stats = asyncio.run(warm_up(args.url, start, args.days, args.styles, args.lengths,
+                                concurrency=args.concurrency, variants=args.variants))
+    logger.info(f"Warm-up finished: {stats}")
+    return stats
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+# Severity ranks used for filtering; 0 means no warning
+LEVELS = {"minor": 1, "moderate": 2, "severe": 3}
+
+# Input variables: name -> (prediction fields, value used when they are all missing).
+# The first field present wins, so daily and weekly rollups are judged on their extremes
+# (see rollups.EXTREMES) while single-reading rows fall back to the plain field.
+INPUTS = {
+    "precipitation": (("precipitation",), 0.0),
+    "wind_speed": (("wind_speed_10m_max", "wind_speed_10m"), 0.0),
+    "wind_gusts": (("wind_gusts_10m",), 0.0),
+    "temperature": (("temperature_2m_max", "temperature_2m"), 0.0),
+    "min_temperature": (("temperature_2m_min", "temperature_2m"), 0.0),
+    "humidity": (("relative_humidity_2m",), 50.0),
+    "cloud_cover": (("cloud_cover",), 0.0),
+    "pressure": (("pressure_msl",), 1013.25),
+}
+
+# Each group is an if/elif chain: the first rule whose conditions all hold wins.
+# A condition is (variable, operator, threshold); string thresholds name an entry of
+# rules.DISASTER_THRESHOLDS, with "a.b" reaching into nested entries.
+WARNING_RULES = [
+    [
+        {"key": "flood", "level": "severe", "when": [("precipitation", ">=", "flood_risk")],
+         "message": "SEVERE FLOOD RISK: Extreme precipitation of {precipitation}mm expected."},
+        {"key": "flood", "level": "moderate", "when": [("precipitation", ">=", "heavy_rain")],
+         "message": "FLOOD WATCH: Heavy rainfall of {precipitation}mm expected."},
+        {"key": "rain", "level": "minor", "when": [("precipitation", ">=", "moderate_rain")],
+         "message": "Moderate rainfall of {precipitation}mm expected."},
+    ],
+    [
+        {"key": "wind", "level": "severe", "when": [("max_wind", ">=", "severe_wind")],
+         "message": "SEVERE WIND WARNING: Wind speeds up to {max_wind}km/h expected."},
+        {"key": "wind", "level": "moderate", "when": [("max_wind", ">=", "high_wind")],
+         "message": "WIND ADVISORY: Strong winds up to {max_wind}km/h expected."},
+        {"key": "wind", "level": "minor", "when": [("max_wind", ">=", "breezy_wind")],
+         "message": "Breezy conditions with winds up to {max_wind}km/h expected."},
+    ],
+    [
+        {"key": "heat", "level": "severe", "when": [("temperature", ">=", "extreme_heat")],
+         "message": "EXTREME HEAT WARNING: Temperatures reaching {temperature}°C expected."},
+        {"key": "heat", "level": "moderate", "when": [("temperature", ">=", "hot_weather")],
+         "message": "HEAT ADVISORY: Hot weather with temperatures of {temperature}°C expected."},
+        {"key": "heat", "level": "minor", "when": [("temperature", ">=", "warm_weather")],
+         "message": "Warm weather with temperatures of {temperature}°C expected."},
+        {"key": "cold", "level": "minor", "when": [("min_temperature", "<=", "cool_weather")],
+         "message": "Cool conditions with temperatures of {min_temperature}°C expected."},
+    ],
+    [
+        {"key": "humidity", "level": "moderate", "when": [("humidity", ">=", "high_humidity")],
+         "message": "HIGH HUMIDITY: Uncomfortable conditions with humidity at {humidity}%."},
+        {"key": "humidity", "level": "minor", "when": [("humidity", ">=", "moderate_humidity")],
+         "message": "Moderately humid conditions ({humidity}%) may cause discomfort."},
+    ],
+    [
+        {"key": "cyclone", "level": "severe",
+         "when": [("max_wind", ">=", "cyclone_risk"), ("precipitation", ">=", "heavy_rain")],
+         "message": "CYCLONE WARNING: High winds ({max_wind}km/h) with heavy rainfall ({precipitation}mm)."},
+        {"key": "storm", "level": "moderate",
+         "when": [("max_wind", ">=", "storm_risk.min_wind"), ("precipitation", ">=", "storm_risk.min_precipitation")],
+         "message": "STORM CONDITIONS: Moderate winds ({max_wind}km/h) with rainfall ({precipitation}mm)."},
+    ],
+    [
+        {"key": "drought", "level": "moderate",
+         "when": [("temperature", ">=", "drought_risk.max_temp"),
+                  ("humidity", "<=", "drought_risk.max_humidity"),
+                  ("precipitation", "<=", "drought_risk.max_precipitation")],
+         "message": "DROUGHT CONDITIONS: High temperature ({temperature}°C), low humidity ({humidity}%), minimal precipitation."},
+    ],
+    [
+        {"key": "clouds", "level": "minor", "when": [("cloud_cover", ">=", "overcast")],
+         "message": "OVERCAST CONDITIONS: Heavy cloud cover ({cloud_cover}%) expected."},
+    ],
+    [
+        {"key": "pressure", "level": "minor", "when": [("pressure", "<", "low_pressure")],
+         "message": "LOW PRESSURE SYSTEM: Atmospheric pressure of {pressure}hPa may lead to unsettled weather."},
+        {"key": "pressure", "level": "minor", "when": [("pressure", ">", "high_pressure")],
+         "message": "HIGH PRESSURE SYSTEM: Atmospheric pressure of {pressure}hPa indicating stable conditions."},
+    ],
+]
+
+OPERATORS = {
+    ">=": np.greater_equal,
+    ">": np.greater,
+    "<=": np.less_equal,
+    "<": np.less,
+}
+
+
+def resolve_threshold(thresholds: Mapping[str, Any], ref) -> float:
+    """Look up a threshold reference ("name" or "group.name"), numbers pass through"""
+    if not isinstance(ref, str):
+        return float(ref)
+    value = thresholds
+    for part in ref.split("."):
+        value = value[part]
+    return float(value)
+
+
+def _column(values: Sequence[Any], default: float) -> np.ndarray:
+    return np.array([default if value is None else value for value in values], dtype=np.float64)
+
+
+def _first_present(row: Mapping[str, Any], candidates: Sequence[str], default: float):
+    for field in candidates:
+        value = row.get(field)
+        if value is not None:
+            return value
+    return default
+
+
+def columns_from_rows(rows: Sequence[Mapping[str, Any]]) -> Dict[str, np.ndarray]:
+    """Convert prediction rows into the engine's input variables"""
+    return {
+        name: _column([_first_present(row, candidates, default) for row in rows], default)
+        for name, (candidates, default) in INPUTS.items()
+    }
+
+
+def columns_from_fields(fields: Mapping[str, np.ndarray], length: int) -> Dict[str, np.ndarray]:
+    """Convert whole prediction columns (field -> array) into the engine's input variables"""
+    columns = {}
+    for name, (candidates, default) in INPUTS.items():
+        column = np.full(length, np.nan, dtype=np.float64)
+        for field in candidates:
+            if field in fields:
+                column = np.where(np.isnan(column), np.asarray(fields[field], dtype=np.float64), column)
+        columns[name] = np.where(np.isnan(column), default, column)
+    return columns
+
+
+class WarningsIndex:
+    """
+    Warning rules evaluated over whole prediction columns in one pass.
+    For every rule group `choices` holds the index of the winning rule per
+    row (-1 for none); messages are only formatted for rows that are read.
+    """
+
+    def __init__(self, columns: Dict[str, np.ndarray], thresholds: Mapping[str, Any],
+                 dates: Optional[Sequence[str]] = None, rules=WARNING_RULES):
+        self.rules = rules
+        self.values = dict(columns)
+        self.values["max_wind"] = np.maximum(self.values["wind_speed"], self.values["wind_gusts"])
+        length = len(self.values["precipitation"])
+
+        self.choices = np.full((len(rules), length), -1, dtype=np.int8)
+        self.max_level = np.zeros(length, dtype=np.int8)
+        for group_index, group in enumerate(rules):
+            matched = np.zeros(length, dtype=bool)
+            for rule_index, rule in enumerate(group):
+                mask = ~matched
+                for variable, op, ref in rule["when"]:
+                    mask &= OPERATORS[op](self.values[variable], resolve_threshold(thresholds, ref))
+                self.choices[group_index, mask] = rule_index
+                np.maximum(self.max_level, np.where(mask, LEVELS[rule["level"]], 0), out=self.max_level)
+                matched |= mask
+
+        self.dates = list(dates) if dates is not None else []
+        self.positions = {date: position for position, date in enumerate(self.dates)}
+
+    def __len__(self):
+        return len(self.max_level)
+
+    def warnings_at(self, position: int, min_level: int = 0) -> Dict[str, Dict[str, str]]:
+        """Warnings for one row, in the same shape and order as detect_disaster_warnings"""
+        warnings = {}
+        variables = None
+        for group_index, group in enumerate(self.rules):
+            rule_index = self.choices[group_index, position]
+            if rule_index < 0:
+                continue
+            rule = group[rule_index]
+            if LEVELS[rule["level"]] < min_level:
+                continue
+            if variables is None:
+                variables = {name: float(column[position]) for name, column in self.values.items()}
+            warnings[rule["key"]] = {"level": rule["level"], "message": rule["message"].format(**variables)}
+        return warnings
+
+    def get(self, date_key: str) -> Optional[Dict[str, Dict[str, str]]]:
+        """Warnings for a date, or None when the date is not indexed"""
+        position = self.positions.get(date_key)
+        if position is None:
+            return None
+        return self.warnings_at(position)
+
+    def query(self, date_from: Optional[str] = None, date_to: Optional[str] = None,
+              level: str = "minor") -> List[Dict[str, Any]]:
+        """Dates in [date_from, date_to] with at least one warning of `level` or worse"""
+        min_level = LEVELS[level]
+        selected = self.max_level >= min_level
+        days = []
+        for position in np.flatnonzero(selected):
+            date = self.dates[position]
+            if (date_from and date < date_from) or (date_to and date > date_to):
+                continue
+            days.append({"date": date, "warnings": self.warnings_at(int(position), min_level)})
+        return days
+
+
+def evaluate_rows(rows: Sequence[Mapping[str, Any]], thresholds: Mapping[str, Any]) -> List[Dict[str, Dict[str, str]]]:
+    """Warnings for a list of prediction rows"""
+    index = WarningsIndex(columns_from_rows(rows), thresholds)
+    return [index.warnings_at(position) if rows[position] else {} for position in range(len(rows))]
+
+
+def build_warnings_index(dates: Sequence[str], fields: Mapping[str, np.ndarray], thresholds: Mapping[str, Any]) -> WarningsIndex:
+    """Precompute warnings for a whole prediction set (date -> warnings)"""
+    return WarningsIndex(columns_from_fields(fields, len(dates)), thresholds, dates=dates)
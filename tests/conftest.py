@@ -0,0 +1,43 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+# Settings are read when app.py is imported: no real Groq key, no client-side rate limits, no model
+os.environ.setdefault("GROQ_API_KEY", "test")
+os.environ.setdefault("GROQ_REQUESTS_PER_MINUTE", "0")
+os.environ.setdefault("GROQ_TOKENS_PER_MINUTE", "0")
+os.environ["STORAGE_BACKEND"] = "mongo"
+os.environ["ONLINE_INFERENCE_ENABLED"] = "false"
+
+from bench_fakes import FakeGroqServer, FakeMongoClient, ServerThread, load_fake_database  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def fake_db():
+    return load_fake_database()
+
+
+@pytest.fixture(scope="session")
+def groq():
+    groq = FakeGroqServer(latency=0.01, tokens_per_second=0)
+    server = ServerThread(groq.app).start()
+    groq.url = server.url
+    yield groq
+    server.stop()
+
+
+@pytest.fixture
+def api(tmp_path, fake_db, groq):
+    """The API against the MongoDB and Groq stand-ins, with an empty forecast cache; yields the app module"""
+    import app as app_module
+
+    app_module.Settings.FORECAST_CACHE_PATH = str(tmp_path / "forecast_cache.sqlite3")
+    app_module.MongoClient = lambda *a, **kw: FakeMongoClient(fake_db)
+    os.environ["GROQ_BASE_URL"] = groq.url
+    server = ServerThread(app_module.app).start()
+    app_module.url = server.url
+    yield app_module
+    server.stop()
@@ -0,0 +1,134 @@
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from concurrency import MicroBatcher, SingleFlight, await_within, iterate_blocking, run_blocking
+
+request_id = contextvars.ContextVar("request_id", default=None)
+
+
+def test_single_flight_coalesces_concurrent_calls():
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "forecast"
+
+    async def main():
+        flight = SingleFlight()
+        results = await asyncio.gather(*(flight.do("2025-06-01", work) for _ in range(5)))
+        return flight, results
+
+    flight, results = asyncio.run(main())
+    assert results == ["forecast"] * 5
+    assert len(calls) == 1
+    assert flight.stats() == {"in_flight": 0, "started": 1, "coalesced": 4}
+
+
+def test_single_flight_shares_failures_and_forgets_the_key():
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("model down")
+
+    async def main():
+        flight = SingleFlight()
+        results = await asyncio.gather(flight.do("k", fail), flight.do("k", fail), return_exceptions=True)
+        return flight, results
+
+    flight, results = asyncio.run(main())
+    assert [type(e) for e in results] == [ValueError, ValueError]
+    assert flight.stats() == {"in_flight": 0, "started": 1, "coalesced": 1}
+
+
+def test_single_flight_cancelled_caller_does_not_cancel_others():
+    async def work():
+        await asyncio.sleep(0.05)
+        return 42
+
+    async def main():
+        flight = SingleFlight()
+        first = asyncio.ensure_future(flight.do("k", work))
+        second = asyncio.ensure_future(flight.do("k", work))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second, first.cancelled()
+
+    assert asyncio.run(main()) == (42, True)
+
+
+def test_await_within_times_out_without_cancelling():
+    finished = []
+
+    async def slow():
+        await asyncio.sleep(0.05)
+        finished.append(1)
+        return "late"
+
+    async def main():
+        with pytest.raises(asyncio.TimeoutError):
+            await await_within(slow(), 0.01)
+        await asyncio.sleep(0.1)
+        return await await_within(asyncio.sleep(0, result="now"), None)
+
+    assert asyncio.run(main()) == "now"
+    assert finished == [1]
+
+
+def test_run_blocking_keeps_context_variables():
+    async def main():
+        request_id.set("abc")
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            seen = await run_blocking(executor, request_id.get)
+            items = [item async for item in iterate_blocking(executor, iter([1, 2, 3]))]
+        return seen, items
+
+    assert asyncio.run(main()) == ("abc", [1, 2, 3])
+
+
+def test_micro_batcher_groups_concurrent_keys():
+    batches = []
+
+    async def run_batch(keys):
+        batches.append(sorted(keys))
+        return {key: key * 2 for key in keys if key != 3}
+
+    async def main():
+        batcher = MicroBatcher(run_batch, max_wait=0.01, max_batch=64)
+        results = await asyncio.gather(*(batcher.submit(key) for key in (1, 2, 2, 3)))
+        return batcher, results
+
+    batcher, results = asyncio.run(main())
+    # Identical keys share a result, keys left out of the mapping resolve to None
+    assert results == [2, 4, 4, None]
+    assert batches == [[1, 2, 3]]
+    assert batcher.stats() == {"pending": 0, "batches": 1, "items": 3, "largest": 3}
+
+
+def test_micro_batcher_flushes_full_batches_in_order():
+    batches = []
+
+    async def run_batch(keys):
+        batches.append(list(keys))
+        await asyncio.sleep(0.01)
+        return {key: key for key in keys}
+
+    async def main():
+        batcher = MicroBatcher(run_batch, max_wait=1.0, max_batch=2)
+        return await asyncio.wait_for(asyncio.gather(*(batcher.submit(key) for key in range(4))), 0.5)
+
+    assert asyncio.run(main()) == [0, 1, 2, 3]
+    assert batches == [[0, 1], [2, 3]]
+
+
+def test_micro_batcher_fails_the_whole_batch():
+    async def run_batch(keys):
+        raise RuntimeError("model not loaded")
+
+    async def main():
+        batcher = MicroBatcher(run_batch, max_wait=0.01)
+        return await asyncio.gather(batcher.submit("a"), batcher.submit("b"), return_exceptions=True)
+
+    assert [type(e) for e in asyncio.run(main())] == [RuntimeError, RuntimeError]
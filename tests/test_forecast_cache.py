@@ -0,0 +1,87 @@
+import sqlite3
+import time
+
+from forecast_cache import ForecastCache, SQLiteForecastStore
+
+
+def accessed(path, key):
+    with sqlite3.connect(path) as conn:
+        return conn.execute("SELECT MAX(accessed) FROM forecasts WHERE key = ?", (key,)).fetchone()[0]
+
+
+def test_hits_do_not_write(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    store = SQLiteForecastStore(path, touch_interval=3600.0)
+    store.add("a", 0, "forecast a")
+    changes = store._conn.total_changes
+    written = accessed(path, "a")
+    for _ in range(10):
+        assert store.get("a") == ["forecast a"]
+    assert store._conn.total_changes == changes
+    assert accessed(path, "a") == written
+    store.close()
+    # Pending access times are written on close
+    assert accessed(path, "a") > written
+
+
+def test_batched_access_times_drive_eviction(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    store = SQLiteForecastStore(path, max_keys=2, touch_interval=3600.0)
+    store.add("old", 0, "old")
+    store.add("new", 0, "new")
+    # The hit on "old" is only in memory, but is written before the next add evicts
+    store.get("old")
+    store.add("third", 0, "third")
+    assert store.get("old") == ["old"]
+    assert store.get("new") == []
+    store.close()
+
+
+def test_variants_fill_then_rotate(tmp_path):
+    cache = ForecastCache(path=str(tmp_path / "cache.sqlite3"))
+    cache.put("k", "first", variants=2)
+    # Not served until every variant exists
+    assert cache.get("k", variants=2) is None
+    cache.put("k", "second", variants=2)
+    assert [cache.get("k", variants=2) for _ in range(4)] == ["first", "second", "first", "second"]
+    # A full key replaces the variant the rotation is at
+    cache.put("k", "third", variants=2)
+    assert sorted(cache.disk.get("k")) == ["second", "third"]
+    cache.close()
+
+
+def test_variants_survive_a_restart(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = ForecastCache(path=path)
+    cache.put("k", "first", variants=2)
+    cache.put("k", "second", variants=2)
+    cache.close()
+    reopened = ForecastCache(path=path)
+    assert reopened.get("k", variants=2) in ("first", "second")
+    assert reopened.stats()["disk_hits"] == 1
+    reopened.close()
+
+
+def test_generation_lease_is_held_by_one_owner(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    first, second = ForecastCache(path=path), ForecastCache(path=path)
+    assert first.claim("k", ttl=60.0)
+    assert not second.claim("k", ttl=60.0)
+    # Releasing someone else's lease does nothing
+    second.release("k")
+    assert not second.claim("k", ttl=60.0)
+    first.release("k")
+    assert second.claim("k", ttl=60.0)
+    second.release("k")
+    first.close()
+    second.close()
+
+
+def test_expired_lease_can_be_taken_over(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    first, second = ForecastCache(path=path), ForecastCache(path=path)
+    assert first.claim("k", ttl=0.05)
+    time.sleep(0.1)
+    assert second.claim("k", ttl=60.0)
+    first.close()
+    second.close()
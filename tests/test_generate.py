@@ -0,0 +1,51 @@
+import argparse
+import asyncio
+import sqlite3
+
+import pytest
+
+from bench_fakes import load_fake_database
+from config import Settings
+from forecast_cache import ForecastCache, forecast_cache_key
+from generate import expand_dates, generate_all
+from prompts import PROMPT_VERSION
+from store import MongoPredictionStore
+
+
+def generate_args(**overrides):
+    args = dict(style="balanced", length=100, concurrency=2, out=None, cache=True, governor=True)
+    args.update(overrides)
+    return argparse.Namespace(**args)
+
+
+def test_pregenerated_balanced_forecasts_fill_every_variant(tmp_path, groq, monkeypatch):
+    monkeypatch.setenv("GROQ_BASE_URL", groq.url)
+    monkeypatch.setattr(Settings, "FORECAST_CACHE_PATH", str(tmp_path / "cache.sqlite3"))
+    monkeypatch.setattr(Settings, "FORECAST_CACHE_VARIANTS", 2)
+    store = MongoPredictionStore(load_fake_database())
+    for _ in range(2):
+        stats = asyncio.run(generate_all(["2025-06-01"], store, generate_args()))
+        assert stats["generated"] == 1 and stats["failed"] == 0
+
+    with sqlite3.connect(Settings.FORECAST_CACHE_PATH) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM forecasts").fetchone()[0] == 2
+    key = forecast_cache_key("2025-06-01", "balanced", 100, store.get("2025-06-01"), PROMPT_VERSION, Settings.GROQ_MODEL)
+    cache = ForecastCache(path=Settings.FORECAST_CACHE_PATH)
+    assert cache.get(key, variants=2) is not None
+    cache.close()
+
+
+def test_expand_dates():
+    assert expand_dates(["2025-06-03"], "2025-06-01", "2025-06-03") == ["2025-06-03", "2025-06-01", "2025-06-02"]
+    assert expand_dates([], "2025-06-01") == ["2025-06-01"]
+
+
+def test_expand_dates_rejects_reversed_and_oversized_ranges():
+    for dates, date_from, date_to, message in [
+        ([], "2025-06-03", "2025-06-01", "before"),
+        ([], "2025-06-01", "2205-06-01", "At most 366"),
+        (["2025-06-01", "2025-06-02"], "2025-06-03", "2026-06-02", "At most 366"),
+        (["2025-13-01"], None, None, "Invalid date format"),
+    ]:
+        with pytest.raises(ValueError, match=message):
+            expand_dates(dates, date_from, date_to, max_dates=366)
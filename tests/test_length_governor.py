@@ -0,0 +1,56 @@
+from length_governor import LengthGovernor
+from prompts import build_warnings_section
+
+WARNINGS = {
+    "flood": {"level": "severe", "message": "SEVERE FLOOD RISK: Extreme precipitation of 45.2mm expected."},
+    "wind": {"level": "moderate", "message": "WIND ADVISORY: Strong winds up to 34.1km/h expected."},
+}
+
+
+def feed_words(governor, text):
+    """Feed `text` a word at a time, like a stream, and return what the governor passed on"""
+    passed = []
+    for position, word in enumerate(text.split(" ")):
+        passed.append(governor.feed(word if position == 0 else " " + word))
+        if governor.finished:
+            break
+    return "".join(passed) + governor.tail()
+
+
+def test_body_ends_at_the_sentence_after_the_target():
+    governor = LengthGovernor(10, {})
+    text = feed_words(governor, "One two three four five six. Seven eight nine ten eleven twelve. Thirteen fourteen.")
+    assert governor.cut == "body"
+    assert text == "One two three four five six. Seven eight nine ten eleven twelve.\n\n" + build_warnings_section({})
+
+
+def test_body_without_a_sentence_end_is_cut_after_the_slack():
+    governor = LengthGovernor(10, {}, slack=0.1)
+    text = feed_words(governor, " ".join(f"w{index}" for index in range(40)))
+    assert governor.mid_sentence and governor.max_body_words == 18
+    assert text.split("\n\n")[0] == " ".join(f"w{index}" for index in range(18)) + "."
+
+
+def test_model_warnings_section_ends_after_the_last_warning():
+    governor = LengthGovernor(200, WARNINGS)
+    section = ("Weather Warnings:\nThe following warnings apply:\n\n"
+               "- SEVERE: Extreme precipitation of 45.2mm brings a severe flood risk.\n"
+               "- MODERATE: Strong winds up to 34.1km/h.\nStay safe out there!\n")
+    text = feed_words(governor, "Rain all day.\n\n" + section)
+    assert governor.cut == "warnings"
+    assert text.endswith("Strong winds up to 34.1km/h.")
+    assert "45.2mm" in text
+
+
+def test_unmatched_warnings_section_is_not_cut():
+    governor = LengthGovernor(200, WARNINGS)
+    stream = "Rain all day.\n\nWeather Warnings:\nSome intro line.\nAnother line.\nA third one.\n"
+    assert feed_words(governor, stream) == stream
+    assert governor.cut is None
+
+
+def test_no_warnings_line_ends_the_section():
+    governor = LengthGovernor(200, {})
+    text = feed_words(governor, "Clear skies.\n\nWeather Warnings:\nNo weather warnings for this date.\nExtra text.")
+    assert governor.cut == "warnings"
+    assert text.endswith("No weather warnings for this date.")
@@ -0,0 +1,61 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from llm_scheduler import LLMScheduler
+
+
+class RateLimited(Exception):
+    status_code = 429
+
+
+def flaky(failures, error=RateLimited):
+    calls = []
+
+    def create():
+        calls.append(1)
+        if len(calls) <= failures:
+            raise error()
+        return iter(["stream"])
+
+    return create, calls
+
+
+async def start(scheduler, create, estimated_tokens):
+    async with scheduler.stream(create, estimated_tokens=estimated_tokens) as stream:
+        return list(stream)
+
+
+def scheduler(executor, **options):
+    return LLMScheduler(executor, max_concurrency=2, tokens_per_minute=1000, max_retries=3, base_backoff=0.001,
+                        **options)
+
+
+def test_retried_call_takes_its_tokens_once():
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        llm = scheduler(executor)
+        create, calls = flaky(2)
+        # Three 400-token admissions would need more than the 1000 tokens a minute
+        assert asyncio.run(asyncio.wait_for(start(llm, create, 400), timeout=5.0)) == ["stream"]
+        assert len(calls) == 3 and llm.rate_limited == 2 and llm.calls == 1
+        assert llm.tokens.tokens == pytest.approx(600, abs=5)
+
+
+def test_gives_up_after_max_retries_and_returns_the_tokens():
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        llm = scheduler(executor)
+        create, calls = flaky(10)
+        with pytest.raises(RateLimited):
+            asyncio.run(start(llm, create, 400))
+        assert len(calls) == 4
+        assert llm.tokens.tokens == pytest.approx(1000, abs=5)
+
+
+def test_other_errors_are_not_retried():
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        llm = scheduler(executor)
+        create, calls = flaky(1, error=RuntimeError)
+        with pytest.raises(RuntimeError):
+            asyncio.run(start(llm, create, 400))
+        assert len(calls) == 1 and llm.rate_limited == 0
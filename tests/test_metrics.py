@@ -0,0 +1,19 @@
+import re
+
+import httpx
+
+
+def test_series_requests_report_stage_timings(api):
+    response = httpx.get(f"{api.url}/api/series", params={"from": "2025-06-01", "to": "2025-06-03",
+                                                           "fields": "temperature_2m"}, timeout=30.0)
+    assert response.status_code == 200, response.text
+    stages = dict(part.strip().split(";dur=") for part in response.headers["server-timing"].split(","))
+    assert "db" in stages and all(float(duration) >= 0 for duration in stages.values())
+
+    text = httpx.get(f"{api.url}/metrics", timeout=30.0).text
+    assert "# TYPE atmos_request_seconds histogram" in text
+    count = re.search(r'atmos_request_seconds_count\{endpoint="/api/series",status="200"\} (\S+)', text)
+    assert count and float(count.group(1)) >= 1
+    assert re.search(r'atmos_stage_seconds_count\{endpoint="/api/series",stage="db"\} \S+', text)
+    # Uninstrumented paths get no Server-Timing header
+    assert "server-timing" not in httpx.get(f"{api.url}/health", timeout=30.0).headers
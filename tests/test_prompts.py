@@ -0,0 +1,58 @@
+from prompts import (
+    MAX_OUTPUT_TOKENS,
+    PROMPT_VERSION,
+    build_prompt,
+    build_warnings_section,
+    compile_template,
+    output_token_budget,
+)
+
+WEATHER = {
+    "temperature_2m": 21.43219,
+    "apparent_temperature": 20.9,
+    "relative_humidity_2m": 64,
+    "precipitation": 0.0,
+    "wind_speed_10m": 12.56,
+}
+
+WARNINGS = {"heat": {"level": "moderate", "message": "High temperatures expected"}}
+
+
+def test_compile_template_strips_indentation_and_extra_blank_lines():
+    assert compile_template("\n    a  \n      b\n\n\n\n    c\n") == "a\nb\n\nc"
+
+
+def test_build_prompt_renders_rounded_values_and_warnings():
+    prompt = build_prompt("2025-06-01", "casual", 120, WEATHER, WARNINGS)
+    system, user = prompt.messages
+    assert prompt.version == PROMPT_VERSION
+    assert prompt.style == "casual"
+    assert "exactly 120 words" in system["content"]
+    assert "- Temperature: 21.4°C (feels like 20.9°C)" in user["content"]
+    # Fields missing from the row render as N/A instead of failing
+    assert "- Dew point: N/A°C" in user["content"]
+    assert "- MODERATE: High temperatures expected" in user["content"]
+    assert "{" not in user["content"]
+    assert "Temperature range" not in user["content"]
+    assert prompt.estimated_tokens == prompt.input_tokens + prompt.max_tokens
+
+
+def test_build_prompt_adds_rollup_lines_for_multi_hour_rows():
+    row = dict(WEATHER, hours=24, temperature_2m_min=12.0, temperature_2m_max=27.5, wind_speed_10m_max=30.0)
+    user = build_prompt("2025-06-01", "balanced", 120, row, {}).messages[1]["content"]
+    assert "- Temperature range: 12.0°C to 27.5°C" in user
+    assert "- Peak wind: 30.0 km/h at 10m" in user
+    assert "No weather warnings for this date." in user
+
+
+def test_unknown_style_falls_back_to_balanced():
+    assert build_prompt("2025-06-01", "haiku", 120, WEATHER, {}).style == "balanced"
+
+
+def test_output_budget_grows_with_report_length_and_is_capped():
+    section = build_warnings_section(WARNINGS)
+    short, long = output_token_budget(100, section), output_token_budget(300, section)
+    assert 100 < short < long < MAX_OUTPUT_TOKENS
+    more = dict(WARNINGS, wind={"level": "severe", "message": "Damaging gusts above 90 km/h"})
+    assert output_token_budget(100, build_warnings_section(more)) > short
+    assert output_token_budget(5000, section) == MAX_OUTPUT_TOKENS
@@ -0,0 +1,67 @@
+import asyncio
+import signal
+
+import httpx
+
+
+def test_null_style_is_balanced(api):
+    first = httpx.post(f"{api.url}/api/generate_forecast", json={"date": "2025-06-01", "style": None}, timeout=30.0)
+    assert first.status_code == 200, first.text
+    # Same cache entry as the default style
+    second = httpx.post(f"{api.url}/api/generate_forecast", json={"date": "2025-06-01"}, timeout=30.0)
+    assert second.status_code == 200
+    assert second.json()["cached"] is True
+
+
+def test_null_style_in_batch(api):
+    response = httpx.post(f"{api.url}/api/generate_forecast/batch",
+                          json={"dates": ["2025-06-01", "2025-06-02"], "style": None}, timeout=30.0)
+    assert response.status_code == 200, response.text
+
+
+def test_null_report_length_is_default(api):
+    first = httpx.post(f"{api.url}/api/generate_forecast", json={"date": "2025-06-03", "report_length": None},
+                       timeout=30.0)
+    assert first.status_code == 200, first.text
+    second = httpx.post(f"{api.url}/api/generate_forecast", json={"date": "2025-06-03", "report_length": 200},
+                        timeout=30.0)
+    assert second.json()["cached"] is True
+
+
+def test_out_of_range_report_length_is_rejected(api):
+    for report_length in (-5, 0, 100000):
+        response = httpx.post(f"{api.url}/api/generate_forecast",
+                              json={"date": "2025-06-03", "report_length": report_length}, timeout=30.0)
+        assert response.status_code == 422, (report_length, response.text)
+        response = httpx.post(f"{api.url}/api/generate_forecast/batch",
+                              json={"dates": ["2025-06-03"], "report_length": report_length}, timeout=30.0)
+        assert response.status_code == 422, (report_length, response.text)
+
+
+def test_llm_timeout_without_budget_is_an_llm_error(api, monkeypatch):
+    async def timing_out(*args, **kwargs):
+        raise asyncio.TimeoutError()
+
+    monkeypatch.setattr(api, "generate_llm_forecast", timing_out)
+    response = httpx.post(f"{api.url}/api/generate_forecast", json={"date": "2025-06-04"}, timeout=30.0)
+    assert response.status_code == 502, response.text
+    # With a budget the same timeout is a missed deadline
+    response = httpx.post(f"{api.url}/api/generate_forecast", json={"date": "2025-06-04", "latency_budget_ms": 5000},
+                          timeout=30.0)
+    assert response.status_code == 200 and response.json()["template"] is True
+
+
+def test_reload_under_supervisor_signals_it(api, monkeypatch):
+    signals = []
+    monkeypatch.setattr(api.os, "kill", lambda pid, signum: signals.append((pid, signum)))
+    monkeypatch.setattr(api.Settings, "SUPERVISOR_PID", 4242)
+    response = httpx.post(f"{api.url}/api/admin/reload", timeout=30.0)
+    assert response.status_code == 200 and response.json()["status"] == "reloading"
+    assert signals == [(4242, signal.SIGHUP)]
+
+
+def test_batch_range_over_the_limit_is_rejected(api):
+    response = httpx.post(f"{api.url}/api/generate_forecast/batch", json={"from": "0001-01-01", "to": "9999-12-31"},
+                          timeout=30.0)
+    assert response.status_code == 400
+    assert str(api.Settings.BATCH_MAX_DATES) in response.json()["detail"]
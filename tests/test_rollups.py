@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+
+from ingest import DEFAULT_CSV_PATH, iter_chunks, normalize_chunk
+from rollups import rollup, rollup_levels
+from store import WEATHER_FIELDS
+
+
+def hourly_frame(date_strings, **values):
+    return normalize_chunk(pd.DataFrame({"date": date_strings, **values}))
+
+
+def test_single_reading_days_roll_up_unchanged():
+    hourly = pd.concat(list(iter_chunks(DEFAULT_CSV_PATH, chunk_size=1000)), ignore_index=True)
+    pyramid = rollup_levels(hourly)
+    rows = pyramid["hourly"].set_index("date_key")
+    daily = pyramid["daily"].set_index("date_key")
+    assert (daily["hours"] == 1).all()
+    fields = [field for field in WEATHER_FIELDS if field in rows.columns]
+    pd.testing.assert_frame_equal(daily.loc[rows.index, fields], rows[fields], check_exact=True, check_dtype=False)
+
+
+def test_daily_aggregations():
+    frame = hourly_frame(
+        ["2025-03-01 00:00:00+00:00", "2025-03-01 12:00:00+00:00", "2025-03-02 06:00:00+00:00"],
+        temperature_2m=[20.0, 30.0, 25.0],
+        precipitation=[1.0, 2.5, np.nan],
+        wind_direction_10m=[350.0, 10.0, 90.0],
+    )
+    daily = rollup(frame, "daily").set_index("date_key")
+    first = daily.loc["2025-03-01"]
+    assert first["temperature_2m"] == 25.0
+    assert first["temperature_2m_min"] == 20.0 and first["temperature_2m_max"] == 30.0
+    assert first["precipitation"] == 3.5
+    assert min(first["wind_direction_10m"], 360.0 - first["wind_direction_10m"]) < 1e-9
+    assert first["hours"] == 2
+    second = daily.loc["2025-03-02"]
+    assert np.isnan(second["precipitation"]) and second["wind_direction_10m"] == 90.0
+
+
+def test_weekly_keys_are_mondays():
+    frame = hourly_frame(["2025-03-02 00:00:00+00:00", "2025-03-03 00:00:00+00:00"], temperature_2m=[10.0, 20.0])
+    weekly = rollup(frame, "weekly")
+    assert list(weekly["week_key"]) == ["2025-02-24", "2025-03-03"]
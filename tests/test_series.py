@@ -0,0 +1,13 @@
+import httpx
+
+
+def test_series_is_cached_by_etag(api):
+    url = f"{api.url}/api/series"
+    params = {"from": "2025-06-01", "to": "2025-06-07", "fields": "temperature_2m"}
+    first = httpx.get(url, params=params, timeout=30.0)
+    assert first.status_code == 200, first.text
+    assert len(first.json()["dates"]) == 7
+    assert httpx.get(url, params=params, timeout=30.0).content == first.content
+    assert api.app.series_cache.stats()["hits"] == 1
+    not_modified = httpx.get(url, params=params, headers={"If-None-Match": first.headers["etag"]}, timeout=30.0)
+    assert not_modified.status_code == 304
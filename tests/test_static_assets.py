@@ -0,0 +1,72 @@
+import asyncio
+import gzip
+
+import pytest
+
+from static_assets import IMMUTABLE, REVALIDATE, AssetManifest, StaticAssets
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    (tmp_path / "style.css").write_text("body { background: url('logo.svg'); }\n" + "/* padding */\n" * 40)
+    (tmp_path / "logo.svg").write_text("<svg xmlns='http://www.w3.org/2000/svg'></svg>")
+    (tmp_path / "app.js").write_text("fetch('/api/series');\n" * 30)
+    (tmp_path / "index.html").write_text(
+        '<link rel="stylesheet" href="style.css"><script src="./app.js"></script>\n' + "<p>forecast</p>\n" * 40
+    )
+    return AssetManifest(str(tmp_path))
+
+
+def request(manifest, path, method="GET", **headers):
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        "type": "http",
+        "method": method,
+        "path": path,
+        "headers": [(key.replace("_", "-").encode(), value.encode()) for key, value in headers.items()],
+    }
+    asyncio.run(StaticAssets(manifest)(scope, receive, send))
+    start, body = messages
+    return start["status"], {key.decode(): value.decode() for key, value in start["headers"]}, body["body"]
+
+
+def test_references_point_at_fingerprinted_names(manifest):
+    assert set(manifest.hashed) == {"style.css", "logo.svg", "app.js"}
+    css = manifest.get(manifest.hashed["style.css"])
+    html = manifest.get("/")
+    assert manifest.hashed["logo.svg"].encode() in css.body
+    assert f'href="{manifest.hashed["style.css"]}"'.encode() in html.body
+    assert f'src="{manifest.hashed["app.js"]}"'.encode() in html.body
+    assert css.cache_control == IMMUTABLE
+    assert html.cache_control == REVALIDATE
+    assert manifest.get("style.css").cache_control == REVALIDATE
+
+
+def test_serves_gzip_and_revalidates(manifest):
+    name = "/" + manifest.hashed["app.js"]
+    status, headers, body = request(manifest, name, accept_encoding="gzip, deflate")
+    assert status == 200
+    assert headers["content-encoding"] == "gzip"
+    assert headers["cache-control"] == IMMUTABLE
+    assert headers["content-type"].endswith("charset=utf-8")
+    assert gzip.decompress(body) == manifest.get(name).body
+
+    status, _, body = request(manifest, name, accept_encoding="gzip", if_none_match=headers["etag"])
+    assert (status, body) == (304, b"")
+    # The plain body has its own ETag
+    status, plain, body = request(manifest, name, if_none_match=headers["etag"])
+    assert status == 200 and "content-encoding" not in plain and body == manifest.get(name).body
+
+
+def test_head_missing_and_unsupported_methods(manifest):
+    status, headers, body = request(manifest, "/index.html", method="HEAD")
+    assert status == 200 and body == b"" and int(headers["content-length"]) == len(manifest.get("/").body)
+    assert request(manifest, "/missing.js")[0] == 404
+    assert request(manifest, "/index.html", method="POST")[0] == 405
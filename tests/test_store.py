@@ -0,0 +1,74 @@
+from bench_fakes import load_fake_database
+from ingest import build_columnar_store
+from store import WEATHER_FIELDS, CachedPredictionStore, ColumnarPredictionStore, MongoPredictionStore, lookup_row
+
+ROW_FIELDS = {"date"} | set(WEATHER_FIELDS)
+
+
+def test_single_reading_days_keep_their_fields(tmp_path):
+    build_columnar_store(out_dir=str(tmp_path))
+    for store in (MongoPredictionStore(load_fake_database()), ColumnarPredictionStore(str(tmp_path))):
+        assert set(store.get("2025-06-01")) <= ROW_FIELDS
+        assert all(set(row) <= ROW_FIELDS for row in store.get_many(["2025-06-01", "2025-06-02"]).values())
+
+
+def test_multi_hour_rows_keep_their_extras():
+    row = {"date": "2025-06-01", "temperature_2m": 30.0, "temperature_2m_min": 26.0, "temperature_2m_max": 34.0,
+           "wind_speed_10m_max": 20.0, "hours": 24.0}
+    assert lookup_row(dict(row)) == row
+    single = lookup_row({**row, "hours": 1.0})
+    assert single == {"date": "2025-06-01", "temperature_2m": 30.0}
+
+
+def test_columnar_store_matches_mongo(tmp_path):
+    build_columnar_store(out_dir=str(tmp_path))
+    mongo, columnar = MongoPredictionStore(load_fake_database()), ColumnarPredictionStore(str(tmp_path))
+    assert columnar.get("2025-06-01") == mongo.get("2025-06-01")
+    assert columnar.get("1999-01-01") is None and mongo.get("1999-01-01") is None
+    dates = ["2025-06-01", "1999-01-01", "2025-06-03"]
+    assert columnar.get_many(dates) == mongo.get_many(dates)
+    assert set(columnar.get_many(dates)) == {"2025-06-01", "2025-06-03"}
+    fields = ["temperature_2m", "rain", "wind_speed_10m"]
+    for granularity in ("daily", "weekly"):
+        keys, values = columnar.get_range("2025-05-30", "2025-06-10", fields, granularity)
+        assert (keys, values) == mongo.get_range("2025-05-30", "2025-06-10", fields, granularity)
+        assert keys and all(len(values[field]) == len(keys) for field in fields)
+    assert columnar.get_range("2025-05-30", "2025-06-10", fields, "weekly")[0][0] == "2025-05-26"
+
+
+class CountingStore:
+    name = "counting"
+    blocking_io = False
+    writable = True
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.lookups = []
+
+    def get(self, date_key):
+        self.lookups.append(date_key)
+        return self.rows.get(date_key)
+
+    def get_many(self, date_keys):
+        self.lookups.extend(date_keys)
+        return {key: self.rows[key] for key in date_keys if key in self.rows}
+
+    def put_many(self, rows):
+        self.rows.update((row["date_key"], row) for row in rows)
+
+
+def test_row_cache_reads_through_and_caches_misses():
+    store = CountingStore({"2025-06-01": {"date": "2025-06-01"}})
+    cached = CachedPredictionStore(store)
+    for _ in range(3):
+        assert cached.get("2025-06-01") == {"date": "2025-06-01"}
+        assert cached.get("2030-01-01") is None
+    assert store.lookups == ["2025-06-01", "2030-01-01"]
+
+    assert set(cached.get_many(["2025-06-01", "2030-01-01", "2030-01-02"])) == {"2025-06-01"}
+    assert store.lookups[2:] == ["2030-01-02"]
+
+    # Writing a date replaces its cached miss
+    cached.put_many([{"date_key": "2030-01-01", "date": "2030-01-01"}])
+    assert cached.get("2030-01-01") == {"date_key": "2030-01-01", "date": "2030-01-01"}
+    assert store.lookups[3:] == []
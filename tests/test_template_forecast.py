@@ -0,0 +1,84 @@
+import asyncio
+
+from concurrency import hedge
+from template_forecast import build_template_forecast
+
+ROW = {
+    "temperature_2m": 27.3,
+    "apparent_temperature": 28.1,
+    "relative_humidity_2m": 72.0,
+    "dew_point_2m": 21.0,
+    "precipitation": 4.2,
+    "cloud_cover": 65.0,
+    "wind_speed_10m": 18.0,
+    "wind_gusts_10m": 31.0,
+    "wind_direction_10m": 225.0,
+    "pressure_msl": 1008.4,
+}
+
+WARNINGS = {"heavy_rain": {"level": "minor", "message": "Heavy rainfall possible"}}
+
+
+def test_template_forecast_is_deterministic_and_ends_with_warnings():
+    text = build_template_forecast("2025-06-01", "balanced", 120, ROW, WARNINGS)
+    assert text == build_template_forecast("2025-06-01", "balanced", 120, ROW, WARNINGS)
+    assert text.startswith("Here is the weather for Sunday, 01 June 2025.")
+    assert "warm conditions with temperatures around 27.3°C" in text
+    assert "from the south-west" in text
+    assert "moderate rain (4.2 mm)" in text
+    assert text.endswith("Weather Warnings:\n- MINOR: Heavy rainfall possible")
+
+
+def test_template_forecast_styles_differ():
+    texts = {style: build_template_forecast("2025-06-01", style, 120, ROW, {})
+             for style in ("balanced", "detailed", "casual", "broadcast")}
+    assert len(set(texts.values())) == 4
+    assert build_template_forecast("2025-06-01", "unknown", 120, ROW, {}) == texts["balanced"]
+
+
+def test_template_forecast_drops_optional_sentences_to_fit():
+    short = build_template_forecast("2025-06-01", "balanced", 10, ROW, {})
+    full = build_template_forecast("2025-06-01", "balanced", 500, ROW, {})
+    assert len(short.split()) < len(full.split())
+    # Core topics stay even when they alone exceed the length
+    assert "temperatures around 27.3°C" in short
+    assert "Pressure holds" not in short and "Pressure holds" in full
+
+
+def test_template_forecast_skips_sentences_missing_values():
+    text = build_template_forecast("2025-06-01", "balanced", 500, {"temperature_2m": 5.0}, {})
+    assert "cold conditions" not in text  # apparent temperature is missing
+    assert "N/A" not in text and "{" not in text
+    # The range only shows for rows rolled up from several readings
+    single = dict(ROW, temperature_2m_min=20.0, temperature_2m_max=30.0)
+    rollup = dict(single, hours=24)
+    assert "range from" not in build_template_forecast("2025-06-01", "balanced", 500, single, {})
+    assert "range from 20.0°C to 30.0°C" in build_template_forecast("2025-06-01", "balanced", 500, rollup, {})
+
+
+def test_hedge_returns_the_faster_attempt():
+    durations = [0.2, 0.01]
+    hedged = []
+
+    async def call():
+        duration = durations.pop(0)
+        await asyncio.sleep(duration)
+        return duration
+
+    assert asyncio.run(hedge(call, 0.02, on_hedge=lambda: hedged.append(1))) == 0.01
+    assert hedged == [1]
+
+
+def test_hedge_survives_one_failed_attempt():
+    attempts = []
+
+    async def call():
+        attempts.append(1)
+        if len(attempts) == 1:
+            await asyncio.sleep(0.03)
+            raise ConnectionError("reset")
+        await asyncio.sleep(0.05)
+        return "ok"
+
+    assert asyncio.run(hedge(call, 0.01)) == "ok"
+    assert len(attempts) == 2
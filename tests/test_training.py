@@ -0,0 +1,11 @@
+import numpy as np
+
+from training import rollout_start
+
+
+def test_rollout_starts_from_the_last_training_window():
+    scaled = np.arange(20, dtype=np.float32).reshape(10, 2)
+    # X[-1] of the notebook: the window whose target is the last row
+    np.testing.assert_array_equal(rollout_start(scaled, 4), scaled[5:9])
+    # Windows saved before the extra row was kept
+    np.testing.assert_array_equal(rollout_start(scaled[-4:], 4), scaled[-4:])
@@ -0,0 +1,18 @@
+import asyncio
+import sqlite3
+from datetime import date
+
+from warmup import warm_up
+
+
+def test_warm_up_stores_every_variant(api):
+    api.Settings.FORECAST_CACHE_VARIANTS = 3
+    try:
+        stats = asyncio.run(warm_up(api.url, date(2025, 6, 1), 2, ["balanced"], [100], concurrency=4, variants=3))
+    finally:
+        api.Settings.FORECAST_CACHE_VARIANTS = 1
+    assert stats["generated"] == 6 and stats["failed"] == 0
+
+    with sqlite3.connect(api.Settings.FORECAST_CACHE_PATH) as conn:
+        counts = conn.execute("SELECT COUNT(*) FROM forecasts GROUP BY key").fetchall()
+    assert sorted(count for (count,) in counts) == [3, 3]
@@ -0,0 +1,106 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from ingest import DEFAULT_CSV_PATH
+from rules import DISASTER_THRESHOLDS, detect_disaster_warnings
+from store import WEATHER_FIELDS
+from warnings_engine import LEVELS, build_warnings_index, evaluate_rows
+
+
+def legacy_warnings(weather_data, thresholds=DISASTER_THRESHOLDS):
+    """The per-row if/elif rules detect_disaster_warnings had before the vectorized engine"""
+    if not weather_data:
+        return {}
+    warnings = {}
+    precipitation = float(weather_data.get('precipitation', 0))
+    if precipitation >= thresholds["flood_risk"]:
+        warnings["flood"] = {"level": "severe", "message": f"SEVERE FLOOD RISK: Extreme precipitation of {precipitation}mm expected."}
+    elif precipitation >= thresholds["heavy_rain"]:
+        warnings["flood"] = {"level": "moderate", "message": f"FLOOD WATCH: Heavy rainfall of {precipitation}mm expected."}
+    elif precipitation >= 10.0:
+        warnings["rain"] = {"level": "minor", "message": f"Moderate rainfall of {precipitation}mm expected."}
+
+    max_wind = max(float(weather_data.get('wind_speed_10m', 0)), float(weather_data.get('wind_gusts_10m', 0)))
+    if max_wind >= thresholds["severe_wind"]:
+        warnings["wind"] = {"level": "severe", "message": f"SEVERE WIND WARNING: Wind speeds up to {max_wind}km/h expected."}
+    elif max_wind >= thresholds["high_wind"]:
+        warnings["wind"] = {"level": "moderate", "message": f"WIND ADVISORY: Strong winds up to {max_wind}km/h expected."}
+    elif max_wind >= 20.0:
+        warnings["wind"] = {"level": "minor", "message": f"Breezy conditions with winds up to {max_wind}km/h expected."}
+
+    temperature = float(weather_data.get('temperature_2m', 0))
+    if temperature >= thresholds["extreme_heat"]:
+        warnings["heat"] = {"level": "severe", "message": f"EXTREME HEAT WARNING: Temperatures reaching {temperature}°C expected."}
+    elif temperature >= thresholds["hot_weather"]:
+        warnings["heat"] = {"level": "moderate", "message": f"HEAT ADVISORY: Hot weather with temperatures of {temperature}°C expected."}
+    elif temperature >= 30.0:
+        warnings["heat"] = {"level": "minor", "message": f"Warm weather with temperatures of {temperature}°C expected."}
+    elif temperature <= 10.0:
+        warnings["cold"] = {"level": "minor", "message": f"Cool conditions with temperatures of {temperature}°C expected."}
+
+    humidity = float(weather_data.get('relative_humidity_2m', 50))
+    if humidity >= thresholds["high_humidity"]:
+        warnings["humidity"] = {"level": "moderate", "message": f"HIGH HUMIDITY: Uncomfortable conditions with humidity at {humidity}%."}
+    elif humidity >= 70.0:
+        warnings["humidity"] = {"level": "minor", "message": f"Moderately humid conditions ({humidity}%) may cause discomfort."}
+
+    if max_wind >= thresholds["cyclone_risk"] and precipitation >= thresholds["heavy_rain"]:
+        warnings["cyclone"] = {"level": "severe", "message": f"CYCLONE WARNING: High winds ({max_wind}km/h) with heavy rainfall ({precipitation}mm)."}
+    elif max_wind >= 40.0 and precipitation >= 15.0:
+        warnings["storm"] = {"level": "moderate", "message": f"STORM CONDITIONS: Moderate winds ({max_wind}km/h) with rainfall ({precipitation}mm)."}
+
+    drought = thresholds["drought_risk"]
+    if temperature >= drought["max_temp"] and humidity <= drought["max_humidity"] and precipitation <= drought["max_precipitation"]:
+        warnings["drought"] = {"level": "moderate", "message": f"DROUGHT CONDITIONS: High temperature ({temperature}°C), low humidity ({humidity}%), minimal precipitation."}
+
+    cloud_cover = float(weather_data.get('cloud_cover', 0))
+    if cloud_cover >= 80:
+        warnings["clouds"] = {"level": "minor", "message": f"OVERCAST CONDITIONS: Heavy cloud cover ({cloud_cover}%) expected."}
+
+    pressure = float(weather_data.get('pressure_msl', 1013.25))
+    if pressure < 1000:
+        warnings["pressure"] = {"level": "minor", "message": f"LOW PRESSURE SYSTEM: Atmospheric pressure of {pressure}hPa may lead to unsettled weather."}
+    elif pressure > 1025:
+        warnings["pressure"] = {"level": "minor", "message": f"HIGH PRESSURE SYSTEM: Atmospheric pressure of {pressure}hPa indicating stable conditions."}
+    return warnings
+
+
+def prediction_rows():
+    frame = pd.read_csv(DEFAULT_CSV_PATH)
+    return frame[["date"] + [field for field in WEATHER_FIELDS if field in frame.columns]].to_dict("records")
+
+
+def boundary_rows():
+    """Rows on and around every threshold, plus rows with fields missing"""
+    values = {
+        "precipitation": [0.0, 0.9, 1.0, 10.0, 15.0, 20.0, 39.9, 40.0],
+        "wind_speed_10m": [0.0, 19.9, 20.0, 30.0, 40.0, 50.0, 70.0],
+        "temperature_2m": [5.0, 10.0, 10.1, 30.0, 33.0, 34.0, 38.0],
+        "relative_humidity_2m": [30.0, 40.0, 70.0, 80.0],
+    }
+    rows = [dict(zip(values, combination)) for combination in itertools.product(*values.values())]
+    rows += [{"cloud_cover": 80.0, "pressure_msl": 999.0}, {"pressure_msl": 1025.5, "wind_gusts_10m": 55.0},
+             {"temperature_2m": 12.0}, {}]
+    return rows
+
+
+def test_engine_matches_the_legacy_rules():
+    rows = prediction_rows() + boundary_rows()
+    assert evaluate_rows(rows, DISASTER_THRESHOLDS) == [legacy_warnings(row) for row in rows]
+    assert all(detect_disaster_warnings(row) == legacy_warnings(row) for row in rows[:50])
+
+
+def test_index_matches_row_evaluation():
+    rows = prediction_rows()
+    dates = [row["date"][:10] for row in rows]
+    fields = {field: np.array([row.get(field, np.nan) for row in rows], dtype=np.float64)
+              for field in WEATHER_FIELDS if field in rows[0]}
+    index = build_warnings_index(dates, fields, DISASTER_THRESHOLDS)
+    assert [index.get(date_key) for date_key in dates] == evaluate_rows(rows, DISASTER_THRESHOLDS)
+    severe = index.query(level="severe")
+    expected = [date_key for date_key, row in zip(dates, rows)
+                if any(LEVELS[info["level"]] == LEVELS["severe"] for info in legacy_warnings(row).values())]
+    assert [day["date"] for day in severe] == expected
+    assert all(info["level"] == "severe" for day in severe for info in day["warnings"].values())